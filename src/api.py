@@ -1,84 +1,313 @@
 # src/api.py
+import asyncio
+import json
+import threading
+import time
+
 import requests
 
-class AniListAPI:
-    def __init__(self):
-        self.API_URL = 'https://graphql.anilist.co'
+ANIME_ENTRY_FIELDS = """
+                mediaId
+                status
+                score
+                progress
+                repeat
+                startedAt { year month day }
+                completedAt { year month day }
+                media {
+                    idMal
+                    id
+                    title { romaji english native }
+                    type
+                    format
+                    episodes
+                    status
+                }
+"""
 
-    def get_anime_list(self, username):
-        query = """
-        query ($username: String) {
-          MediaListCollection(userName: $username, type: ANIME) {
-            lists {
-              name
-              entries {
+MANGA_ENTRY_FIELDS = """
                 mediaId
                 status
                 score
                 progress
+                progressVolumes
                 repeat
+                startedAt { year month day }
+                completedAt { year month day }
                 media {
-                  id
-                  title {
-                    romaji
-                    english
-                    native
-                  }
-                  episodes
-                  status
+                    idMal
+                    id
+                    title { romaji english native }
+                    type
+                    format
+                    chapters
+                    volumes
+                    status
                 }
-              }
-            }
-          }
-        }
-        """
-        
-        variables = {'username': username}
-        response = requests.post(self.API_URL, json={'query': query, 'variables': variables})
-        
-        if response.status_code == 404:
-            raise Exception("User not found")
-        elif response.status_code != 200:
-            raise Exception(f"API error: {response.status_code}")
-            
-        return response.json()
+"""
 
-    def get_manga_list(self, username):
-        query = """
-        query ($username: String) {
-          MediaListCollection(userName: $username, type: MANGA) {
-            lists {
-              name
-              entries {
+# Fewer fields for backups that only need the canonical JSON, the stats and MAL XML
+# (see Exporter.lean): no media id/type/status and only the romaji title.
+LEAN_ANIME_ENTRY_FIELDS = """
+                mediaId
+                status
+                score
+                progress
+                repeat
+                startedAt { year month day }
+                completedAt { year month day }
+                media {
+                    idMal
+                    title { romaji }
+                    format
+                    episodes
+                }
+"""
+
+LEAN_MANGA_ENTRY_FIELDS = """
                 mediaId
                 status
                 score
                 progress
                 progressVolumes
                 repeat
+                startedAt { year month day }
+                completedAt { year month day }
                 media {
-                  id
-                  title {
-                    romaji
-                    english
-                    native
-                  }
-                  chapters
-                  volumes
-                  status
+                    idMal
+                    title { romaji }
+                    format
+                    chapters
+                    volumes
                 }
-              }
-            }
-          }
+"""
+
+# Only the user's own fields, for "has anything changed" probes (see list_fingerprint in app.py).
+STATS_ANIME_ENTRY_FIELDS = """
+                mediaId
+                status
+                score
+                progress
+                repeat
+                startedAt { year month day }
+                completedAt { year month day }
+"""
+
+STATS_MANGA_ENTRY_FIELDS = """
+                mediaId
+                status
+                score
+                progress
+                progressVolumes
+                repeat
+                startedAt { year month day }
+                completedAt { year month day }
+"""
+
+QUERY_PROFILES = {
+    'full': {'ANIME': ANIME_ENTRY_FIELDS, 'MANGA': MANGA_ENTRY_FIELDS},
+    'lean': {'ANIME': LEAN_ANIME_ENTRY_FIELDS, 'MANGA': LEAN_MANGA_ENTRY_FIELDS},
+    'stats': {'ANIME': STATS_ANIME_ENTRY_FIELDS, 'MANGA': STATS_MANGA_ENTRY_FIELDS},
+}
+
+CHUNKED_LIST_QUERY = """
+query ($username: String, $type: MediaType, $chunk: Int, $perChunk: Int) {
+    MediaListCollection(userName: $username, type: $type, chunk: $chunk, perChunk: $perChunk) {
+        hasNextChunk
+        lists {
+            name
+            entries {%s}
+        }
+    }
+}
+"""
+
+COMBINED_LIST_QUERY = """
+query ($username: String) {
+    MediaListCollection(userName: $username, type: ANIME) {
+        lists {
+            name
+            entries {%s}
         }
-        """
-        
-        variables = {'username': username}
-        response = requests.post(self.API_URL, json={'query': query, 'variables': variables})
-        
+    }
+    MediaListCollection2: MediaListCollection(userName: $username, type: MANGA) {
+        lists {
+            name
+            entries {%s}
+        }
+    }
+}
+"""
+
+# Aliases used by the combined single-request query; fetch_lists returns the same shape.
+COLLECTION_ALIASES = {'ANIME': 'MediaListCollection', 'MANGA': 'MediaListCollection2'}
+
+# Sent with every request: AniList compresses the (highly repetitive) JSON responses.
+REQUEST_HEADERS = {'Accept-Encoding': 'gzip'}
+
+
+def combined_query(profile='full'):
+    """Both lists in one request (used without concurrent fetching and for streaming)."""
+    fields = QUERY_PROFILES[profile]
+    return COMBINED_LIST_QUERY % (fields['ANIME'], fields['MANGA'])
+
+
+def wire_bytes(response):
+    """Bytes a requests response took on the wire (compressed), once its body was read."""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content)
+
+
+class TransferStats:
+    """Requests, bytes on the wire, decoded bytes and AniList response time of one fetch.
+    `cache` says whether the data came from a response cache ('hit', 'coalesced',
+    'miss'); None if no cache was used."""
+
+    def __init__(self):
+        self.requests = 0
+        self.wire_bytes = 0
+        self.bytes = 0
+        self.upstream_ms = 0.0
+        self.cache = None
+        self._lock = threading.Lock()
+
+    def add(self, response):
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes(response)
+            self.bytes += len(response.content)
+            self.upstream_ms += response.elapsed.total_seconds() * 1000
+
+    def add_stream(self, response):
+        """For a response whose body was read through response.raw (streaming parse);
+        the decoded size is not known then."""
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes(response)
+            self.upstream_ms += response.elapsed.total_seconds() * 1000
+
+    def merge(self, other):
+        with self._lock:
+            self.requests += other.requests
+            self.wire_bytes += other.wire_bytes
+            self.bytes += other.bytes
+            self.upstream_ms += other.upstream_ms
+
+    def to_dict(self):
+        result = {'requests': self.requests, 'wire_bytes': self.wire_bytes, 'bytes': self.bytes,
+                  'upstream_ms': round(self.upstream_ms, 1)}
+        if self.cache:
+            result['cache'] = self.cache
+        return result
+
+
+class AniListAPI:
+    """AniList client that fetches the anime and manga lists, and the chunks within each,
+    concurrently. HTTP calls are blocking `requests` calls run in worker threads; one
+    semaphore bounds the number of requests in flight across both media types.
+    `log_error`, if given, is called with a message carrying the body of failed responses."""
+
+    def __init__(self, api_url='https://graphql.anilist.co', max_concurrency=4, per_chunk=500,
+                 timeout=60, max_retries=3, log_error=None):
+        self.API_URL = api_url
+        self.max_concurrency = max_concurrency
+        self.per_chunk = per_chunk
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.log_error = log_error
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, query, variables, transfer=None):
+        """Blocking POST with Retry-After handling for rate limits (HTTP 429)."""
+        for attempt in range(self.max_retries + 1):
+            response = self._session().post(self.API_URL, json={'query': query, 'variables': variables},
+                                            headers=REQUEST_HEADERS, timeout=self.timeout)
+            if transfer is not None:
+                transfer.add(response)
+            if response.status_code == 429 and attempt < self.max_retries:
+                try:
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                except ValueError:
+                    retry_after = 1.0
+                time.sleep(min(max(retry_after, 0), 60))
+                continue
+            break
+
         if response.status_code == 404:
-            raise Exception("User not found")
+            raise Exception(f"User '{variables.get('username')}' not found on AniList.")
         elif response.status_code != 200:
-            raise Exception(f"API error: {response.status_code}")
-            
-        return response.json()
\ No newline at end of file
+            if self.log_error is not None:
+                try:
+                    error_detail = json.dumps(response.json())
+                except ValueError:
+                    error_detail = response.text
+                self.log_error(f"AniList API error ({response.status_code}): {error_detail}")
+            raise Exception(f"Failed to fetch data from AniList (Status: {response.status_code})")
+
+        payload = response.json()
+        if payload.get('errors') and not payload.get('data'):
+            raise Exception(f"AniList API error: {payload['errors'][0].get('message', payload['errors'])}")
+        return payload
+
+    async def _post_async(self, semaphore, query, variables, transfer=None):
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._post, query, variables, transfer)
+
+    async def fetch_collection_async(self, username, media_type, semaphore=None, profile='full', transfer=None):
+        """Fetches all chunks of one MediaListCollection with the fields of a query
+        profile. Chunk 1 is requested alone, as most lists fit in it; further chunks are
+        requested in windows of `max_concurrency` until AniList reports no further chunk."""
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        query = CHUNKED_LIST_QUERY % QUERY_PROFILES[profile][media_type]
+        lists_by_name = {}
+        next_chunk = 1
+        has_next = True
+        window_size = 1
+        while has_next:
+            window = range(next_chunk, next_chunk + window_size)
+            window_size = self.max_concurrency
+            results = await asyncio.gather(*[
+                self._post_async(semaphore, query, {'username': username, 'type': media_type,
+                                                    'chunk': chunk, 'perChunk': self.per_chunk}, transfer)
+                for chunk in window
+            ])
+            for result in results:
+                collection = (result.get('data') or {}).get('MediaListCollection') or {}
+                for list_group in collection.get('lists') or []:
+                    merged = lists_by_name.setdefault(list_group.get('name'), {'name': list_group.get('name'), 'entries': []})
+                    merged['entries'].extend(list_group.get('entries') or [])
+                has_next = bool(collection.get('hasNextChunk'))
+                if not has_next:
+                    break
+            next_chunk = window[-1] + 1
+        return {'lists': list(lists_by_name.values())}
+
+    async def fetch_lists_async(self, username, profile='full', transfer=None):
+        """Fetches anime and manga concurrently. Returns the combined-query response shape."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        anime, manga = await asyncio.gather(
+            self.fetch_collection_async(username, 'ANIME', semaphore, profile, transfer),
+            self.fetch_collection_async(username, 'MANGA', semaphore, profile, transfer))
+        return {'data': {COLLECTION_ALIASES['ANIME']: anime, COLLECTION_ALIASES['MANGA']: manga}}
+
+    def fetch_lists(self, username, profile='full', transfer=None):
+        """Synchronous wrapper around fetch_lists_async. A TransferStats passed as
+        `transfer` collects the sizes and timings of all requests."""
+        return asyncio.run(self.fetch_lists_async(username, profile, transfer))
+
+    def get_anime_list(self, username):
+        collection = asyncio.run(self.fetch_collection_async(username, 'ANIME'))
+        return {'data': {'MediaListCollection': collection}}
+
+    def get_manga_list(self, username):
+        collection = asyncio.run(self.fetch_collection_async(username, 'MANGA'))
+        return {'data': {'MediaListCollection': collection}}
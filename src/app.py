@@ -4,11 +4,41 @@ import json
 import shutil
 from datetime import datetime
 import threading
-import time
 import requests
 import zipfile
 import io
 import queue
+import mimetypes
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from api import AniListAPI, TransferStats, combined_query, REQUEST_HEADERS
+from backup_index import BackupIndex
+from exporters import (EXPORTERS, DEFAULT_FORMATS, REQUIRED_FORMATS, ExportContext, resolve_formats,
+                       members_for_formats, run_exporters, supports_streaming, supports_lean, open_stream_writers)
+import mal_xml  # registers the 'mal_xml' exporter
+from list_stats import (StatsAccumulator, ActivityAccumulator, ListFingerprint, calculate_stats, calculate_activity,
+                        list_fingerprint)
+from json_stream import iter_anilist_entries, iter_json_array
+from entries import Entry, parse_entries, collection_entries
+from scheduler import Scheduler, parse_cron
+from tracing import Trace, BackupProfiler
+from storage import LocalStorage, S3Storage
+from compression import init_compression
+from static_assets import StaticAssetHasher
+from artifact_cache import ArtifactCache
+from response_cache import ResponseCache
+from backup_journal import BackupJournal
+from state_files import sync_directory, write_json_atomic
+from fragment_cache import FragmentCache
+from zip_stream import ZipStreamWriter
+import ingest
+import archive_builder
+from archive_builder import finish_archive, validate_backup_zip
+from scrubber import ArchiveScrubber
+from catalog import StaticCatalog
+from backup_layout import shard_key, legacy_key, backup_id_of, is_backup_key
 
 app = Flask(__name__)
 sse_queue = queue.Queue()
@@ -23,98 +53,112 @@ os.makedirs(BACKUP_DIR, exist_ok=True)
 LOGS_FILE = os.path.join(APP_DATA_DIR, "logs.json")
 CONFIG_FILE = os.path.join(APP_DATA_DIR, "config.json")
 LATEST_STATS_FILE = os.path.join(APP_DATA_DIR, "latest_stats.json")
+BACKUP_INDEX_FILE = os.path.join(APP_DATA_DIR, "backup_index.db")
+SCHEDULER_STATE_FILE = os.path.join(APP_DATA_DIR, "scheduler_state.json")
+PROFILES_DIR = os.path.join(APP_DATA_DIR, "profiles")
+INGEST_STATE_FILE = os.path.join(APP_DATA_DIR, "ingest_state.json")
+# One record per backup in progress; what is left at startup belongs to interrupted runs.
+BACKUP_JOURNAL_DIR = os.path.join(APP_DATA_DIR, "backup_journal")
 MAX_LOGS = 100
+BACKUPS_PAGE_SIZE = 50
+MAX_BACKUPS_PAGE_SIZE = 500
+EXPORT_WORKERS = 4
+# 'processes' runs the CPU-bound export and zip stages of the (non-streaming) backup
+# path in a process pool, so they neither hold the GIL against request handling nor
+# serialize concurrent backups of several users. 'threads' keeps them in-process.
+EXPORT_MODE = os.environ.get('ANIVAULT_EXPORT_MODE', 'threads').lower()
+EXPORT_PROCESSES = int(os.environ.get('ANIVAULT_EXPORT_PROCESSES', '0')) or os.cpu_count() or 1
+# Streaming mode parses the AniList response incrementally and writes every export
+# entry by entry, keeping memory flat for large lists (useful in small containers).
+STREAMING_PARSE = os.environ.get('ANIVAULT_STREAMING_PARSE', '0').lower() in ('1', 'true', 'yes')
+# Fetch anime and manga (and the chunks of large lists) as concurrent requests
+# instead of one combined query. Not used by the streaming path.
+CONCURRENT_FETCH = os.environ.get('ANIVAULT_CONCURRENT_FETCH', '1').lower() in ('1', 'true', 'yes')
+# Point at a local stand-in (tools/mock_anilist.py) for load and rate-limit testing.
+ANILIST_API_URL = os.environ.get('ANIVAULT_ANILIST_API_URL', 'https://graphql.anilist.co')
+ANILIST_MAX_CONCURRENCY = int(os.environ.get('ANIVAULT_ANILIST_CONCURRENCY', '4'))
+# Fields requested from AniList (api.QUERY_PROFILES): 'full', or 'lean' for backups whose
+# formats only need the fields of MAL XML and the stats. Can be set per backup/schedule.
+QUERY_PROFILE = os.environ.get('ANIVAULT_QUERY_PROFILE', 'full').lower()
+BACKUP_QUERY_PROFILES = ('full', 'lean')
+ANILIST_COLLECTION_TYPES = {'MediaListCollection': 'anime', 'MediaListCollection2': 'manga'}
+AUTO_BACKUP_JOB = 'auto_backup'
+# Where finished archives are kept: 'local' (BACKUP_DIR) or 's3' (any S3-compatible
+# service, e.g. MinIO via ANIVAULT_S3_ENDPOINT_URL). BACKUP_DIR is always used for staging.
+STORAGE_BACKEND = os.environ.get('ANIVAULT_STORAGE', 'local').lower()
+S3_BUCKET = os.environ.get('ANIVAULT_S3_BUCKET')
+S3_PREFIX = os.environ.get('ANIVAULT_S3_PREFIX', '')
+S3_ENDPOINT_URL = os.environ.get('ANIVAULT_S3_ENDPOINT_URL') or None
+S3_REGION = os.environ.get('ANIVAULT_S3_REGION') or None
+S3_PART_SIZE_MB = int(os.environ.get('ANIVAULT_S3_PART_SIZE_MB', '8'))
+# Lazy exports: archives hold only the canonical JSON (plus meta.json); the other
+# selected formats are generated from it on first download and kept in a bounded cache.
+LAZY_EXPORTS = os.environ.get('ANIVAULT_LAZY_EXPORTS', '0').lower() in ('1', 'true', 'yes')
+ARTIFACT_CACHE_DIR = os.path.join(APP_DATA_DIR, "artifact_cache")
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get('ANIVAULT_ARTIFACT_CACHE_MB', '256'))
+# gzip/brotli for JSON and static responses of at least COMPRESSION_MIN_SIZE bytes.
+COMPRESSION_ENABLED = os.environ.get('ANIVAULT_COMPRESSION', '1').lower() in ('1', 'true', 'yes')
+COMPRESSION_MIN_SIZE = int(os.environ.get('ANIVAULT_COMPRESSION_MIN_SIZE', '1024'))
+# Rendered MAL XML entries per user, so a backup only re-renders the entries that changed.
+MAL_FRAGMENT_CACHE = os.environ.get('ANIVAULT_MAL_FRAGMENT_CACHE', '1').lower() in ('1', 'true', 'yes')
+MAL_FRAGMENT_CACHE_FILE = os.path.join(APP_DATA_DIR, "mal_fragments.db")
+# Decoded AniList responses per user and query profile, reused for ANILIST_CACHE_TTL
+# seconds (0 disables the cache) so backups started close together fetch only once.
+ANILIST_CACHE_DIR = os.path.join(APP_DATA_DIR, "anilist_cache")
+ANILIST_CACHE_TTL = int(os.environ.get('ANIVAULT_ANILIST_CACHE_TTL', '60'))
+ANILIST_CACHE_MAX_MB = int(os.environ.get('ANIVAULT_ANILIST_CACHE_MB', '64'))
+# Background integrity checks of all stored archives (0 hours disables them).
+SCRUB_INTERVAL_HOURS = float(os.environ.get('ANIVAULT_SCRUB_INTERVAL_HOURS', '24'))
+SCRUB_WORKERS = int(os.environ.get('ANIVAULT_SCRUB_WORKERS', '2'))
+SCRUB_MAX_MB_PER_S = float(os.environ.get('ANIVAULT_SCRUB_MAX_MB_PER_S', '10'))
+SCRUB_JOB = 'integrity_scrub'
+# Static, read-only copy of the listings and stats for a web server in front of the app
+# (see README). Archive links are ANIVAULT_CATALOG_ARCHIVE_URL + storage key.
+CATALOG_ENABLED = os.environ.get('ANIVAULT_CATALOG', '0').lower() in ('1', 'true', 'yes')
+CATALOG_DIR = os.environ.get('ANIVAULT_CATALOG_DIR') or os.path.join(BACKUP_DIR, "_catalog")
+CATALOG_ARCHIVE_URL = os.environ.get('ANIVAULT_CATALOG_ARCHIVE_URL', '../')
+# Worker processes used to convert legacy archives and MAL exports (default: CPU count).
+INGEST_WORKERS = int(os.environ.get('ANIVAULT_INGEST_WORKERS', '0')) or os.cpu_count() or 1
 # --- End Configuration ---
 
-auto_backup_thread = None
-stop_auto_backup = threading.Event()
 auto_backup_config = None
 backup_lock = threading.Lock()
-
-ANILIST_QUERY = """
-query ($username: String) {
-    MediaListCollection(userName: $username, type: ANIME) {
-        lists {
-            name 
-            entries {
-                mediaId 
-                status 
-                score 
-                progress 
-                repeat 
-                startedAt { year month day } 
-                completedAt { year month day } 
-                media {
-                    idMal 
-                    id 
-                    title { romaji english native }
-                    type 
-                    format 
-                    episodes 
-                    status 
-                }
-            }
-        }
-    }
-    MediaListCollection2: MediaListCollection(userName: $username, type: MANGA) {
-        lists {
-            name
-            entries {
-                mediaId 
-                status
-                score
-                progress 
-                progressVolumes 
-                repeat
-                startedAt { year month day }
-                completedAt { year month day }
-                media {
-                    idMal 
-                    id
-                    title { romaji english native }
-                    type 
-                    format 
-                    chapters 
-                    volumes 
-                    status 
-                }
-            }
-        }
-    }
-}
-"""
-
-def validate_backup_files(backup_dir_path):
-    required_files = ['anime.json', 'manga.json', 'animemanga_stats.txt', 
-                     'anime.xml', 'manga.xml', 'meta.json']
-    for filename in required_files:
-        file_path = os.path.join(backup_dir_path, filename)
-        if not os.path.exists(file_path):
-            raise ValueError(f"Missing required file: {filename}")
-        if os.path.getsize(file_path) == 0:
-            raise ValueError(f"Empty file detected: {filename}")
-
-def validate_backup_zip(zip_path):
-    required_files = ['anime.json', 'manga.json', 'animemanga_stats.txt', 
-                     'anime.xml', 'manga.xml', 'meta.json']
-    with zipfile.ZipFile(zip_path, 'r') as zipf:
-        zip_files = zipf.namelist()
-        for req_file in required_files:
-            matching_files = [f for f in zip_files if f.endswith(req_file)]
-            if not matching_files:
-                raise ValueError(f"Missing required file in zip: {req_file}")
-            file_info = zipf.getinfo(matching_files[0])
-            if file_info.file_size == 0:
-                raise ValueError(f"Empty file in zip: {req_file}")
-            if req_file.endswith('.json'):
-                with zipf.open(matching_files[0]) as f:
-                    try:
-                        data = json.load(f)
-                        if not data:
-                             raise ValueError(f"Empty JSON content in: {req_file}")
-                    except json.JSONDecodeError:
-                        raise ValueError(f"Invalid JSON in: {req_file}")
-    return True
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='exporter')
+backup_index = BackupIndex(BACKUP_INDEX_FILE)
+backup_profiler = BackupProfiler(PROFILES_DIR)
+archive_pool = None
+archive_pool_lock = threading.Lock()
+latest_stats_cache = {}
+log_lock = threading.Lock()
+recent_logs = None
+ingest_lock = threading.Lock()
+ingest_status = {'running': False}
+
+def make_storage():
+    if STORAGE_BACKEND == 's3':
+        if not S3_BUCKET:
+            raise RuntimeError("ANIVAULT_S3_BUCKET is required when ANIVAULT_STORAGE=s3.")
+        return S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION, S3_PART_SIZE_MB * 1024 * 1024)
+    if STORAGE_BACKEND != 'local':
+        raise RuntimeError(f"Unknown storage backend '{STORAGE_BACKEND}'. Use 'local' or 's3'.")
+    return LocalStorage(BACKUP_DIR)
+
+storage = make_storage()
+artifact_cache = ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+catalog = StaticCatalog(CATALOG_DIR, backup_index, CATALOG_ARCHIVE_URL, BACKUPS_PAGE_SIZE) if CATALOG_ENABLED else None
+
+StaticAssetHasher(app.static_folder).init_app(app)
+if COMPRESSION_ENABLED:
+    init_compression(app, COMPRESSION_MIN_SIZE)
+mal_xml.on_skip = lambda message: save_log(message, False)
+if MAL_FRAGMENT_CACHE:
+    mal_xml.fragment_cache = FragmentCache(MAL_FRAGMENT_CACHE_FILE)
+anilist_api = AniListAPI(api_url=ANILIST_API_URL, max_concurrency=ANILIST_MAX_CONCURRENCY,
+                         log_error=lambda message: save_log(message, False))
+anilist_transfer_totals = TransferStats()
+backup_journal = BackupJournal(BACKUP_JOURNAL_DIR)
+anilist_cache = ResponseCache(ANILIST_CACHE_DIR, ANILIST_CACHE_TTL,
+                              ANILIST_CACHE_MAX_MB * 1024 * 1024) if ANILIST_CACHE_TTL > 0 else None
 
 def load_config():
     try:
@@ -139,65 +183,79 @@ def load_config():
 
 def save_config(config_to_save):
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config_to_save, f, indent=2)
+        write_json_atomic(CONFIG_FILE, config_to_save, indent=2, durable=True)
         save_log("Configuration saved successfully.", True)
     except Exception as e:
         save_log(f"Error saving config to {CONFIG_FILE}: {str(e)}", False)
 
 def load_latest_stats():
-    try:
-        if os.path.exists(LATEST_STATS_FILE):
-            with open(LATEST_STATS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        save_log(f"Error loading latest stats from {LATEST_STATS_FILE}: {str(e)}", False)
-    return None
+    # LATEST_STATS_FILE is only written by this process, so it is read once and then
+    # served from memory.
+    if 'stats' not in latest_stats_cache:
+        stats = None
+        try:
+            if os.path.exists(LATEST_STATS_FILE):
+                with open(LATEST_STATS_FILE, 'r') as f:
+                    stats = json.load(f)
+        except Exception as e:
+            save_log(f"Error loading latest stats from {LATEST_STATS_FILE}: {str(e)}", False)
+        latest_stats_cache['stats'] = stats
+    return latest_stats_cache['stats']
 
 def save_latest_stats(stats_data):
+    latest_stats_cache['stats'] = stats_data
     try:
-        with open(LATEST_STATS_FILE, 'w') as f:
-            json.dump(stats_data, f, indent=2)
+        write_json_atomic(LATEST_STATS_FILE, stats_data, indent=2)
     except Exception as e:
         save_log(f"Error saving latest stats to {LATEST_STATS_FILE}: {str(e)}", False)
 
+def clear_latest_stats():
+    latest_stats_cache['stats'] = None
+    if os.path.exists(LATEST_STATS_FILE):
+        os.remove(LATEST_STATS_FILE)
+
+def _read_logs_file():
+    if not os.path.exists(LOGS_FILE):
+        return []
+    try:
+        with open(LOGS_FILE, 'r') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"Warning: {LOGS_FILE} was corrupted. Starting with empty logs.")
+    except Exception as e_read:
+        print(f"Error reading {LOGS_FILE}: {e_read}. Starting with empty logs.")
+    return []
+
+def read_logs():
+    """The last MAX_LOGS log entries. LOGS_FILE is read once; after that the entries
+    are kept in memory and the file is only written."""
+    global recent_logs
+    with log_lock:
+        if recent_logs is None:
+            recent_logs = _read_logs_file()
+        return list(recent_logs)
+
 def save_log(message, is_success=False):
+    global recent_logs
     log_entry_data = {
         'timestamp': datetime.now().isoformat(),
         'message': message,
         'is_success': is_success
     }
     try:
-        logs = []
-        if os.path.exists(LOGS_FILE):
-            try:
-                with open(LOGS_FILE, 'r') as f:
-                    logs = json.load(f)
-            except json.JSONDecodeError:
-                print(f"Warning: {LOGS_FILE} was corrupted. Starting with empty logs.")
-                logs = []
-            except Exception as e_read:
-                print(f"Error reading {LOGS_FILE}: {e_read}. Starting with empty logs.")
-                logs = []
-
-        logs.append(log_entry_data)
-        logs = logs[-MAX_LOGS:]
-        
-        with open(LOGS_FILE, 'w') as f:
-            json.dump(logs, f, indent=2)
+        with log_lock:
+            if recent_logs is None:
+                recent_logs = _read_logs_file()
+            recent_logs.append(log_entry_data)
+            recent_logs = recent_logs[-MAX_LOGS:]
+            write_json_atomic(LOGS_FILE, recent_logs, indent=2)
 
         sse_queue.put({'type': 'log_updated', 'data': log_entry_data})
             
     except Exception as e:
         print(f"CRITICAL: Failed to save log entry or send SSE. Log: {log_entry_data}, Error: {e}")
 
-def fetch_anilist_data(username):
-    url = 'https://graphql.anilist.co'
-    response = requests.post(url, json={
-        'query': ANILIST_QUERY, 
-        'variables': {'username': username}
-    })
-    
+def _raise_for_anilist_status(response, username):
     if response.status_code == 404:
         raise Exception(f"User '{username}' not found on AniList.")
     if response.status_code != 200:
@@ -207,249 +265,124 @@ def fetch_anilist_data(username):
         except:
             save_log(f"AniList API error ({response.status_code}): {response.text}", False)
         raise Exception(f'Failed to fetch data from AniList (Status: {response.status_code})')
-    
-    return response.json()
 
+def fetch_anilist_data(username, profile='full', transfer=None):
+    """Both lists of a user, taken from anilist_cache when a recent enough response is
+    there. `transfer.cache` tells where the data came from."""
+    if anilist_cache is None:
+        return fetch_anilist_upstream(username, profile, transfer)
+    data, source = anilist_cache.get(f"{username.lower()}/{profile}",
+                                     lambda: fetch_anilist_upstream(username, profile, transfer))
+    if transfer is not None:
+        transfer.cache = source
+    return data
+
+def fetch_anilist_upstream(username, profile='full', transfer=None):
+    if CONCURRENT_FETCH:
+        return anilist_api.fetch_lists(username, profile, transfer)
+    response = requests.post(ANILIST_API_URL, json={
+        'query': combined_query(profile),
+        'variables': {'username': username}
+    }, headers=REQUEST_HEADERS)
+    if transfer is not None:
+        transfer.add(response)
+    _raise_for_anilist_status(response, username)
+    return response.json()
 
-def calculate_stats(data):
-    anime_entries = []
-    manga_entries = []
-    
-    anime_status_map = { 'watching': 0, 'completed': 0, 'planning': 0, 'dropped': 0, 'on_hold': 0 }
-    manga_status_map = { 'reading': 0, 'completed': 0, 'planning': 0, 'dropped': 0, 'on_hold': 0 }
-    
-    anilist_data_prop = data.get('data', {})
-
-    media_list_collection_anime = anilist_data_prop.get('MediaListCollection')
-    if media_list_collection_anime and media_list_collection_anime.get('lists'):
-        for list_group in media_list_collection_anime['lists']:
-            for entry in list_group.get('entries', []):
-                anime_entries.append(entry)
-                status_key = (entry.get('status', '') or '').lower()
-                if status_key == "current": status_key = "watching"
-                if status_key == "paused": status_key = "on_hold"
-                if status_key == "repeating": status_key = "watching" 
-                if status_key in anime_status_map:
-                    anime_status_map[status_key] += 1
-    
-    media_list_collection_manga = anilist_data_prop.get('MediaListCollection2')
-    if media_list_collection_manga and media_list_collection_manga.get('lists'):
-        for list_group in media_list_collection_manga['lists']:
-            for entry in list_group.get('entries', []):
-                manga_entries.append(entry)
-                status_key = (entry.get('status', '') or '').lower()
-                if status_key == "current": status_key = "reading"
-                if status_key == "paused": status_key = "on_hold"
-                if status_key == "repeating": status_key = "reading" 
-                if status_key in manga_status_map:
-                    manga_status_map[status_key] += 1
-    
-    anime_scores = [e['score'] for e in anime_entries if e.get('score') and e['score'] > 0]
-    manga_scores = [e['score'] for e in manga_entries if e.get('score') and e['score'] > 0]
-
-    anime_stats = {
-        'totalEntries': len(anime_entries),
-        'episodesWatched': sum(entry.get('progress', 0) or 0 for entry in anime_entries),
-        'meanScore': round(sum(anime_scores) / len(anime_scores), 1) if anime_scores else 0,
-        'status': anime_status_map,
-        'username': data.get('username', '') 
-    }
-    
-    manga_stats = {
-        'totalEntries': len(manga_entries),
-        'chaptersRead': sum(entry.get('progress', 0) or 0 for entry in manga_entries),
-        'volumesRead': sum(entry.get('progressVolumes', 0) or 0 for entry in manga_entries),
-        'meanScore': round(sum(manga_scores) / len(manga_scores), 1) if manga_scores else 0,
-        'status': manga_status_map,
-        'username': data.get('username', '') 
-    }
-    
+def open_anilist_stream(username, profile='full'):
+    """Like fetch_anilist_upstream, but returns the unread response so the body can be
+    parsed incrementally. The response cache is not used here."""
+    response = requests.post(ANILIST_API_URL, json={
+        'query': combined_query(profile),
+        'variables': {'username': username}
+    }, headers=REQUEST_HEADERS, stream=True)
+    try:
+        _raise_for_anilist_status(response, username)
+    except Exception:
+        response.close()
+        raise
+    response.raw.decode_content = True
+    return response
+
+
+def export_entry_stream(entries, username, formats, output_dir, generated_at, observers=()):
+    """Feeds (collection_alias, entry) pairs one at a time into the stats accumulators,
+    the `observers` (see calculate_stats) and the streaming writers of `formats`.
+    Returns (anime_stats, manga_stats)."""
+    accumulators = {'anime': StatsAccumulator('anime'), 'manga': StatsAccumulator('manga')}
+    writers = open_stream_writers(formats, output_dir, username, generated_at)
+    for collection_alias, entry in entries:
+        media_type = ANILIST_COLLECTION_TYPES.get(collection_alias)
+        if media_type is None:
+            continue
+        entry = Entry(entry)
+        accumulators[media_type].add(entry)
+        for observer in observers:
+            observer.add(media_type, entry)
+        for writer in writers:
+            writer.add(media_type, entry)
+    anime_stats = accumulators['anime'].result(username)
+    manga_stats = accumulators['manga'].result(username)
+    for writer in writers:
+        writer.close(anime_stats, manga_stats)
     return anime_stats, manga_stats
 
-def format_date_for_mal(date_obj):
-    if date_obj and all(date_obj.get(k) is not None for k in ['year', 'month', 'day']):
-        if date_obj['year'] == 0 or date_obj['month'] == 0 or date_obj['day'] == 0:
-            return "0000-00-00"
-        return f"{date_obj['year']:04d}-{date_obj['month']:02d}-{date_obj['day']:02d}"
-    return "0000-00-00"
-
-def generate_mal_xml(entries, media_type='anime', anilist_username=""):
-    # --- Status Mapping ---
-    # For <my_status> tag, use MAL's textual representation.
-    anilist_to_mal_text_status_map = {
-        'CURRENT': 'Watching' if media_type == 'anime' else 'Reading',
-        'COMPLETED': 'Completed',
-        'PAUSED': 'On-Hold',
-        'DROPPED': 'Dropped',
-        'PLANNING': 'Plan to Watch' if media_type == 'anime' else 'Plan to Read',
-        'REPEATING': 'Watching' if media_type == 'anime' else 'Reading' 
-    }
-    # For <myinfo> block counts, MAL API expects numeric status codes for its own internal summing.
-    # This mapping is only for the <myinfo> block counts.
-    anilist_to_mal_numeric_status_for_myinfo_map = {
-        'CURRENT': '1', 
-        'COMPLETED': '2', 
-        'PAUSED': '3', # MAL On-Hold code
-        'DROPPED': '4', 
-        'PLANNING': '6', 
-        'REPEATING': '1' 
-    }
-
-    anilist_format_to_mal_type = {
-        'TV': 'TV', 'TV_SHORT': 'TV', 'MOVIE': 'Movie', 'SPECIAL': 'Special',
-        'OVA': 'OVA', 'ONA': 'ONA', 'MUSIC': 'Music',
-        'MANGA': 'Manga', 'NOVEL': 'Novel', 'ONE_SHOT': 'One-shot',
-        'DOUJINSHI': 'Doujin', 'MANHWA': 'Manhwa', 'MANHUA': 'Manhua',
-        'OEL': 'OEL'
-    }
-    export_type_code = 1 if media_type == 'anime' else 2
-    
-    processed_entries_xml_parts = []
-    # For myinfo, we need to count based on the status that will be *written* to the item tags if we want to be precise.
-    # Or, more simply, count based on the numeric mapping for MAL's internal categories.
-    myinfo_status_counts_numeric = {'1': 0, '2': 0, '3': 0, '4': 0, '6': 0} 
-    actual_entries_written = 0
-
-    for entry in entries:
-        media_data = entry.get('media', {})
-        
-        series_db_id = media_data.get('idMal')
-        if not series_db_id or int(series_db_id) == 0:
-            series_db_id = entry.get('mediaId') 
-            if not series_db_id or int(series_db_id) == 0:
-                title_for_log = media_data.get('title', {}).get('romaji', 'N/A')
-                save_log(f"Skipping entry for MAL XML: Missing valid MAL ID for '{title_for_log}'. AniList mediaId: {entry.get('mediaId')}, AniList media.idMal: {media_data.get('idMal')}", False)
-                continue
-        
-        actual_entries_written += 1 # Count this entry as it has a valid ID
-
-        # Determine status for myinfo block (numeric)
-        anilist_status_raw = entry.get('status', 'PLANNING')
-        numeric_mal_status_for_myinfo = anilist_to_mal_numeric_status_for_myinfo_map.get(str(anilist_status_raw).upper(), '6')
-        if numeric_mal_status_for_myinfo in myinfo_status_counts_numeric:
-            myinfo_status_counts_numeric[numeric_mal_status_for_myinfo] += 1
-        
-        # Determine status for the individual item tag (textual)
-        my_status_text = anilist_to_mal_text_status_map.get(
-            str(anilist_status_raw).upper(), 
-            'Plan to Watch' if media_type == 'anime' else 'Plan to Read'
-        )
-
-        title_romaji = media_data.get('title', {}).get('romaji', '')
-        title_english = media_data.get('title', {}).get('english', '')
-        title_native = media_data.get('title', {}).get('native', '')
-        title = title_romaji or title_english or title_native or 'N/A Title'
-        title_cdata = f"<![CDATA[{title.replace(']]>', ']]]]><![CDATA[>')}]]>"
-
-        series_type_anilist = media_data.get('format', 'TV' if media_type == 'anime' else 'MANGA')
-        series_type_mal = anilist_format_to_mal_type.get(str(series_type_anilist).upper(), 'TV' if media_type == 'anime' else 'Manga')
-        
-        series_total_episodes = media_data.get('episodes', 0) or 0
-        series_total_chapters = media_data.get('chapters', 0) or 0
-        series_total_volumes = media_data.get('volumes', 0) or 0
-        
-        my_progress = entry.get('progress', 0) or 0
-        my_progress_volumes = entry.get('progressVolumes', 0) or 0
-        
-        raw_score = entry.get('score')
-        my_score = 0
-        if raw_score is not None:
-            try:
-                score_float = float(raw_score)
-                if score_float > 0:
-                    if score_float > 10: my_score = round(score_float / 10.0)
-                    else: my_score = round(score_float)
-                    my_score = max(0, min(10, int(my_score)))
-            except ValueError: my_score = 0
-        
-        my_times_repeated = entry.get('repeat', 0) or 0
-        my_start_date_str = format_date_for_mal(entry.get('startedAt'))
-        my_finish_date_str = format_date_for_mal(entry.get('completedAt'))
-        
-        item_tags_list = []
-        item_tag_name = media_type
-        
-        id_tag_name = 'series_animedb_id' if media_type == 'anime' else 'series_mangadb_id'
-        item_tags_list.append(f"    <{id_tag_name}>{series_db_id}</{id_tag_name}>")
-        item_tags_list.append(f"    <series_title>{title_cdata}</series_title>")
-        item_tags_list.append(f"    <series_type>{series_type_mal}</series_type>")
-        
-        if media_type == 'anime':
-            item_tags_list.append(f"    <series_episodes>{series_total_episodes}</series_episodes>")
-            item_tags_list.append(f"    <my_watched_episodes>{my_progress}</my_watched_episodes>")
-            item_tags_list.append(f"    <my_times_watched>{my_times_repeated}</my_times_watched>")
-            item_tags_list.append(f"    <my_rewatching_ep>0</my_rewatching_ep>")
-        else:
-            item_tags_list.append(f"    <series_chapters>{series_total_chapters}</series_chapters>")
-            item_tags_list.append(f"    <series_volumes>{series_total_volumes}</series_volumes>")
-            item_tags_list.append(f"    <my_read_chapters>{my_progress}</my_read_chapters>")
-            item_tags_list.append(f"    <my_read_volumes>{my_progress_volumes}</my_read_volumes>")
-            item_tags_list.append(f"    <my_times_read>{my_times_repeated}</my_times_read>")
-            item_tags_list.append(f"    <my_rereading_chap>0</my_rereading_chap>")
-
-        item_tags_list.append(f"    <my_id>0</my_id>")
-        item_tags_list.append(f"    <my_start_date>{my_start_date_str}</my_start_date>")
-        item_tags_list.append(f"    <my_finish_date>{my_finish_date_str}</my_finish_date>")
-        item_tags_list.append(f"    <my_rated></my_rated>")
-        item_tags_list.append(f"    <my_score>{my_score}</my_score>")
-        item_tags_list.append(f"    <my_storage></my_storage>")
-        item_tags_list.append(f"    <my_storage_value>0.00</my_storage_value>")
-        item_tags_list.append(f"    <my_status>{my_status_text}</my_status>") # Textual status
-        item_tags_list.append(f"    <my_comments><![CDATA[]]></my_comments>")
-        item_tags_list.append(f"    <my_rewatch_value></my_rewatch_value>")
-        item_tags_list.append(f"    <my_priority>LOW</my_priority>") 
-        item_tags_list.append(f"    <my_tags><![CDATA[]]></my_tags>")
-        item_tags_list.append(f"    <my_discuss>1</my_discuss>")
-        item_tags_list.append(f"    <my_sns>default</my_sns>")
-        item_tags_list.append(f"    <update_on_import>1</update_on_import>")
-
-        processed_entries_xml_parts.append(f"  <{item_tag_name}>\n" + "\n".join(item_tags_list) + f"\n  </{item_tag_name}>")
-
-    # Construct myinfo_block with final counts
-    myinfo_lines = [
-        "  <myinfo>",
-        f"    <user_id></user_id>",
-        f"    <user_name><![CDATA[{anilist_username}]]></user_name>",
-        f"    <user_export_type>{export_type_code}</user_export_type>"
-    ]
-    if media_type == 'anime':
-        myinfo_lines.extend([
-            f"    <user_total_anime>{actual_entries_written}</user_total_anime>",
-            f"    <user_total_watching>{myinfo_status_counts_numeric.get('1',0)}</user_total_watching>",
-            f"    <user_total_completed>{myinfo_status_counts_numeric.get('2',0)}</user_total_completed>",
-            f"    <user_total_onhold>{myinfo_status_counts_numeric.get('3',0)}</user_total_onhold>",
-            f"    <user_total_dropped>{myinfo_status_counts_numeric.get('4',0)}</user_total_dropped>",
-            f"    <user_total_plantowatch>{myinfo_status_counts_numeric.get('6',0)}</user_total_plantowatch>"
-        ])
-    else:
-        myinfo_lines.extend([
-            f"    <user_total_manga>{actual_entries_written}</user_total_manga>",
-            f"    <user_total_reading>{myinfo_status_counts_numeric.get('1',0)}</user_total_reading>",
-            f"    <user_total_completed>{myinfo_status_counts_numeric.get('2',0)}</user_total_completed>",
-            f"    <user_total_onhold>{myinfo_status_counts_numeric.get('3',0)}</user_total_onhold>",
-            f"    <user_total_dropped>{myinfo_status_counts_numeric.get('4',0)}</user_total_dropped>",
-            f"    <user_total_plantoread>{myinfo_status_counts_numeric.get('6',0)}</user_total_plantoread>"
-        ])
-    myinfo_lines.append("  </myinfo>")
-
-    xml_header_and_info = ["""<?xml version="1.0" encoding="UTF-8" ?>
-<!--
- Created by AniVault (AniList Backup Manager)
- Version 1.1.0
--->
-<myanimelist>"""]
-    xml_header_and_info.extend(myinfo_lines)
-    
-    final_xml_content = xml_header_and_info + processed_entries_xml_parts + ["</myanimelist>"]
-    return "\n".join(final_xml_content)
-
-
-def create_backup(username):
+def stream_backup_members(username, formats, output_dir, generated_at, observers=(), profile='full',
+                          transfer=None):
+    """Streaming counterpart of the fetch/flatten/export steps: entries go from the HTTP
+    body straight into the export writers without the full response being held."""
+    response = open_anilist_stream(username, profile)
+    try:
+        return export_entry_stream(iter_anilist_entries(response.raw), username, formats, output_dir, generated_at,
+                                   observers)
+    finally:
+        if transfer is not None:
+            transfer.add_stream(response)
+        response.close()
+
+
+def get_archive_pool():
+    """The process pool for EXPORT_MODE='processes', started on first use."""
+    global archive_pool
+    with archive_pool_lock:
+        if archive_pool is None:
+            archive_pool = ProcessPoolExecutor(max_workers=EXPORT_PROCESSES, initializer=archive_builder.init_worker)
+        return archive_pool
+
+def resolve_query_profile(profile, formats):
+    """The AniList query profile for a backup: `profile` (default QUERY_PROFILE), but
+    'full' whenever a selected format needs more than the lean fields."""
+    profile = (profile or QUERY_PROFILE).lower()
+    if profile not in BACKUP_QUERY_PROFILES:
+        raise ValueError(f"Unknown query profile '{profile}'. Use one of: {', '.join(BACKUP_QUERY_PROFILES)}.")
+    return profile if profile == 'full' or supports_lean(formats) else 'full'
+
+def record_transfer(username, profile, transfer):
+    """Logs the size of an AniList fetch and adds it to the /metrics totals."""
+    anilist_transfer_totals.merge(transfer)
+    if transfer.cache in ('hit', 'coalesced'):
+        save_log(f"AniList data for {username} ({profile} profile) served from the response cache.", True)
+        return
+    decoded = f", {transfer.bytes / 1024:.0f} KB decoded" if transfer.bytes else ""
+    save_log(f"AniList fetch for {username} ({profile} profile): {transfer.requests} request(s), "
+             f"{transfer.wire_bytes / 1024:.0f} KB transferred{decoded}, {transfer.upstream_ms / 1000:.2f}s upstream.", True)
+
+def create_backup(username, formats=None, query_profile=None):
+    trace = Trace()
+    profile_label = f"{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    with backup_profiler.profile(profile_label) as profiling:
+        if profiling:
+            save_log(f"Profiling backup for {username} (profile: {profile_label}.prof)", True)
+        return _create_backup(username, formats, trace, profiling, query_profile)
+
+def _create_backup(username, formats, trace, profiling=False, query_profile=None):
     save_log(f"Attempting to create backup for user: {username}", is_success=True)
     try:
-        raw_data = fetch_anilist_data(username)
-        raw_data['username'] = username 
-        anime_stats, manga_stats = calculate_stats(raw_data)
+        formats = resolve_formats(formats)
+        archived_formats = [name for name in formats if name in REQUIRED_FORMATS] if LAZY_EXPORTS else formats
+        streaming = STREAMING_PARSE and supports_streaming(archived_formats)
+        # Lazily derived formats are rendered from the archived JSON later, so all selected formats count.
+        query_profile = resolve_query_profile(query_profile, formats)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_id = f"{username}_{timestamp}"
@@ -457,164 +390,562 @@ def create_backup(username):
         
         temp_staging_dir_path = os.path.join(BACKUP_DIR, f"_TEMP_{backup_id}")
         os.makedirs(temp_staging_dir_path, exist_ok=True)
-        zip_path_final = os.path.join(BACKUP_DIR, f"{backup_id}.zip")
+        backup_key = shard_key(backup_id)
+        backup_journal.record(backup_id, 'started', username=username, staging=temp_staging_dir_path, key=backup_key)
+        # Built and validated inside the staging dir, then handed to the storage backend.
+        in_process_pool = EXPORT_MODE == 'processes' and not streaming and not profiling
+        stored = False
 
         try:
-            anime_data_list = []
-            manga_data_list = []
-            
-            anilist_data_prop = raw_data.get('data', {})
-            media_list_collection_anime = anilist_data_prop.get('MediaListCollection')
-            if media_list_collection_anime and media_list_collection_anime.get('lists'):
-                for list_group in media_list_collection_anime['lists']:
-                    anime_data_list.extend(list_group.get('entries', []))
-                    
-            media_list_collection_manga = anilist_data_prop.get('MediaListCollection2')
-            if media_list_collection_manga and media_list_collection_manga.get('lists'):
-                for list_group in media_list_collection_manga['lists']:
-                    manga_data_list.extend(list_group.get('entries', []))
-
-            with open(os.path.join(temp_staging_dir_path, 'anime.json'), 'w', encoding='utf-8') as f:
-                json.dump(anime_data_list, f, ensure_ascii=False, indent=2)
-            with open(os.path.join(temp_staging_dir_path, 'manga.json'), 'w', encoding='utf-8') as f:
-                json.dump(manga_data_list, f, ensure_ascii=False, indent=2)
-
-            stats_text = f"""Anime & Manga Statistics for {username}
-Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{json.dumps({'anime': anime_stats, 'manga': manga_stats}, indent=2)}
-"""
-            with open(os.path.join(temp_staging_dir_path, 'animemanga_stats.txt'), 'w', encoding='utf-8') as f:
-                f.write(stats_text)
-
-            anime_xml = generate_mal_xml(anime_data_list, 'anime', username)
-            manga_xml = generate_mal_xml(manga_data_list, 'manga', username)
-            with open(os.path.join(temp_staging_dir_path, 'anime.xml'), 'w', encoding='utf-8') as f: f.write(anime_xml)
-            with open(os.path.join(temp_staging_dir_path, 'manga.xml'), 'w', encoding='utf-8') as f: f.write(manga_xml)
+            generated_at = datetime.now()
+            activity = ActivityAccumulator()
+            fingerprint = ListFingerprint()
+            transfer = TransferStats()
+            if streaming:
+                # Fetch, parse, stats and all exports are interleaved entry by entry here.
+                with trace.span('stream_export', formats=archived_formats):
+                    anime_stats, manga_stats = stream_backup_members(username, archived_formats, temp_staging_dir_path,
+                                                                     generated_at, (activity, fingerprint),
+                                                                     query_profile, transfer)
+                entries_by_type = None
+            else:
+                with trace.span('fetch', profile=query_profile):
+                    raw_data = fetch_anilist_data(username, query_profile, transfer)
+                with trace.span('flatten'):
+                    # Parsed once; stats, exporters and the backup index all read these.
+                    anime_data_list = collection_entries(raw_data, 'MediaListCollection')
+                    manga_data_list = collection_entries(raw_data, 'MediaListCollection2')
+                with trace.span('stats'):
+                    anime_stats, manga_stats = calculate_stats(anime_data_list, manga_data_list, username,
+                                                               (activity, fingerprint))
+                entries_by_type = {'anime': anime_data_list, 'manga': manga_data_list}
+
+                if not in_process_pool:
+                    export_context = ExportContext(username, anime_data_list, manga_data_list,
+                                                   anime_stats, manga_stats, generated_at)
+                    with trace.span('export'):
+                        run_exporters(export_context, archived_formats, temp_staging_dir_path,
+                                      None if profiling else export_executor, trace)
             
+            # meta.json carries the spans up to this point; the complete trace (zip,
+            # validation, index update) is stored in the backup index and sent via SSE.
             meta_data = {
                 'id': backup_id, 'date': datetime.now().isoformat(), 'username': username,
-                'stats': {'anime': anime_stats, 'manga': manga_stats}
+                'stats': {'anime': anime_stats, 'manga': manga_stats}, 'formats': formats,
+                'archived_formats': archived_formats, 'generated_at': generated_at.isoformat(),
+                'query_profile': query_profile, 'anilist_transfer': transfer.to_dict(),
+                'list_fingerprint': fingerprint.hexdigest(), 'trace': trace.to_dict()
             }
-            with open(os.path.join(temp_staging_dir_path, 'meta.json'), 'w', encoding='utf-8') as f:
-                json.dump(meta_data, f, ensure_ascii=False, indent=2)
-            
-            validate_backup_files(temp_staging_dir_path)
-
-            with zipfile.ZipFile(zip_path_final, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for filename in ['anime.json', 'manga.json', 'animemanga_stats.txt', 'anime.xml', 'manga.xml', 'meta.json']:
-                    zipf.write(os.path.join(temp_staging_dir_path, filename), filename)
-            
-            validate_backup_zip(zip_path_final)
-
+            record_transfer(username, query_profile, transfer)
+            if not in_process_pool:
+                # Recovery rebuilds the archive from these files, so they must be on disk first.
+                sync_directory(temp_staging_dir_path)
+                backup_journal.record(backup_id, 'exported', meta=meta_data)
+            if in_process_pool:
+                # Only the raw entries go to the worker; it returns the path of the finished zip.
+                raw_entries = {media_type: [entry.raw for entry in entries]
+                               for media_type, entries in entries_by_type.items()}
+                with trace.span('archive', mode='process'):
+                    future = get_archive_pool().submit(archive_builder.build_archive, raw_entries, anime_stats,
+                                                       manga_stats, generated_at, temp_staging_dir_path,
+                                                       meta_data, trace.total_ms())
+                    zip_path_final, worker_spans = future.result()
+                trace.add_spans(worker_spans)
+            else:
+                zip_path_final = finish_archive(temp_staging_dir_path, meta_data, trace)
+            sync_directory(temp_staging_dir_path)
+            backup_journal.record(backup_id, 'archived', meta=meta_data, zip=zip_path_final)
+            zip_size = os.path.getsize(zip_path_final)
+            with trace.span('store', backend=STORAGE_BACKEND):
+                storage.put_file(backup_key, zip_path_final)
+            stored = True
+            backup_journal.record(backup_id, 'stored')
+            with trace.span('index'):
+                backup_index.add(meta_data, backup_key, zip_size)
+                if entries_by_type is None:
+                    # Streaming mode: re-read the staged JSON members lazily instead of keeping entries around.
+                    for index_update in [backup_index.index_entries, backup_index.record_history]:
+                        with open(os.path.join(temp_staging_dir_path, 'anime.json'), 'rb') as f_anime, \
+                             open(os.path.join(temp_staging_dir_path, 'manga.json'), 'rb') as f_manga:
+                            index_update(backup_id, {'anime': map(Entry, iter_json_array(f_anime)),
+                                                     'manga': map(Entry, iter_json_array(f_manga))})
+                else:
+                    backup_index.index_entries(backup_id, entries_by_type)
+                    backup_index.record_history(backup_id, entries_by_type)
+                backup_index.set_activity(backup_id, activity.rows())
+            if catalog is not None:
+                with trace.span('catalog'):
+                    update_catalog(catalog.backup_added, backup_id)
+
+            meta_data['trace'] = trace.to_dict()
+            backup_index.set_trace(backup_id, meta_data['trace'])
             save_latest_stats({'anime': anime_stats, 'manga': manga_stats, 'username': username, 'last_updated': meta_data['date']})
-            sse_queue.put({'type': 'backup_created', 'data': {'username': username, 'timestamp': meta_data['date'], 'stats': {'anime': anime_stats, 'manga': manga_stats}}})
-            save_log(f"Successfully created backup for {username}. ID: {backup_id}", True)
+            sse_queue.put({'type': 'backup_created', 'data': {'username': username, 'timestamp': meta_data['date'], 'stats': {'anime': anime_stats, 'manga': manga_stats},
+                                                              'id': backup_id, 'trace': meta_data['trace']}})
+            save_log(f"Successfully created backup for {username}. ID: {backup_id} ({meta_data['trace']['total_ms'] / 1000:.2f}s)", True)
             return meta_data
 
         except Exception as e_inner:
-            if os.path.exists(zip_path_final): os.remove(zip_path_final)
+            if stored:
+                storage.delete(backup_key)
+                backup_index.remove(backup_id)
             save_log(f"Inner backup process failed for {username}: {str(e_inner)}", False)
+            sse_queue.put({'type': 'backup_failed', 'data': {'username': username, 'error': str(e_inner), 'trace': trace.to_dict()}})
             raise
         finally:
             if os.path.exists(temp_staging_dir_path):
                 shutil.rmtree(temp_staging_dir_path)
+            backup_journal.finish(backup_id)
             
     except Exception as e:
         save_log(f"Overall backup creation failed for {username}: {str(e)}", False)
         raise 
 
-def auto_backup_task():
-    global auto_backup_config
-    while not stop_auto_backup.is_set():
+def lists_unchanged(username):
+    """Probes AniList with the small 'stats' query profile and compares the list
+    fingerprint with the one of the user's latest backup."""
+    latest, _, _ = backup_index.list_backups(username=username, sort='desc', limit=1)
+    if not latest:
+        return False
+    backup_key = locate_backup(latest[0]['id'])
+    previous = (read_backup_meta(backup_key) or {}).get('list_fingerprint') if backup_key else None
+    if not previous:
+        return False
+    transfer = TransferStats()
+    raw_data = fetch_anilist_data(username, 'stats', transfer)
+    record_transfer(username, 'stats', transfer)
+    current = list_fingerprint({'anime': collection_entries(raw_data, 'MediaListCollection'),
+                                'manga': collection_entries(raw_data, 'MediaListCollection2')})
+    return current == previous
+
+def run_auto_backup():
+    """One scheduled auto-backup run: create a backup, then prune to keepLast."""
+    config = auto_backup_config
+    if not config or not config.get('username'):
+        raise Exception("Auto backup configuration is missing a username.")
+    username = config['username']
+    keep_last = int(config.get('keepLast', 1))
+
+    if config.get('skipUnchanged') and lists_unchanged(username):
+        save_log(f"Auto backup task: The lists of {username} have not changed since the last backup; skipping.", True)
+        return
+    save_log(f"Auto backup task: Starting backup for {username}.", True)
+    create_backup(username, config.get('formats'), config.get('queryProfile'))
+    with backup_lock:
+        backups = get_user_backups(username)
+        if len(backups) > keep_last:
+            backups_to_delete = sorted(backups, key=lambda x: x['date'])[:-keep_last]
+            for backup_meta in backups_to_delete:
+                save_log(f"Auto backup: Deleting old backup {backup_meta['id']} for user {username}", True)
+                delete_backup_file(backup_meta['id'])
+
+def on_scheduler_error(job_id, error):
+    save_log(f"Scheduled job '{job_id}' failed: {str(error)}", False)
+    sse_queue.put({'type': 'job_failed', 'data': {'job': job_id, 'error': str(error)}})
+
+scheduler = Scheduler(SCHEDULER_STATE_FILE, on_error=on_scheduler_error)
+
+def on_scrub_event(event_type, data):
+    sse_queue.put({'type': event_type, 'data': data})
+    if event_type == 'scrub_finding':
+        action = f" Moved to {data['quarantine_key']}." if data.get('quarantine_key') else ""
+        if data['status'] == 'unrecognized':
+            action = " Left in place; legacy archives can be imported with 'app.py ingest'."
+        save_log(f"Integrity check: backup {data['id']} is {data['status']} ({data.get('error')}).{action}", False)
+    elif event_type == 'scrub_finished':
+        problems = data['corrupt'] + data['missing'] + data['errors']
+        save_log(f"Integrity check finished: {data['checked']} of {data['total']} archive(s) checked, "
+                 f"{data['corrupt']} corrupt, {data['missing']} missing, {data['unrecognized']} unrecognized, "
+                 f"{data['errors']} error(s) "
+                 f"in {data['duration_seconds']}s.", problems == 0)
+        if data['corrupt'] and catalog is not None:
+            update_catalog(catalog.rebuild)  # quarantined archives left the index
+
+scrubber = ArchiveScrubber(storage, backup_index, SCRUB_WORKERS, SCRUB_MAX_MB_PER_S * 1024 * 1024,
+                           on_event=on_scrub_event, on_quarantine=artifact_cache.invalidate)
+
+def start_scrub():
+    """Runs an integrity pass on its own thread. A pass takes long (it is throttled), and
+    the scheduler thread must stay free for due backups. Does nothing if a pass is
+    already running."""
+    def run():
         try:
-            if auto_backup_config:
-                username = auto_backup_config.get('username')
-                keep_last = int(auto_backup_config.get('keepLast', 1))
-                interval_hours = float(auto_backup_config.get('interval', 24))
-
-                if not username:
-                    save_log("Auto backup task: Username missing in config. Stopping task.", False)
-                    stop_auto_backup.set() 
-                    auto_backup_config = None 
-                    if os.path.exists(CONFIG_FILE): os.remove(CONFIG_FILE)
-                    break 
-
-                save_log(f"Auto backup task: Starting backup for {username}.", True)
-                try:
-                    create_backup(username)
-                    with backup_lock:
-                        backups = get_user_backups(username)
-                        if len(backups) > keep_last:
-                            backups_to_delete = sorted(backups, key=lambda x: x['date'])[:-keep_last]
-                            for backup_meta in backups_to_delete:
-                                save_log(f"Auto backup: Deleting old backup {backup_meta['id']} for user {username}", True)
-                                delete_backup_file(backup_meta['id'])
-                except Exception as backup_error:
-                    save_log(f"Auto backup task error during backup/cleanup for {username}: {str(backup_error)}", False)
-                
-                sleep_duration_seconds = interval_hours * 3600
-                sleep_interval_check = 60 
-                elapsed_sleep = 0
-                while elapsed_sleep < sleep_duration_seconds and not stop_auto_backup.is_set():
-                    time.sleep(min(sleep_interval_check, sleep_duration_seconds - elapsed_sleep))
-                    elapsed_sleep += sleep_interval_check
-            else: 
-                if stop_auto_backup.is_set(): break
-                save_log("Auto backup task: No configuration found. Waiting for configuration.", False)
-                time.sleep(300) 
+            scrubber.run()
         except Exception as e:
-            save_log(f"Critical error in auto backup loop: {str(e)}", False)
-            time.sleep(60)
+            on_scheduler_error(SCRUB_JOB, e)
+    threading.Thread(target=run, name='scrub', daemon=True).start()
+
+def schedule_auto_backup(config, run_immediately=False):
+    """(Re)schedules the auto-backup job from a config dict. Without `run_immediately`,
+    the first run follows the persisted schedule, or the user's latest backup."""
+    last_run = None
+    if not run_immediately:
+        latest, _, _ = backup_index.list_backups(username=config['username'], sort='desc', limit=1)
+        if latest:
+            last_run = datetime.fromisoformat(latest[0]['date']).timestamp()
+    jitter_minutes = float(config.get('jitterMinutes') or 0)
+    scheduler.add_job(AUTO_BACKUP_JOB, run_auto_backup,
+                      interval_hours=None if config.get('cron') else float(config['interval']),
+                      cron=config.get('cron'), jitter_seconds=jitter_minutes * 60,
+                      run_immediately=run_immediately, last_run=last_run)
+
+def describe_schedule(config):
+    if config.get('cron'):
+        return f"cron '{config['cron']}'"
+    return f"interval: {config.get('interval')} hours"
+
+
+def locate_backup(backup_id):
+    """Storage key of a backup, or None if it does not exist. Only the backup's own
+    shard is looked at (and its flat key, until the layout migration has moved it)."""
+    for backup_key in dict.fromkeys([shard_key(backup_id), legacy_key(backup_id)]):
+        if storage.exists(backup_key):
+            return backup_key
+    return None
 
+def read_backup_meta(backup_key):
+    with storage.open(backup_key) as f_zip, zipfile.ZipFile(f_zip, 'r') as zipf:
+        if 'meta.json' not in zipf.namelist():
+            return None
+        with zipf.open('meta.json') as f_meta:
+            return json.load(io.TextIOWrapper(f_meta, encoding='utf-8'))
+
+def read_backup_entries(backup_key):
+    entries_by_type = {}
+    with storage.open(backup_key) as f_zip, zipfile.ZipFile(f_zip, 'r') as zipf:
+        for media_type in ['anime', 'manga']:
+            with zipf.open(f'{media_type}.json') as f_entries:
+                entries_by_type[media_type] = parse_entries(json.load(io.TextIOWrapper(f_entries, encoding='utf-8')))
+    return entries_by_type
+
+def read_backup_written_at(backup_key):
+    """When the archive's members were written, from the zip's own timestamps (the
+    storage backends keep no modification time of their own)."""
+    with storage.open(backup_key) as f_zip, zipfile.ZipFile(f_zip, 'r') as zipf:
+        times = [info.date_time for info in zipf.infolist()]
+    return datetime(*max(times)) if times else datetime.now()
+
+def archived_formats_of(meta):
+    """Formats stored inside the archive; backups from before lazy exports hold all of them."""
+    return meta.get('archived_formats') or meta.get('formats') or DEFAULT_FORMATS
+
+def exporter_for_member(member):
+    for exporter in EXPORTERS.values():
+        if member in exporter.members:
+            return exporter
+    return None
+
+def generate_derived_export(backup_key, meta, format_name, output_dir):
+    """Renders one export format of a stored backup from its canonical JSON."""
+    entries_by_type = read_backup_entries(backup_key)
+    stats = meta.get('stats') or {}
+    # Hand-made or very old archives may carry neither timestamp in their meta.json.
+    generated_at = meta.get('generated_at') or meta.get('date')
+    generated_at = datetime.fromisoformat(generated_at) if generated_at else read_backup_written_at(backup_key)
+    context = ExportContext(meta.get('username', 'N/A'), entries_by_type['anime'], entries_by_type['manga'],
+                            stats.get('anime', {}), stats.get('manga', {}), generated_at)
+    run_exporters(context, [format_name], output_dir, None)
+
+def sync_backup_index():
+    """Reconciles the backup index with the archives in storage (e.g. after manual copies or an upgrade)."""
+    try:
+        indexed = backup_index.filenames()
+        on_disk = set()
+        added = 0
+        for filename, size in storage.list('.zip'):
+            if not is_backup_key(filename):
+                continue
+            on_disk.add(filename)
+            if filename in indexed:
+                continue
+            try:
+                backup_data = read_backup_meta(filename)
+                if backup_data is None:
+                    save_log(f"meta.json not found in backup {filename}", False)
+                    continue
+                backup_data.setdefault('id', backup_id_of(filename))
+                backup_index.add(backup_data, filename, size)
+                added += 1
+            except (zipfile.BadZipFile, json.JSONDecodeError) as e_zip:
+                save_log(f"Corrupted backup file {filename} or meta.json: {str(e_zip)}", False)
+            except Exception as e_inner:
+                save_log(f"Error processing backup file {filename}: {str(e_inner)}", False)
+        removed = 0
+        for filename, backup_id in indexed.items():
+            if filename not in on_disk:
+                backup_index.remove(backup_id)
+                removed += 1
+        reindexed = 0
+        for backup_id, filename in backup_index.unindexed_backups():
+            try:
+                entries_by_type = read_backup_entries(filename)
+                history_types = (read_backup_meta(filename) or {}).get('history_types')
+                backup_index.index_entries(backup_id, entries_by_type)
+                backup_index.record_history(backup_id, entries_by_type if history_types is None else
+                                            {t: entries_by_type[t] for t in history_types})
+                backup_index.set_activity(backup_id, calculate_activity(entries_by_type))
+                reindexed += 1
+            except Exception as e_entries:
+                save_log(f"Could not index titles of backup {filename}: {str(e_entries)}", False)
+        # Backups indexed before the activity calendar existed only need that step: running
+        # record_history again would re-pin the next backup's history to this one.
+        for backup_id, filename in backup_index.backups_without_activity():
+            try:
+                backup_index.set_activity(backup_id, calculate_activity(read_backup_entries(filename)))
+                reindexed += 1
+            except Exception as e_activity:
+                save_log(f"Could not record the activity of backup {filename}: {str(e_activity)}", False)
+        if (added or removed) and catalog is not None:
+            update_catalog(catalog.rebuild)
+        if added or removed or reindexed:
+            save_log(f"Backup index synchronized: {added} added, {removed} removed, {reindexed} title-indexed.", True)
+    except Exception as e:
+        save_log(f"Error synchronizing backup index with {STORAGE_BACKEND} storage: {str(e)}", False)
+
+def recover_interrupted_backups():
+    """Finishes or cleans up backup runs that were interrupted (process killed, power
+    loss), going by their journal records. A run that got as far as 'exported' is
+    archived and stored from its staging folder instead of being fetched and exported
+    again; earlier runs are discarded. sync_backup_index() indexes the recovered
+    archives afterwards. Staging folders without a record are removed."""
+    for record in backup_journal.pending():
+        backup_id = record['id']
+        stage = record.get('stage')
+        try:
+            if stage in ('exported', 'archived'):
+                meta = record['meta']
+                if not storage.exists(record['key']):
+                    zip_path = record.get('zip')
+                    required_files = members_for_formats(meta['archived_formats']) + ['meta.json']
+                    try:
+                        validate_backup_zip(zip_path, required_files)
+                    except Exception:
+                        zip_path = finish_archive(record['staging'], meta)
+                    storage.put_file(record['key'], zip_path)
+            if stage in ('exported', 'archived', 'stored'):
+                meta = record.get('meta') or {}
+                latest = load_latest_stats() or {}
+                if meta.get('date', '') > latest.get('last_updated', ''):
+                    save_latest_stats({'anime': meta['stats']['anime'], 'manga': meta['stats']['manga'],
+                                       'username': meta['username'], 'last_updated': meta['date']})
+                save_log(f"Recovered interrupted backup {backup_id} (interrupted after stage '{stage}').", True)
+            else:
+                save_log(f"Discarded interrupted backup {backup_id}: it was stopped before its exports were complete.", False)
+        except Exception as e:
+            save_log(f"Could not recover interrupted backup {backup_id}: {str(e)}", False)
+        finally:
+            if record.get('staging'):
+                shutil.rmtree(record['staging'], ignore_errors=True)
+            backup_journal.finish(backup_id)
+    for name in os.listdir(BACKUP_DIR):
+        path = os.path.join(BACKUP_DIR, name)
+        if name.startswith('_TEMP_') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            save_log(f"Removed leftover staging folder {name}.", True)
+
+def migrate_backup_layout():
+    """Moves archives of the old flat layout (BACKUP_DIR/<id>.zip) into the per-user
+    shards (BACKUP_DIR/<user>/<yyyy>/<mm>/<id>.zip). Runs while the app is serving:
+    lookups go through locate_backup(), which also finds archives not moved yet.
+    Once everything is moved, a run only lists the (then empty) top level."""
+    moved = 0
+    try:
+        flat_keys = [key for key, _ in storage.list('.zip', recursive=False) if is_backup_key(key)]
+        for backup_key in flat_keys:
+            backup_id = backup_id_of(backup_key)
+            new_key = shard_key(backup_id)
+            if new_key == backup_key:
+                continue
+            try:
+                storage.move(backup_key, new_key)
+            except FileNotFoundError:
+                continue  # deleted in the meantime
+            backup_index.set_filename(backup_id, new_key)
+            moved += 1
+        if moved:
+            save_log(f"Moved {moved} backup archive(s) into the per-user folder layout.", True)
+    except Exception as e:
+        save_log(f"Error migrating backups to the per-user folder layout after {moved} archive(s): {str(e)}", False)
 
 def get_user_backups(username_filter=None):
-    backups = []
-    if not os.path.exists(BACKUP_DIR):
+    try:
+        backups, _, _ = backup_index.list_backups(username=username_filter)
         return backups
+    except Exception as e:
+        save_log(f"Error listing user backups from index: {str(e)}", False)
+        return []
+
+def update_catalog(update, *args):
+    """Runs a StaticCatalog update; a failure is logged but never fails the caller."""
     try:
-        for filename in os.listdir(BACKUP_DIR):
-            if filename.endswith('.zip') and not filename.startswith("_TEMP_"):
-                if username_filter and not filename.startswith(f"{username_filter}_"):
-                    continue
-                try:
-                    zip_file_path = os.path.join(BACKUP_DIR, filename)
-                    with zipfile.ZipFile(zip_file_path, 'r') as zipf:
-                        if 'meta.json' in zipf.namelist():
-                            with zipf.open('meta.json') as f_meta:
-                                backup_data = json.load(io.TextIOWrapper(f_meta, encoding='utf-8'))
-                                backups.append({
-                                    'id': backup_data.get('id', filename[:-4]),
-                                    'date': backup_data.get('date', 'N/A'),
-                                    'username': backup_data.get('username', 'N/A'),
-                                    'content': f"{backup_data.get('stats', {}).get('anime', {}).get('totalEntries', 0)} Anime, {backup_data.get('stats', {}).get('manga', {}).get('totalEntries', 0)} Manga"
-                                })
-                        else:
-                            save_log(f"meta.json not found in backup {filename}", False)
-                except (zipfile.BadZipFile, json.JSONDecodeError) as e_zip:
-                    save_log(f"Corrupted backup file {filename} or meta.json: {str(e_zip)}", False)
-                except Exception as e_inner:
-                     save_log(f"Error processing backup file {filename}: {str(e_inner)}", False)
+        update(*args)
     except Exception as e:
-        save_log(f"Error listing user backups from {BACKUP_DIR}: {str(e)}", False)
-    return sorted(backups, key=lambda x: x['date'], reverse=True)
+        save_log(f"Error updating the static catalog in {CATALOG_DIR}: {str(e)}", False)
 
 def delete_backup_file(backup_id):
     try:
-        backup_path = os.path.join(BACKUP_DIR, f"{backup_id}.zip")
-        if os.path.exists(backup_path):
-            os.remove(backup_path)
+        artifact_cache.invalidate(backup_id)
+        backup_key = locate_backup(backup_id)
+        indexed = backup_index.get(backup_id) if catalog is not None else None
+        if backup_key and storage.delete(backup_key):
+            backup_index.remove(backup_id)
+            if indexed:
+                update_catalog(catalog.backup_removed, indexed)
             save_log(f"Deleted backup {backup_id}", True)
             return True
+        backup_index.remove(backup_id)
+        if indexed:
+            update_catalog(catalog.backup_removed, indexed)
         save_log(f"Attempted to delete non-existent backup {backup_id}", False)
         return False
     except Exception as e:
         save_log(f"Error deleting backup file {backup_id}: {str(e)}", False)
         return False
 
+def load_ingest_state():
+    try:
+        if os.path.exists(INGEST_STATE_FILE):
+            with open(INGEST_STATE_FILE, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        save_log(f"Error loading ingest state from {INGEST_STATE_FILE}: {str(e)}", False)
+    return {}
+
+def save_ingest_state(state):
+    write_json_atomic(INGEST_STATE_FILE, state)
+
+def register_ingested_backup(result):
+    """Stores a converted archive and adds it to the index. Returns the backup id, or
+    None if a backup with that id already exists."""
+    meta = result['meta']
+    backup_key = shard_key(meta['id'])
+    try:
+        if backup_index.get(meta['id']) or locate_backup(meta['id']):
+            return None
+        zip_size = os.path.getsize(result['zip_path'])
+        storage.put_file(backup_key, result['zip_path'])
+        backup_index.add(meta, backup_key, zip_size)
+        entries_by_type = {t: parse_entries(raw) for t, raw in result['entries'].items()}
+        backup_index.index_entries(meta['id'], entries_by_type)
+        backup_index.record_history(meta['id'], entries_by_type)
+        backup_index.set_activity(meta['id'], calculate_activity(entries_by_type))
+        return meta['id']
+    finally:
+        shutil.rmtree(result['staging'], ignore_errors=True)
+
+def run_ingest(directory, formats=None, workers=INGEST_WORKERS, on_progress=None):
+    """Converts all legacy archives and MAL XML exports below `directory` into regular
+    backups. Files are parsed and converted in a process pool; storing and indexing
+    happen here. Files imported by an earlier run are skipped (the state is kept in
+    INGEST_STATE_FILE), so an interrupted run can simply be started again."""
+    formats = resolve_formats(formats)
+    formats = [name for name in formats if name in REQUIRED_FORMATS] if LAZY_EXPORTS else formats
+    state = load_ingest_state()
+    sources = ingest.find_sources(directory)
+    keys = {path: ingest.source_key(path) for path in sources}
+    pending = [path for path in sources if state.get(keys[path], {}).get('status') not in ('imported', 'skipped')]
+    status = {'running': True, 'directory': directory, 'total': len(sources), 'done': len(sources) - len(pending),
+              'imported': 0, 'skipped': 0, 'failed': 0, 'started': datetime.now().isoformat(), 'finished': None}
+    ingest_status.update(status)
+    save_log(f"Ingest of {directory}: {len(pending)} of {len(sources)} file(s) to process "
+             f"with {workers} worker(s).", True)
+
+    def record(path, result):
+        ingest_status['done'] += 1
+        ingest_status[result['status']] += 1
+        state[keys[path]] = result
+        if on_progress:
+            on_progress(dict(ingest_status))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=archive_builder.init_worker) as pool:
+            futures = {pool.submit(ingest.convert_source, path, BACKUP_DIR, formats): path for path in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    result = future.result()
+                    if 'skipped' in result:
+                        record(path, {'status': 'skipped', 'reason': result['skipped']})
+                        continue
+                    backup_id = register_ingested_backup(result)
+                    if backup_id is None:
+                        record(path, {'status': 'skipped', 'reason': f"backup {result['meta']['id']} already exists"})
+                    else:
+                        record(path, {'status': 'imported', 'backup_id': backup_id})
+                except Exception as e:
+                    save_log(f"Ingest: could not convert {path}: {str(e)}", False)
+                    record(path, {'status': 'failed', 'error': str(e)})
+                if i % 50 == 0:
+                    save_ingest_state(state)
+    finally:
+        save_ingest_state(state)
+        ingest_status.update({'running': False, 'finished': datetime.now().isoformat()})
+        if ingest_status['imported'] and catalog is not None:
+            update_catalog(catalog.rebuild)
+    save_log(f"Ingest of {directory} finished: {ingest_status['imported']} imported, "
+             f"{ingest_status['skipped']} skipped, {ingest_status['failed']} failed.",
+             ingest_status['failed'] == 0)
+    return dict(ingest_status)
+
+def ingest_in_background(directory, formats, workers):
+    last_event = [0.0]
+
+    def publish(status):
+        # At most ~4 progress events per second, plus the final one.
+        now = datetime.now().timestamp()
+        if now - last_event[0] >= 0.25 or status['done'] == status['total']:
+            last_event[0] = now
+            sse_queue.put({'type': 'ingest_progress', 'data': status})
+
+    try:
+        status = run_ingest(directory, formats, workers, on_progress=publish)
+        sse_queue.put({'type': 'ingest_finished', 'data': status})
+    except Exception as e:
+        save_log(f"Ingest of {directory} failed: {str(e)}", False)
+        sse_queue.put({'type': 'ingest_finished', 'data': dict(ingest_status, error=str(e))})
+    finally:
+        ingest_lock.release()
+
+def auto_backup_status():
+    schedule = scheduler.status(AUTO_BACKUP_JOB)
+    is_running = schedule is not None
+    current_config_to_display = auto_backup_config if is_running else load_config()
+    return {'running': is_running, 'config': current_config_to_display, 'schedule': schedule}
+
+def exporter_list():
+    return [{'name': e.name, 'label': e.label, 'members': e.members, 'default': e.name in DEFAULT_FORMATS}
+            for e in EXPORTERS.values()]
+
+def bootstrap_state():
+    """Everything the dashboard shows on load (what /latest-stats, /auto-backup-status,
+    /exporters, the first /backups page and /logs return), from memory and the index."""
+    backups, next_cursor, total = backup_index.list_backups(limit=BACKUPS_PAGE_SIZE)
+    return {
+        'latest_stats': load_latest_stats() or {},
+        'auto_backup': auto_backup_status(),
+        'exporters': exporter_list(),
+        'backups': {'backups': backups, 'next_cursor': next_cursor, 'total': total},
+        'logs': read_logs()
+    }
+
 @app.route('/')
 def index():
-    latest_stats_data = load_latest_stats()
-    return render_template('index.html', latest_stats=latest_stats_data)
+    # The initial state is embedded, so the page needs no further request to render.
+    try:
+        initial_state = bootstrap_state()
+    except Exception as e:
+        # The page still renders; the script then loads each part separately.
+        save_log(f"Error building the initial state for /: {str(e)}", False)
+        initial_state = {}
+    return render_template('index.html', initial_state=initial_state)
+
+@app.route('/bootstrap')
+def bootstrap_route():
+    try:
+        return jsonify(bootstrap_state())
+    except Exception as e:
+        save_log(f"Error in /bootstrap route: {str(e)}", False)
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/latest-stats')
 def get_latest_stats_route():
@@ -652,9 +983,17 @@ def manual_backup_route():
             save_log('Manual backup: Username is required, but not provided or data is malformed.', False)
             return jsonify({'error': 'Username is required.'}), 400
         username = data.get('username')
+        formats = data.get('formats')
+        query_profile = data.get('queryProfile')
+        try:
+            if formats is not None:
+                formats = resolve_formats(formats)
+            resolve_query_profile(query_profile, formats or resolve_formats())
+        except (TypeError, ValueError, AttributeError) as e_formats:
+            return jsonify({'error': str(e_formats)}), 400
         
         save_log(f"Manual backup initiated for user: {username}", True)
-        backup_meta = create_backup(username) 
+        backup_meta = create_backup(username, formats, query_profile)
         return jsonify({'status': 'success', 'message': f'Backup successfully created for {username}.', 'data': backup_meta})
         
     except Exception as e:
@@ -664,45 +1003,60 @@ def manual_backup_route():
 
 @app.route('/auto-backup', methods=['POST'])
 def start_auto_backup_route():
-    global auto_backup_thread, auto_backup_config
+    global auto_backup_config
     try:
         data = request.get_json()
         username = data.get('username')
         keep_last_str = data.get('keepLast')
         interval_str = data.get('interval')
+        cron = (data.get('cron') or '').strip() or None
+        jitter_str = data.get('jitterMinutes') or 0
+        formats = data.get('formats')
 
-        if not all([username, keep_last_str, interval_str]):
+        if not all([username, keep_last_str]) or not (interval_str or cron):
             save_log('Auto-backup start: Missing required fields.', False)
-            return jsonify({'error': 'All fields (username, keepLast, interval) are required'}), 400
+            return jsonify({'error': 'Username, keepLast and either interval or cron are required'}), 400
         
         try:
             keep_last = int(keep_last_str)
-            interval = float(interval_str)
-            if keep_last <= 0 or interval <= 0:
+            interval = float(interval_str) if interval_str else None
+            jitter_minutes = float(jitter_str)
+            if keep_last <= 0 or (interval is not None and interval <= 0):
                 save_log(f'Auto-backup start: Invalid keepLast/interval for {username}. Must be > 0.', False)
                 return jsonify({'error': 'Keep last and interval must be positive numbers.'}), 400
+            if jitter_minutes < 0:
+                return jsonify({'error': 'Jitter must not be negative.'}), 400
         except ValueError:
             save_log(f'Auto-backup start: Invalid number format for keepLast/interval for {username}.', False)
-            return jsonify({'error': 'Invalid number format for keepLast or interval.'}), 400
-        
-        if auto_backup_thread and auto_backup_thread.is_alive():
-            save_log("Stopping existing auto-backup thread before starting new one.", True)
-            stop_auto_backup.set()
-            auto_backup_thread.join(timeout=10)
+            return jsonify({'error': 'Invalid number format for keepLast, interval or jitterMinutes.'}), 400
+        if cron:
+            try:
+                parse_cron(cron)
+            except ValueError as e_cron:
+                save_log(f'Auto-backup start: {str(e_cron)}', False)
+                return jsonify({'error': str(e_cron)}), 400
+        query_profile = data.get('queryProfile') or None
+        try:
+            formats = resolve_formats(formats)
+            resolve_query_profile(query_profile, formats)
+        except (TypeError, ValueError, AttributeError) as e_formats:
+            save_log(f'Auto-backup start: {str(e_formats)}', False)
+            return jsonify({'error': str(e_formats)}), 400
         
-        stop_auto_backup.clear()
-        auto_backup_config = {'username': username, 'keepLast': keep_last, 'interval': interval}
+        auto_backup_config = {'username': username, 'keepLast': keep_last, 'interval': interval, 'cron': cron,
+                              'jitterMinutes': jitter_minutes, 'formats': formats, 'queryProfile': query_profile,
+                              'skipUnchanged': bool(data.get('skipUnchanged'))}
         save_config(auto_backup_config)
+        # Like before, a newly configured auto backup runs right away.
+        schedule_auto_backup(auto_backup_config, run_immediately=True)
         
-        auto_backup_thread = threading.Thread(target=auto_backup_task, daemon=True)
-        auto_backup_thread.start()
-        
-        save_log(f"Auto backup started for {username}, interval: {interval} hours, keep: {keep_last}", True)
-        return jsonify({'status': 'success', 'message': f'Auto backup started for {username}.', 'config': auto_backup_config})
+        save_log(f"Auto backup started for {username}, {describe_schedule(auto_backup_config)}, keep: {keep_last}, formats: {', '.join(formats)}", True)
+        return jsonify({'status': 'success', 'message': f'Auto backup started for {username}.', 'config': auto_backup_config,
+                        'schedule': scheduler.status(AUTO_BACKUP_JOB)})
     except Exception as e:
         save_log(f"Failed to start auto backup: {str(e)}", False)
         auto_backup_config = None 
-        stop_auto_backup.set()
+        scheduler.remove_job(AUTO_BACKUP_JOB)
         if os.path.exists(CONFIG_FILE):
             try: os.remove(CONFIG_FILE)
             except OSError as oe: save_log(f"Error removing config during auto-backup start failure: {str(oe)}", False)
@@ -710,15 +1064,11 @@ def start_auto_backup_route():
 
 @app.route('/stop-auto-backup', methods=['POST'])
 def stop_auto_backup_route():
-    global auto_backup_config, auto_backup_thread
+    global auto_backup_config
     try:
         save_log("Attempting to stop auto backup...", True)
-        stop_auto_backup.set()
-        if auto_backup_thread and auto_backup_thread.is_alive():
-            auto_backup_thread.join(timeout=10)
-        
+        scheduler.remove_job(AUTO_BACKUP_JOB)
         auto_backup_config = None
-        auto_backup_thread = None
         
         if os.path.exists(CONFIG_FILE):
             os.remove(CONFIG_FILE)
@@ -732,43 +1082,217 @@ def stop_auto_backup_route():
 
 @app.route('/auto-backup-status')
 def get_auto_backup_status_route():
-    is_running = bool(auto_backup_thread and auto_backup_thread.is_alive() and not stop_auto_backup.is_set())
-    current_config_to_display = auto_backup_config if is_running else load_config()
-    return jsonify({'running': is_running, 'config': current_config_to_display})
+    return jsonify(auto_backup_status())
+
 
+@app.route('/exporters')
+def get_exporters_route():
+    return jsonify(exporter_list())
 
 @app.route('/backups')
 def get_backups_route():
     try:
-        all_backups = get_user_backups() 
-        return jsonify(all_backups)
+        try:
+            limit = int(request.args.get('limit', BACKUPS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer.'}), 400
+        limit = max(1, min(limit, MAX_BACKUPS_PAGE_SIZE))
+        try:
+            backups, next_cursor, total = backup_index.list_backups(
+                username=request.args.get('username') or None,
+                date_from=request.args.get('from') or None,
+                date_to=request.args.get('to') or None,
+                sort=request.args.get('sort', 'desc'),
+                cursor=request.args.get('cursor') or None,
+                limit=limit)
+        except ValueError as e_query:
+            return jsonify({'error': str(e_query)}), 400
+        return jsonify({'backups': backups, 'next_cursor': next_cursor, 'total': total})
     except Exception as e:
         save_log(f"Error in /backups route: {str(e)}", False)
         return jsonify({'error': str(e)}), 500
 
+def iter_backups_export(backups):
+    """Yields a zip holding the given backups as `<backup id>/<member>`. Members are
+    copied without recompression; unreadable archives are skipped and listed in the
+    closing manifest.json."""
+    writer = ZipStreamWriter()
+    included, skipped = [], []
+    for backup in backups:
+        sent_members = len(writer.entries)
+        try:
+            backup_key = locate_backup(backup['id'])
+            if backup_key is None:
+                raise FileNotFoundError("archive not found in storage")
+            with storage.open(backup_key) as f_zip:
+                for chunk in writer.copy_members(f_zip, prefix=f"{backup['id']}/"):
+                    yield chunk
+            included.append(backup['id'])
+        except (OSError, zipfile.BadZipFile) as e:
+            # copy_members checks the archive before its first chunk, so damaged archives
+            # are skipped whole. A read error later on leaves the members copied so far
+            # (an interrupted member is not in the central directory); the manifest lists them.
+            skipped_backup = {'id': backup['id'], 'error': str(e)}
+            partial = [entry.name.decode('utf-8') for entry in writer.entries[sent_members:]]
+            if partial:
+                skipped_backup['partial_members'] = partial
+            save_log(f"Skipping backup {backup['id']} in export: {str(e)}"
+                     + (f" ({len(partial)} member(s) already sent)" if partial else ""), False)
+            skipped.append(skipped_backup)
+    now = datetime.now()
+    manifest = {'exported_at': now.isoformat(), 'backups': included, 'skipped': skipped}
+    yield writer.add_bytes('manifest.json', json.dumps(manifest, indent=2).encode('utf-8'), now.timetuple()[:6])
+    yield writer.close()
+
+@app.route('/backups/export')
+def export_backups_route():
+    """Streams one archive with all backups matching the /backups filters."""
+    username = request.args.get('username') or None
+    try:
+        backups, _, _ = backup_index.list_backups(username=username,
+                                                  date_from=request.args.get('from') or None,
+                                                  date_to=request.args.get('to') or None,
+                                                  sort='asc')
+    except ValueError as e_query:
+        return jsonify({'error': str(e_query)}), 400
+    if not backups:
+        return jsonify({'error': 'No backups match the given filters.'}), 404
+    save_log(f"Exporting {len(backups)} backup(s) as one archive", True)
+    download_name = f"anivault_{username or 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(stream_with_context(iter_backups_export(backups)), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
+@app.route('/search')
+def search_titles_route():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required.'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer.'}), 400
+    try:
+        return jsonify(backup_index.search(query, username=request.args.get('username') or None, limit=limit))
+    except Exception as e:
+        save_log(f"Error searching titles for '{query}': {str(e)}", False)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/media/<int:media_id>/timeline')
+def get_media_timeline_route(media_id):
+    username = request.args.get('username', '').strip()
+    if not username:
+        return jsonify({'error': 'Query parameter username is required.'}), 400
+    try:
+        timeline = backup_index.timeline(username, media_id)
+        if not timeline['changes']:
+            return jsonify({'error': 'No history found for this title and user.'}), 404
+        return jsonify(timeline)
+    except Exception as e:
+        save_log(f"Error getting timeline for media {media_id} ({username}): {str(e)}", False)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stats/activity')
+def get_activity_route():
+    """Activity calendar of a user's latest backup: titles started and completed per
+    year, month and day, with the episodes/chapters of the completed ones. `year`
+    limits months and days to one year; `type` (anime/manga) to one list."""
+    username = request.args.get('username', '').strip()
+    if not username:
+        return jsonify({'error': 'Query parameter username is required.'}), 400
+    media_type = request.args.get('type') or None
+    if media_type not in (None, 'anime', 'manga'):
+        return jsonify({'error': "type must be 'anime' or 'manga'."}), 400
+    try:
+        year = int(request.args['year']) if request.args.get('year') else None
+    except ValueError:
+        return jsonify({'error': 'year must be an integer.'}), 400
+    try:
+        latest, _, _ = backup_index.list_backups(username=username, sort='desc', limit=1)
+        if not latest:
+            return jsonify({'error': 'No backups found for this user.'}), 404
+        activity = backup_index.activity(latest[0]['id'], media_type, year)
+        return jsonify(dict(activity, username=username, backup_id=latest[0]['id'], date=latest[0]['date'],
+                            year=year, type=media_type))
+    except Exception as e:
+        save_log(f"Error getting activity for {username}: {str(e)}", False)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/backup/<backup_id>/stats')
 def get_backup_stats_route(backup_id):
     try:
-        zip_path = os.path.join(BACKUP_DIR, f"{backup_id}.zip")
-        if not os.path.exists(zip_path):
+        backup_key = locate_backup(backup_id)
+        if backup_key is None:
             return jsonify({'error': 'Backup not found'}), 404
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            if 'meta.json' in zipf.namelist():
-                with zipf.open('meta.json') as f_meta:
-                    backup_data = json.load(io.TextIOWrapper(f_meta, encoding='utf-8'))
-                    return jsonify(backup_data.get('stats', {}))
+        backup_data = read_backup_meta(backup_key)
+        if backup_data is None:
             return jsonify({'error': 'meta.json not found in backup'}), 404
+        return jsonify(backup_data.get('stats', {}))
     except Exception as e:
         save_log(f"Error getting backup stats for {backup_id}: {str(e)}", False)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/backup/<backup_id>/files')
+def list_backup_files_route(backup_id):
+    backup_key = locate_backup(backup_id)
+    if backup_key is None:
+        return jsonify({'error': 'Backup not found'}), 404
+    meta = read_backup_meta(backup_key) or {}
+    archived = members_for_formats(archived_formats_of(meta)) + ['meta.json']
+    derived = [member for exporter in EXPORTERS.values() for member in exporter.members if member not in archived]
+    return jsonify({'archived': archived, 'derived': derived})
+
+@app.route('/backup/<backup_id>/files/<member>')
+def get_backup_file_route(backup_id, member):
+    """Serves one file of a backup: straight from the archive if it is stored there,
+    otherwise generated from the archived JSON through the artifact cache."""
+    try:
+        backup_key = locate_backup(backup_id)
+        if backup_key is None:
+            return jsonify({'error': 'Backup not found'}), 404
+        meta = read_backup_meta(backup_key) or {}
+        mimetype = mimetypes.guess_type(member)[0] or 'application/octet-stream'
+        download_name = f"{backup_id}_{member}"
+
+        if member == 'meta.json' or member in members_for_formats(archived_formats_of(meta)):
+            with storage.open(backup_key) as f_zip, zipfile.ZipFile(f_zip, 'r') as zipf:
+                data = zipf.read(member)
+            return send_file(io.BytesIO(data), mimetype=mimetype, as_attachment=True, download_name=download_name)
+
+        exporter = exporter_for_member(member)
+        if exporter is None:
+            return jsonify({'error': f"Unknown file '{member}'"}), 404
+        if meta.get('query_profile') == 'lean' and not exporter.lean:
+            return jsonify({'error': f"'{member}' needs the full AniList data; this backup was made with the lean query profile."}), 409
+        cache_dir = artifact_cache.get(backup_id, exporter.name,
+                                       lambda output_dir: generate_derived_export(backup_key, meta, exporter.name, output_dir))
+        return send_file(open(os.path.join(cache_dir, member), 'rb'), mimetype=mimetype, as_attachment=True,
+                         download_name=download_name)
+    except Exception as e:
+        save_log(f"Error serving {member} of backup {backup_id}: {str(e)}", False)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/backup/<backup_id>/trace')
+def get_backup_trace_route(backup_id):
+    backup = backup_index.get(backup_id)
+    if not backup:
+        return jsonify({'error': 'Backup not found'}), 404
+    if not backup['trace']:
+        return jsonify({'error': 'No trace recorded for this backup'}), 404
+    return jsonify(backup['trace'])
+
 @app.route('/backup/<backup_id>/download')
 def download_backup_route(backup_id):
     try:
-        backup_path = os.path.join(BACKUP_DIR, f"{backup_id}.zip")
-        if not os.path.exists(backup_path):
+        backup_key = locate_backup(backup_id)
+        if backup_key is None:
             return jsonify({'error': 'Backup not found'}), 404
-        return send_file(backup_path, mimetype='application/zip', as_attachment=True, download_name=f"{backup_id}.zip")
+        local_path = storage.local_path(backup_key)
+        if local_path:
+            return send_file(local_path, mimetype='application/zip', as_attachment=True,
+                             download_name=f"{backup_id}.zip")
+        return Response(stream_with_context(storage.iter_chunks(backup_key)), mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename="{backup_id}.zip"',
+                                 'Content-Length': str(storage.size(backup_key))})
     except Exception as e:
         save_log(f"Error downloading backup {backup_id}: {str(e)}", False)
         return jsonify({'error': str(e)}), 500
@@ -780,31 +1304,28 @@ def delete_backup_route(backup_id):
             sse_queue.put({'type': 'backup_deleted', 'data': {'id': backup_id }})
             all_backups = get_user_backups()
             if all_backups:
-                latest_backup_meta_path = os.path.join(BACKUP_DIR, f"{all_backups[0]['id']}.zip")
                 new_latest_stats = None
                 try:
-                    with zipfile.ZipFile(latest_backup_meta_path, 'r') as zipf_latest:
-                        if 'meta.json' in zipf_latest.namelist():
-                            with zipf_latest.open('meta.json') as f_latest_meta:
-                                latest_meta = json.load(io.TextIOWrapper(f_latest_meta, encoding='utf-8'))
-                                new_latest_stats = {
-                                    'anime': latest_meta['stats']['anime'],
-                                    'manga': latest_meta['stats']['manga'],
-                                    'username': latest_meta['username'],
-                                    'last_updated': latest_meta['date']
-                                }
+                    latest_meta = read_backup_meta(locate_backup(all_backups[0]['id']))
+                    if latest_meta:
+                        new_latest_stats = {
+                            'anime': latest_meta['stats']['anime'],
+                            'manga': latest_meta['stats']['manga'],
+                            'username': latest_meta['username'],
+                            'last_updated': latest_meta['date']
+                        }
                     if new_latest_stats:
                         save_latest_stats(new_latest_stats)
                         sse_queue.put({'type': 'latest_stats_updated', 'data': new_latest_stats})
                     else: 
-                        if os.path.exists(LATEST_STATS_FILE): os.remove(LATEST_STATS_FILE)
+                        clear_latest_stats()
                         sse_queue.put({'type': 'latest_stats_updated', 'data': {}})
                 except Exception as e_stat_update:
                     save_log(f"Error updating latest stats after delete: {e_stat_update}", False)
-                    if os.path.exists(LATEST_STATS_FILE): os.remove(LATEST_STATS_FILE)
+                    clear_latest_stats()
                     sse_queue.put({'type': 'latest_stats_updated', 'data': {}})
             else: 
-                if os.path.exists(LATEST_STATS_FILE): os.remove(LATEST_STATS_FILE)
+                clear_latest_stats()
                 sse_queue.put({'type': 'latest_stats_updated', 'data': {}})
 
             return jsonify({'status': 'success'})
@@ -813,14 +1334,137 @@ def delete_backup_route(backup_id):
         save_log(f"Error deleting backup {backup_id} via route: {str(e)}", False)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+def profiler_route():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            count = int(data.get('count', 1))
+            if count <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({'error': 'count must be a positive integer.'}), 400
+        backup_profiler.arm(count)
+        save_log(f"Profiler armed for the next {count} backup(s).", True)
+    elif request.method == 'DELETE':
+        backup_profiler.disarm()
+        save_log("Profiler disarmed.", True)
+    return jsonify(backup_profiler.status())
+
+@app.route('/admin/profiler/<name>')
+def download_profile_route(name):
+    path = backup_profiler.path_for(name)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    mimetype = 'text/plain' if name.endswith('.txt') else 'application/octet-stream'
+    return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=name)
+
+@app.route('/admin/ingest', methods=['GET', 'POST'])
+def ingest_route():
+    if request.method == 'GET':
+        return jsonify(ingest_status)
+    data = request.get_json(silent=True) or {}
+    directory = data.get('directory')
+    if not directory or not os.path.isdir(directory):
+        return jsonify({'error': 'directory must be an existing directory on the server.'}), 400
+    try:
+        formats = resolve_formats(data.get('formats'))
+        workers = int(data.get('workers') or INGEST_WORKERS)
+        if workers <= 0:
+            raise ValueError("workers must be a positive integer.")
+    except (TypeError, ValueError) as e_params:
+        return jsonify({'error': str(e_params)}), 400
+    if not ingest_lock.acquire(blocking=False):
+        return jsonify({'error': 'An ingest is already running.', 'status': ingest_status}), 409
+    ingest_status.update({'running': True, 'directory': directory, 'done': 0, 'total': None})
+    threading.Thread(target=ingest_in_background, args=(directory, formats, workers), daemon=True).start()
+    return jsonify(ingest_status), 202
+
+@app.route('/admin/scrub', methods=['GET', 'POST'])
+def scrub_route():
+    if request.method == 'POST':
+        if scrubber.status()['running']:
+            return jsonify({'error': 'An integrity check is already running.'}), 409
+        start_scrub()
+        save_log("Integrity check started manually.", True)
+    status = dict(scrubber.status(), archives=backup_index.verification_counts(),
+                  findings=backup_index.scrub_findings(),
+                  schedule=scheduler.status(SCRUB_JOB) if scheduler.has_job(SCRUB_JOB) else None)
+    return jsonify(status), 202 if request.method == 'POST' else 200
+
+def format_metrics(samples):
+    """Prometheus text format for (name, type, help, value) tuples."""
+    lines = []
+    for name, metric_type, help_text, value in samples:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+@app.route('/metrics')
+def metrics_route():
+    scrub = scrubber.status()
+    current = scrub['current'] or {}
+    last_run = scrub['last_run'] or {}
+    archives = backup_index.verification_counts()
+    cache = artifact_cache.stats()
+    samples = [
+        ('anivault_backups', 'gauge', 'Backups in the index.', archives['total']),
+        ('anivault_backups_unverified', 'gauge', 'Indexed backups never checked by the integrity scrubber.',
+         archives['unverified']),
+        ('anivault_scrub_running', 'gauge', 'Whether an integrity check pass is running.', int(scrub['running'])),
+        ('anivault_scrub_progress_ratio', 'gauge', 'Share of archives checked in the running pass.',
+         round(current['checked'] / current['total'], 4) if current.get('total') else 0),
+        ('anivault_scrub_runs_total', 'counter', 'Completed integrity check passes.', scrub['totals']['runs']),
+        ('anivault_scrub_checked_total', 'counter', 'Archives checked.', scrub['totals']['checked']),
+        ('anivault_scrub_corrupt_total', 'counter', 'Archives found corrupt and quarantined.', scrub['totals']['corrupt']),
+        ('anivault_scrub_missing_total', 'counter', 'Indexed archives missing from storage.', scrub['totals']['missing']),
+        ('anivault_scrub_read_bytes_total', 'counter', 'Bytes read by the integrity scrubber.',
+         scrub['totals']['bytes_read']),
+        ('anivault_scrub_last_duration_seconds', 'gauge', 'Duration of the last completed pass.',
+         last_run.get('duration_seconds', 0)),
+        ('anivault_scrub_last_success_timestamp_seconds', 'gauge', 'End of the last completed pass (Unix time).',
+         datetime.fromisoformat(last_run['finished']).timestamp() if last_run else 0),
+        ('anivault_artifact_cache_hits_total', 'counter', 'Artifact cache hits.', cache['hits']),
+        ('anivault_artifact_cache_misses_total', 'counter', 'Artifact cache misses.', cache['misses']),
+        ('anivault_artifact_cache_bytes', 'gauge', 'Bytes held by the artifact cache.', cache['bytes']),
+    ]
+    transfer = anilist_transfer_totals.to_dict()
+    samples += [
+        ('anivault_anilist_requests_total', 'counter', 'Requests sent to AniList.', transfer['requests']),
+        ('anivault_anilist_wire_bytes_total', 'counter', 'Response bytes received from AniList (compressed).',
+         transfer['wire_bytes']),
+        ('anivault_anilist_bytes_total', 'counter', 'Response bytes from AniList after decompression '
+         '(not counted in streaming mode).', transfer['bytes']),
+        ('anivault_anilist_upstream_seconds_total', 'counter', 'Time AniList took to answer.',
+         round(transfer['upstream_ms'] / 1000, 3)),
+    ]
+    if anilist_cache is not None:
+        responses = anilist_cache.stats()
+        samples += [
+            ('anivault_anilist_cache_hits_total', 'counter', 'AniList fetches served from the response cache.',
+             responses['hits']),
+            ('anivault_anilist_cache_coalesced_total', 'counter', 'Cache hits that waited for a concurrent fetch '
+             'of the same user and profile.', responses['coalesced']),
+            ('anivault_anilist_cache_misses_total', 'counter', 'AniList fetches that went upstream.',
+             responses['misses']),
+            ('anivault_anilist_cache_evictions_total', 'counter', 'Responses evicted to stay within the size limit.',
+             responses['evictions']),
+            ('anivault_anilist_cache_bytes', 'gauge', 'Bytes held by the response cache.', responses['bytes']),
+        ]
+    if mal_xml.fragment_cache is not None:
+        fragments = mal_xml.fragment_cache.stats()
+        samples += [
+            ('anivault_mal_fragment_hits_total', 'counter', 'MAL XML entries taken from the fragment cache.',
+             fragments['hits']),
+            ('anivault_mal_fragment_misses_total', 'counter', 'MAL XML entries rendered.', fragments['misses']),
+        ]
+    return Response(format_metrics(samples), mimetype='text/plain; version=0.0.4')
+
 @app.route('/logs')
 def get_logs_route():
     try:
-        if os.path.exists(LOGS_FILE):
-            with open(LOGS_FILE, 'r') as f:
-                logs_data = json.load(f)
-                return jsonify(logs_data)
-        return jsonify([])
+        return jsonify(read_logs())
     except Exception as e:
         save_log(f"Error getting logs: {str(e)}", False)
         return jsonify({'error': f"Error reading logs: {str(e)}"}), 500
@@ -838,33 +1482,30 @@ def save_log_client_route():
         return jsonify({'error': str(e)}), 500
 
 def initialize_auto_backup():
-    global auto_backup_thread, auto_backup_config
+    global auto_backup_config
     
     loaded_config = load_config()
     if loaded_config:
         save_log(f"Found auto-backup configuration: {loaded_config}", True)
         
         username = loaded_config.get('username')
+        cron = loaded_config.get('cron')
         try:
             keep_last = int(loaded_config.get('keepLast', 0))
-            interval = float(loaded_config.get('interval', 0))
+            interval = float(loaded_config.get('interval') or 0)
+            if cron:
+                parse_cron(cron)
         except (ValueError, TypeError):
             keep_last = 0
             interval = 0
-            save_log("Invalid numeric values in loaded auto-backup config.", False)
+            cron = None
+            save_log("Invalid values in loaded auto-backup config.", False)
 
-        if username and keep_last > 0 and interval > 0:
+        if username and keep_last > 0 and (interval > 0 or cron):
             auto_backup_config = loaded_config
-            stop_auto_backup.clear()
-            
-            if auto_backup_thread and auto_backup_thread.is_alive():
-                 save_log("Auto backup thread already running (unexpected). Stopping it first.", False)
-                 stop_auto_backup.set()
-                 auto_backup_thread.join(timeout=5)
-
-            auto_backup_thread = threading.Thread(target=auto_backup_task, daemon=True)
-            auto_backup_thread.start()
-            save_log(f"Restored and started auto backup for '{username}' on application start. Interval: {interval}h, Keep: {keep_last}.", True)
+            schedule_auto_backup(auto_backup_config)
+            next_run = scheduler.status(AUTO_BACKUP_JOB)['next_run']
+            save_log(f"Restored auto backup for '{username}' on application start. Schedule: {describe_schedule(loaded_config)}, Keep: {keep_last}, next run: {next_run}.", True)
         else:
             save_log(f"Loaded auto-backup config for '{username}' is incomplete or invalid (Keep: {keep_last}, Interval: {interval}). Auto-backup not started. Please reconfigure.", False)
             auto_backup_config = None
@@ -879,7 +1520,38 @@ def initialize_auto_backup():
         auto_backup_config = None
 
 
+def start_background_maintenance():
+    # The scrubber is only scheduled once the layout migration is done, so it never
+    # checks an archive that is being moved.
+    migrate_backup_layout()
+    if catalog is not None:
+        update_catalog(catalog.rebuild)
+    if SCRUB_INTERVAL_HOURS > 0:
+        scheduler.add_job(SCRUB_JOB, start_scrub, interval_hours=SCRUB_INTERVAL_HOURS)
+
+
+def ingest_command(argv):
+    parser = argparse.ArgumentParser(prog='app.py ingest', description="Import legacy backup archives and MAL XML exports.")
+    parser.add_argument('directory')
+    parser.add_argument('--workers', type=int, default=INGEST_WORKERS)
+    parser.add_argument('--formats', help="Comma-separated export formats (default: the default formats).")
+    args = parser.parse_args(argv)
+    formats = args.formats.split(',') if args.formats else None
+
+    def print_progress(status):
+        print(f"\r{status['done']}/{status['total']} files | {status['imported']} imported, "
+              f"{status['skipped']} skipped, {status['failed']} failed", end='', flush=True)
+
+    status = run_ingest(args.directory, formats, args.workers, on_progress=print_progress)
+    print()
+    return 1 if status['failed'] else 0
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        sys.exit(ingest_command(sys.argv[2:]))
     save_log("AniVault application starting up...", True)
+    recover_interrupted_backups()
+    sync_backup_index()
     initialize_auto_backup()
+    threading.Thread(target=start_background_maintenance, daemon=True).start()
     app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)
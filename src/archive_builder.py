@@ -0,0 +1,99 @@
+import json
+import os
+import zipfile
+from contextlib import nullcontext
+
+import mal_xml
+from entries import parse_entries
+from exporters import ExportContext, members_for_formats, run_exporters
+from tracing import Trace
+
+DEFAULT_REQUIRED_FILES = ['anime.json', 'manga.json', 'animemanga_stats.txt',
+                          'anime.xml', 'manga.xml', 'meta.json']
+
+
+def validate_backup_files(backup_dir_path, required_files=DEFAULT_REQUIRED_FILES):
+    for filename in required_files:
+        file_path = os.path.join(backup_dir_path, filename)
+        if not os.path.exists(file_path):
+            raise ValueError(f"Missing required file: {filename}")
+        if os.path.getsize(file_path) == 0:
+            raise ValueError(f"Empty file detected: {filename}")
+
+
+def validate_backup_zip(zip_path, required_files=DEFAULT_REQUIRED_FILES):
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        zip_files = zipf.namelist()
+        for req_file in required_files:
+            matching_files = [f for f in zip_files if f.endswith(req_file)]
+            if not matching_files:
+                raise ValueError(f"Missing required file in zip: {req_file}")
+            file_info = zipf.getinfo(matching_files[0])
+            if file_info.file_size == 0:
+                raise ValueError(f"Empty file in zip: {req_file}")
+            if req_file.endswith('.json'):
+                with zipf.open(matching_files[0]) as f:
+                    try:
+                        data = json.load(f)
+                        if not data and not isinstance(data, list):
+                             raise ValueError(f"Empty JSON content in: {req_file}")
+                    except json.JSONDecodeError:
+                        raise ValueError(f"Invalid JSON in: {req_file}")
+    return True
+
+
+def _span(trace, name, **attrs):
+    return trace.span(name, **attrs) if trace else nullcontext()
+
+
+def finish_archive(output_dir, meta, trace=None):
+    """Writes meta.json next to the export members in `output_dir`, validates them and
+    packs everything into `output_dir/<id>.zip`. Returns the zip path."""
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    required_files = members_for_formats(meta['archived_formats']) + ['meta.json']
+    with _span(trace, 'validate'):
+        validate_backup_files(output_dir, required_files)
+
+    zip_path = os.path.join(output_dir, f"{meta['id']}.zip")
+    with _span(trace, 'zip'):
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for filename in required_files:
+                zipf.write(os.path.join(output_dir, filename), filename)
+
+    with _span(trace, 'validate_zip'):
+        validate_backup_zip(zip_path, required_files)
+    return zip_path
+
+
+def init_worker():
+    # Skipped MAL items must not write to the app's log from a worker process.
+    mal_xml.on_skip = None
+
+
+def build_archive(raw_entries_by_type, anime_stats, manga_stats, generated_at, output_dir, meta, trace_offset_ms=0):
+    """Process pool step of a backup: runs the exporters of meta['archived_formats'] on the
+    raw entries, then finish_archive(). Only plain data crosses the process boundary:
+    raw entry dicts go in, the zip path and this step's trace spans (shifted by
+    `trace_offset_ms` onto the caller's trace) come back as (zip_path, spans).
+
+    meta['trace'] should hold the caller's spans so far; the export spans are added to
+    it before meta.json is written."""
+    trace = Trace()
+    with trace.span('export', mode='process'):
+        anime_entries = parse_entries(raw_entries_by_type['anime'])
+        manga_entries = parse_entries(raw_entries_by_type['manga'])
+        context = ExportContext(meta['username'], anime_entries, manga_entries, anime_stats, manga_stats,
+                                generated_at)
+        run_exporters(context, meta['archived_formats'], output_dir, None, trace)
+
+    def shifted_spans():
+        return [dict(span, start_ms=round(span['start_ms'] + trace_offset_ms, 2))
+                for span in trace.to_dict()['spans']]
+
+    if meta.get('trace'):
+        meta['trace'] = {'total_ms': round(trace_offset_ms + trace.total_ms(), 2),
+                         'spans': sorted(meta['trace']['spans'] + shifted_spans(), key=lambda s: s['start_ms'])}
+    zip_path = finish_archive(output_dir, meta, trace)
+    return zip_path, shifted_spans()
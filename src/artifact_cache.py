@@ -0,0 +1,132 @@
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+UNSAFE_CHARS_RE = re.compile(r'[^\w.-]')
+
+
+class ArtifactCache:
+    """Size-bounded on-disk LRU cache for files derived from a backup, keyed by
+    (backup_id, format). Each entry is a directory holding the format's members.
+
+    Entries are generated at most once at a time per key; concurrent requests for the
+    same key wait for the first one. Recency survives restarts through the entry
+    directory's mtime."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (backup_id, fmt) -> size in bytes, least recent first
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> (lock, number of threads holding or waiting for it)
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def _dirname(backup_id, fmt):
+        return f"{UNSAFE_CHARS_RE.sub('_', backup_id)}@{fmt}"
+
+    def _path(self, backup_id, fmt):
+        return os.path.join(self.directory, self._dirname(backup_id, fmt))
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.tmp-') or '@' not in name or not os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)  # leftovers of an interrupted generation
+                continue
+            backup_id, fmt = name.rsplit('@', 1)
+            found.append((os.path.getmtime(path), (backup_id, fmt), self._dir_size(path)))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(self._entries.values())
+
+    @contextmanager
+    def _key_lock(self, key):
+        """Holds the lock of `key`; it is dropped once no thread holds or waits for it."""
+        with self._lock:
+            lock, users = self._key_locks.get(key) or (threading.Lock(), 0)
+            self._key_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                users = self._key_locks[key][1] - 1
+                if users:
+                    self._key_locks[key] = (lock, users)
+                else:
+                    del self._key_locks[key]
+
+    def get(self, backup_id, fmt, generate):
+        """Returns the directory holding the members of `fmt` for `backup_id`, calling
+        generate(output_dir) to create them on a miss."""
+        key = (backup_id, fmt)
+        path = self._path(backup_id, fmt)
+        with self._key_lock(key):
+            with self._lock:
+                cached = key in self._entries
+                if cached:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if cached and os.path.isdir(path):
+                now = time.time()
+                os.utime(path, (now, now))
+                return path
+
+            tmp_path = os.path.join(self.directory, f".tmp-{self._dirname(backup_id, fmt)}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            try:
+                generate(tmp_path)
+                shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp_path, path)
+            except Exception:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+            with self._lock:
+                self._entries[key] = self._dir_size(path)
+                self._entries.move_to_end(key)
+            self._evict(keep=key)
+            return path
+
+    def _evict(self, keep):
+        while True:
+            with self._lock:
+                if sum(self._entries.values()) <= self.max_bytes:
+                    return
+                victim = next((key for key in self._entries if key != keep), None)
+                if victim is None:
+                    return
+                del self._entries[victim]
+            shutil.rmtree(self._path(*victim), ignore_errors=True)
+
+    def invalidate(self, backup_id):
+        """Drops all cached formats of a backup (e.g. after it was deleted)."""
+        with self._lock:
+            victims = [key for key in self._entries if key[0] == backup_id]
+            for key in victims:
+                del self._entries[key]
+        for key in victims:
+            shutil.rmtree(self._path(*key), ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': sum(self._entries.values()),
+                    'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,570 @@
+import base64
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from backup_layout import backup_id_of
+
+# Scripts without word separators (CJK, kana, hangul) form their own tokens and are
+# indexed by every suffix, so a prefix lookup on the token table acts as a substring match.
+UNSEGMENTED_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af'
+TOKEN_RE = re.compile(f'[{UNSEGMENTED_CHARS}]+|[^\\W{UNSEGMENTED_CHARS}]+')
+UNSEGMENTED_RE = re.compile(f'[{UNSEGMENTED_CHARS}]')
+
+
+def split_tokens(text):
+    return TOKEN_RE.findall(unicodedata.normalize('NFKC', text or '').lower())
+
+
+def tokenize_title(text):
+    tokens = set()
+    for word in split_tokens(text):
+        tokens.add(word)
+        if UNSEGMENTED_RE.match(word):
+            tokens.update(word[i:] for i in range(1, len(word)))
+    return tokens
+
+
+def _prefix_upper_bound(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class BackupIndex:
+    """SQLite catalog of backup archives so listings don't have to open every ZIP."""
+
+    SORT_ORDERS = ('desc', 'asc')
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS backups (
+                    id TEXT PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    anime_total INTEGER NOT NULL DEFAULT 0,
+                    manga_total INTEGER NOT NULL DEFAULT 0,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    filename TEXT NOT NULL,
+                    stats TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_backups_date ON backups (date, id);
+                CREATE INDEX IF NOT EXISTS idx_backups_user_date ON backups (username, date, id);
+                CREATE TABLE IF NOT EXISTS media (
+                    media_type TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    romaji TEXT,
+                    english TEXT,
+                    native TEXT,
+                    PRIMARY KEY (media_type, media_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS title_tokens (
+                    token TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    PRIMARY KEY (token, media_type, media_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_title_tokens_media ON title_tokens (media_type, media_id);
+                CREATE TABLE IF NOT EXISTS backup_media (
+                    backup_id TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    status TEXT,
+                    PRIMARY KEY (backup_id, media_type, media_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_backup_media_media ON backup_media (media_type, media_id);
+                CREATE TABLE IF NOT EXISTS entry_history (
+                    username TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    backup_id TEXT NOT NULL,
+                    present INTEGER NOT NULL,
+                    status TEXT,
+                    progress INTEGER,
+                    progress_volumes INTEGER,
+                    score REAL,
+                    repeat INTEGER,
+                    PRIMARY KEY (username, media_id, media_type, date, backup_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_entry_history_backup ON entry_history (backup_id);
+                CREATE TABLE IF NOT EXISTS activity (
+                    backup_id TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    started INTEGER NOT NULL,
+                    completed INTEGER NOT NULL,
+                    episodes INTEGER NOT NULL,
+                    chapters INTEGER NOT NULL,
+                    PRIMARY KEY (backup_id, period, media_type)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS scrub_findings (
+                    filename TEXT PRIMARY KEY,
+                    backup_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    checked_at TEXT NOT NULL,
+                    quarantine_key TEXT
+                );
+            """)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(backups)")}
+            for column in ['entries_indexed', 'history_recorded', 'activity_recorded']:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE backups ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            if 'trace' not in columns:
+                self._conn.execute("ALTER TABLE backups ADD COLUMN trace TEXT")
+            if 'verified_at' not in columns:
+                self._conn.execute("ALTER TABLE backups ADD COLUMN verified_at TEXT")
+
+    @staticmethod
+    def _row_to_backup(row):
+        return {
+            'id': row['id'],
+            'date': row['date'],
+            'username': row['username'],
+            'content': f"{row['anime_total']} Anime, {row['manga_total']} Manga",
+            'size': row['size']
+        }
+
+    @staticmethod
+    def encode_cursor(date, backup_id):
+        raw = json.dumps([date, backup_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            date, backup_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return str(date), str(backup_id)
+        except Exception:
+            raise ValueError("Invalid cursor.")
+
+    def add(self, meta_data, filename, size=0):
+        stats = meta_data.get('stats', {}) or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backups (id, username, date, anime_total, manga_total, size, filename, stats, trace) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (meta_data['id'], meta_data.get('username', 'N/A'), meta_data.get('date', 'N/A'),
+                 stats.get('anime', {}).get('totalEntries', 0), stats.get('manga', {}).get('totalEntries', 0),
+                 size, filename, json.dumps(stats),
+                 json.dumps(meta_data['trace']) if meta_data.get('trace') else None))
+
+    def set_trace(self, backup_id, trace):
+        """Stores the complete timing trace of a backup run (meta.json only has the
+        spans recorded before it was written)."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE backups SET trace = ? WHERE id = ?", (json.dumps(trace), backup_id))
+
+    def set_filename(self, backup_id, filename):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE backups SET filename = ? WHERE id = ?", (filename, backup_id))
+
+    def remove(self, backup_id):
+        with self._lock, self._conn:
+            self._remove_history(backup_id)
+            cur = self._conn.execute("DELETE FROM backups WHERE id = ?", (backup_id,))
+            media_keys = self._conn.execute(
+                "SELECT media_type, media_id FROM backup_media WHERE backup_id = ?", (backup_id,)).fetchall()
+            self._conn.execute("DELETE FROM backup_media WHERE backup_id = ?", (backup_id,))
+            self._conn.execute("DELETE FROM activity WHERE backup_id = ?", (backup_id,))
+            # Drop titles that no remaining backup references.
+            orphans = [tuple(key) for key in media_keys if not self._conn.execute(
+                "SELECT 1 FROM backup_media WHERE media_type = ? AND media_id = ? LIMIT 1", tuple(key)).fetchone()]
+            self._conn.executemany("DELETE FROM media WHERE media_type = ? AND media_id = ?", orphans)
+            self._conn.executemany("DELETE FROM title_tokens WHERE media_type = ? AND media_id = ?", orphans)
+            return cur.rowcount > 0
+
+    def index_entries(self, backup_id, entries_by_type, batch_size=1000):
+        """Adds the titles and statuses of one backup to the search index.
+        `entries_by_type` maps 'anime'/'manga' to iterables of entries.Entry,
+        which are consumed in batches so they never have to be in memory at once."""
+        media_rows = []
+        token_rows = []
+        posting_rows = []
+
+        def flush():
+            # Titles missing from a backup (e.g. one fetched with the lean query profile,
+            # which has only romaji) keep the ones known from earlier backups.
+            self._conn.executemany(
+                "INSERT INTO media VALUES (?, ?, ?, ?, ?) ON CONFLICT (media_type, media_id) DO UPDATE SET "
+                "romaji = COALESCE(excluded.romaji, romaji), english = COALESCE(excluded.english, english), "
+                "native = COALESCE(excluded.native, native)", media_rows)
+            self._conn.executemany("INSERT OR IGNORE INTO title_tokens VALUES (?, ?, ?)", token_rows)
+            self._conn.executemany("INSERT OR REPLACE INTO backup_media VALUES (?, ?, ?, ?)", posting_rows)
+            del media_rows[:], token_rows[:], posting_rows[:]
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM backup_media WHERE backup_id = ?", (backup_id,))
+            for media_type, entries in entries_by_type.items():
+                for entry in entries:
+                    media_id = entry.media_id
+                    if not media_id:
+                        continue
+                    romaji = entry.title_romaji or None
+                    english = entry.title_english or None
+                    native = entry.title_native or None
+                    media_rows.append((media_type, media_id, romaji, english, native))
+                    for token in tokenize_title(romaji) | tokenize_title(english) | tokenize_title(native):
+                        token_rows.append((token, media_type, media_id))
+                    posting_rows.append((backup_id, media_type, media_id, entry.status or None))
+                    if len(posting_rows) >= batch_size:
+                        flush()
+            flush()
+            self._conn.execute("UPDATE backups SET entries_indexed = 1 WHERE id = ?", (backup_id,))
+
+    def unindexed_backups(self):
+        """Backups whose titles or history have not been indexed yet, oldest first."""
+        with self._lock:
+            return [(row['id'], row['filename']) for row in self._conn.execute(
+                "SELECT id, filename FROM backups WHERE entries_indexed = 0 OR history_recorded = 0 ORDER BY date")]
+
+    def backups_without_activity(self):
+        """Backups whose activity calendar has not been stored yet, oldest first."""
+        with self._lock:
+            return [(row['id'], row['filename']) for row in self._conn.execute(
+                "SELECT id, filename FROM backups WHERE activity_recorded = 0 ORDER BY date")]
+
+    # --- Activity calendar ---
+
+    def set_activity(self, backup_id, rows):
+        """Stores the rows of a list_stats.ActivityAccumulator for a backup."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM activity WHERE backup_id = ?", (backup_id,))
+            self._conn.executemany("INSERT INTO activity VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   [(backup_id,) + tuple(row) for row in rows])
+            self._conn.execute("UPDATE backups SET activity_recorded = 1 WHERE id = ?", (backup_id,))
+
+    def activity(self, backup_id, media_type=None, year=None):
+        """Started/completed titles and completed episodes/chapters of a backup per
+        year, month and day: {'years': {period: counts}, 'months': ..., 'days': ...}.
+        With `year`, months and days are limited to that year."""
+        where = "backup_id = ?"
+        params = [backup_id]
+        if media_type:
+            where += " AND media_type = ?"
+            params.append(media_type)
+        if year is not None:
+            where += " AND (length(period) = 4 OR (period >= ? AND period < ?))"
+            params.extend([f"{year:04d}-", f"{year:04d}-\uffff"])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT period, SUM(started) AS started, SUM(completed) AS completed, SUM(episodes) AS episodes, "
+                f"SUM(chapters) AS chapters FROM activity WHERE {where} GROUP BY period ORDER BY period",
+                params).fetchall()
+        result = {'years': {}, 'months': {}, 'days': {}}
+        levels = {4: 'years', 7: 'months', 10: 'days'}
+        for row in rows:
+            result[levels[len(row['period'])]][row['period']] = {
+                key: row[key] for key in ['started', 'completed', 'episodes', 'chapters']}
+        return result
+
+    # --- Per-entry history ---
+    # entry_history only stores change points: a row is written for a backup when an
+    # entry's tracked fields differ from its state in the user's previous backup, or
+    # when it disappeared (present = 0). The state at any backup is the latest row
+    # at or before it.
+
+    @staticmethod
+    def _entry_state(entry):
+        return (1, entry.status or None, entry.progress, entry.progress_volumes, entry.score, entry.repeat)
+
+    @staticmethod
+    def _row_state(row):
+        if row is None:
+            return None
+        return (row['present'], row['status'], row['progress'], row['progress_volumes'], row['score'], row['repeat'])
+
+    def _states_before(self, username, date, backup_id):
+        """Latest known state per (media_type, media_id) strictly before the given backup."""
+        rows = self._conn.execute(
+            "SELECT h.* FROM entry_history h WHERE h.username = ? AND (h.date < ? OR (h.date = ? AND h.backup_id < ?)) "
+            "AND NOT EXISTS (SELECT 1 FROM entry_history h2 WHERE h2.username = h.username "
+            "AND h2.media_id = h.media_id AND h2.media_type = h.media_type "
+            "AND (h2.date < ? OR (h2.date = ? AND h2.backup_id < ?)) "
+            "AND (h2.date > h.date OR (h2.date = h.date AND h2.backup_id > h.backup_id)))",
+            (username, date, date, backup_id, date, date, backup_id)).fetchall()
+        return {(row['media_type'], row['media_id']): self._row_state(row) for row in rows}
+
+    def _next_backup(self, username, date, backup_id):
+        return self._conn.execute(
+            "SELECT id, date FROM backups WHERE username = ? AND (date > ? OR (date = ? AND id > ?)) "
+            "ORDER BY date, id LIMIT 1", (username, date, date, backup_id)).fetchone()
+
+    def _history_row(self, username, media_type, media_id, backup_id):
+        return self._conn.execute(
+            "SELECT * FROM entry_history WHERE username = ? AND media_id = ? AND media_type = ? AND backup_id = ?",
+            (username, media_id, media_type, backup_id)).fetchone()
+
+    def _delete_history_row(self, username, key, backup_id):
+        self._conn.execute(
+            "DELETE FROM entry_history WHERE username = ? AND media_id = ? AND media_type = ? AND backup_id = ?",
+            (username, key[1], key[0], backup_id))
+
+    def _insert_history(self, username, key, date, backup_id, state):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entry_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (username, key[0], key[1], date, backup_id) + tuple(state))
+
+    def record_history(self, backup_id, entries_by_type):
+        """Writes the change points one backup introduces. Works for backups inserted
+        out of date order (e.g. imports) by re-anchoring the following backup. Media
+        types missing from `entries_by_type` are not tracked for this backup (e.g. a
+        single-list MAL export), so their entries are not marked as removed."""
+        with self._lock, self._conn:
+            backup = self._conn.execute("SELECT username, date FROM backups WHERE id = ?", (backup_id,)).fetchone()
+            if not backup:
+                return
+            username, date = backup['username'], backup['date']
+            self._conn.execute("DELETE FROM entry_history WHERE backup_id = ?", (backup_id,))
+            # Only compact state tuples are kept, never the entries themselves.
+            current = {}
+            for media_type, entries in entries_by_type.items():
+                for entry in entries:
+                    if entry.media_id:
+                        current[(media_type, entry.media_id)] = self._entry_state(entry)
+            previous = self._states_before(username, date, backup_id)
+            next_backup = self._next_backup(username, date, backup_id)
+            absent = (0, None, None, None, None, None)
+            for key in set(current) | {k for k, state in previous.items() if state[0] and k[0] in entries_by_type}:
+                prev_state = previous.get(key)
+                cur_state = current.get(key, absent)
+                if cur_state == (prev_state or absent):
+                    continue
+                self._insert_history(username, key, date, backup_id, cur_state)
+                if not next_backup:
+                    continue
+                next_row = self._history_row(username, key[0], key[1], next_backup['id'])
+                if not next_row:
+                    # The next backup implicitly inherited prev_state; pin it explicitly.
+                    self._insert_history(username, key, next_backup['date'], next_backup['id'], prev_state or absent)
+                elif self._row_state(next_row) == cur_state:
+                    self._delete_history_row(username, key, next_backup['id'])
+            self._conn.execute("UPDATE backups SET history_recorded = 1 WHERE id = ?", (backup_id,))
+
+    def _remove_history(self, backup_id):
+        backup = self._conn.execute("SELECT username, date FROM backups WHERE id = ?", (backup_id,)).fetchone()
+        if not backup:
+            return
+        username, date = backup['username'], backup['date']
+        rows = self._conn.execute("SELECT * FROM entry_history WHERE backup_id = ?", (backup_id,)).fetchall()
+        if not rows:
+            return
+        previous = self._states_before(username, date, backup_id)
+        next_backup = self._next_backup(username, date, backup_id)
+        self._conn.execute("DELETE FROM entry_history WHERE backup_id = ?", (backup_id,))
+        if not next_backup:
+            return
+        for row in rows:
+            key = (row['media_type'], row['media_id'])
+            next_row = self._history_row(username, key[0], key[1], next_backup['id'])
+            next_state = self._row_state(next_row) if next_row else self._row_state(row)
+            prev_state = previous.get(key) or (0, None, None, None, None, None)
+            if next_state == prev_state:
+                if next_row:
+                    self._delete_history_row(username, key, next_backup['id'])
+            elif not next_row:
+                self._insert_history(username, key, next_backup['date'], next_backup['id'], next_state)
+
+    def timeline(self, username, media_id):
+        """Change points of one title for one user, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM entry_history WHERE username = ? AND media_id = ? ORDER BY date, backup_id",
+                (username, media_id)).fetchall()
+            media = self._conn.execute("SELECT * FROM media WHERE media_id = ?", (media_id,)).fetchone()
+        return {
+            'mediaId': media_id,
+            'type': media['media_type'] if media else (rows[0]['media_type'] if rows else None),
+            'title': {'romaji': media['romaji'], 'english': media['english'], 'native': media['native']} if media else None,
+            'username': username,
+            'changes': [{
+                'backup_id': row['backup_id'],
+                'date': row['date'],
+                'present': bool(row['present']),
+                'status': row['status'],
+                'progress': row['progress'],
+                'progressVolumes': row['progress_volumes'],
+                'score': row['score'],
+                'repeat': row['repeat']
+            } for row in rows]
+        }
+
+    def search(self, query, username=None, limit=20):
+        """Prefix-matches every query token against romaji, English and native titles.
+        Returns matching media with the backups (and statuses) they appear in."""
+        tokens = split_tokens(query)
+        if not tokens:
+            return []
+        token_sql = " INTERSECT ".join(
+            ["SELECT media_type, media_id FROM title_tokens WHERE token >= ? AND token < ?"] * len(tokens))
+        params = []
+        for token in tokens:
+            params.extend([token, _prefix_upper_bound(token)])
+        user_sql = ""
+        if username:
+            user_sql = (" AND EXISTS (SELECT 1 FROM backup_media bm JOIN backups b ON b.id = bm.backup_id "
+                        "WHERE bm.media_type = m.media_type AND bm.media_id = m.media_id AND b.username = ?)")
+            params.append(username)
+        params.append(limit)
+        with self._lock:
+            media_rows = self._conn.execute(
+                f"SELECT m.* FROM media m JOIN ({token_sql}) t "
+                f"ON t.media_type = m.media_type AND t.media_id = m.media_id WHERE 1 = 1{user_sql} "
+                f"ORDER BY COALESCE(m.romaji, m.english, m.native) LIMIT ?", params).fetchall()
+            results = []
+            for media in media_rows:
+                posting_params = [media['media_type'], media['media_id']]
+                posting_user_sql = ""
+                if username:
+                    posting_user_sql = " AND b.username = ?"
+                    posting_params.append(username)
+                postings = self._conn.execute(
+                    "SELECT b.id, b.date, b.username, bm.status FROM backup_media bm "
+                    "JOIN backups b ON b.id = bm.backup_id "
+                    f"WHERE bm.media_type = ? AND bm.media_id = ?{posting_user_sql} ORDER BY b.date DESC",
+                    posting_params).fetchall()
+                results.append({
+                    'mediaId': media['media_id'],
+                    'type': media['media_type'],
+                    'title': {'romaji': media['romaji'], 'english': media['english'], 'native': media['native']},
+                    'backups': [{'id': p['id'], 'date': p['date'], 'username': p['username'], 'status': p['status']}
+                                for p in postings]
+                })
+        return results
+
+    def get(self, backup_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM backups WHERE id = ?", (backup_id,)).fetchone()
+        if not row:
+            return None
+        backup = self._row_to_backup(row)
+        backup['filename'] = row['filename']
+        backup['stats'] = json.loads(row['stats']) if row['stats'] else {}
+        backup['trace'] = json.loads(row['trace']) if row['trace'] else None
+        return backup
+
+    def filenames(self):
+        with self._lock:
+            return {row['filename']: row['id'] for row in self._conn.execute("SELECT id, filename FROM backups")}
+
+    # --- Integrity scrubbing ---
+
+    def scrub_candidates(self, stored_keys=()):
+        """(id, filename) of the archives to check: first those of `stored_keys` that are
+        not indexed (e.g. sync_backup_index could not read them), then all backups, never
+        verified first, then least recently verified."""
+        with self._lock:
+            indexed = [(row['id'], row['filename']) for row in self._conn.execute(
+                "SELECT id, filename FROM backups ORDER BY verified_at IS NOT NULL, verified_at, date")]
+        filenames = {filename for _, filename in indexed}
+        return [(backup_id_of(key), key) for key in stored_keys if key not in filenames] + indexed
+
+    def mark_verified(self, backup_id, checked_at):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE backups SET verified_at = ? WHERE id = ?", (checked_at, backup_id))
+
+    def add_scrub_finding(self, backup_id, filename, status, error, checked_at, quarantine_key=None):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO scrub_findings VALUES (?, ?, ?, ?, ?, ?)",
+                               (filename, backup_id, status, error, checked_at, quarantine_key))
+
+    def scrub_findings(self, limit=100):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT * FROM scrub_findings ORDER BY checked_at DESC LIMIT ?", (limit,))]
+
+    def verification_counts(self):
+        """Indexed backups that were / were never verified, and recorded findings by status."""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) AS total, COUNT(verified_at) AS verified FROM backups").fetchone()
+            findings = {r['status']: r['n'] for r in self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM scrub_findings GROUP BY status")}
+        return {'total': row['total'], 'verified': row['verified'], 'unverified': row['total'] - row['verified'],
+                'findings': findings}
+
+    # --- Static catalog ---
+
+    def user_summaries(self):
+        """Per user: number of backups and date of the latest one, by username."""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT username, COUNT(*) AS backups, MAX(date) AS latest FROM backups "
+                "GROUP BY username ORDER BY username")]
+
+    def user_months(self, username):
+        """(YYYY-MM, number of backups) of a user, newest month first."""
+        with self._lock:
+            return [(row['month'], row['n']) for row in self._conn.execute(
+                "SELECT substr(date, 1, 7) AS month, COUNT(*) AS n FROM backups WHERE username = ? "
+                "GROUP BY month ORDER BY month DESC", (username,))]
+
+    def catalog_backups(self, username=None, month=None, limit=None):
+        """Backups (newest first) with their storage key, optionally of one user and month."""
+        where, params = [], []
+        if username is not None:
+            where.append("username = ?")
+            params.append(username)
+        if month is not None:
+            where.append("date >= ? AND date < ?")
+            params.extend([month, month + '\uffff'])
+        query = f"SELECT * FROM backups{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY date DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        backups = []
+        for row in rows:
+            backup = self._row_to_backup(row)
+            backup['filename'] = row['filename']
+            backups.append(backup)
+        return backups
+
+    def list_backups(self, username=None, date_from=None, date_to=None, sort='desc', cursor=None, limit=None):
+        """Keyset-paginated listing. Returns (backups, next_cursor, total)."""
+        if sort not in self.SORT_ORDERS:
+            raise ValueError(f"Invalid sort order '{sort}'. Use one of: {', '.join(self.SORT_ORDERS)}.")
+        where = []
+        params = []
+        if username:
+            where.append("username = ?")
+            params.append(username)
+        if date_from:
+            where.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            # A bare YYYY-MM-DD upper bound includes the whole day.
+            where.append("date <= ?")
+            params.append(date_to + 'T23:59:59.999999' if len(date_to) == 10 else date_to)
+
+        filter_sql = f" WHERE {' AND '.join(where)}" if where else ""
+        page_where = list(where)
+        page_params = list(params)
+        if cursor:
+            cursor_date, cursor_id = self.decode_cursor(cursor)
+            op = '<' if sort == 'desc' else '>'
+            page_where.append(f"(date {op} ? OR (date = ? AND id {op} ?))")
+            page_params.extend([cursor_date, cursor_date, cursor_id])
+        page_sql = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+        order = 'DESC' if sort == 'desc' else 'ASC'
+        query = f"SELECT * FROM backups{page_sql} ORDER BY date {order}, id {order}"
+        if limit is not None:
+            query += " LIMIT ?"
+            page_params.append(limit + 1)
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM backups{filter_sql}", params).fetchone()[0]
+            rows = self._conn.execute(query, page_params).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1]['date'], rows[-1]['id'])
+        return [self._row_to_backup(row) for row in rows], next_cursor, total
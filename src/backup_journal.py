@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import datetime
+
+from state_files import write_json_atomic
+
+# Stages of a backup run, in order. A record left behind by a crash tells how far the
+# run got: 'started' (fetching/exporting), 'exported' (all members and the meta data
+# are in the staging folder, flushed to disk), 'archived' (the validated zip is in the
+# staging folder, flushed to disk), 'stored' (the archive is in storage).
+STAGES = ('started', 'exported', 'archived', 'stored')
+
+
+class BackupJournal:
+    """One small JSON record per backup in progress, in `directory`. Each stage a run
+    completes is recorded (atomically and flushed to disk) together with what is needed
+    to continue from there; the record is removed once the run is finished or has
+    cleaned up after a failure. Records still present at startup belong to runs that
+    were interrupted."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, backup_id):
+        return os.path.join(self.directory, f"{backup_id}.json")
+
+    def record(self, backup_id, stage, **data):
+        """Marks `stage` as completed; `data` is added to the record."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown backup stage '{stage}'.")
+        record = {'id': backup_id} if stage == 'started' else (self.get(backup_id) or {'id': backup_id})
+        record.update(data, stage=stage, updated=datetime.now().isoformat())
+        write_json_atomic(self._path(backup_id), record, durable=True)
+
+    def get(self, backup_id):
+        try:
+            with open(self._path(backup_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def finish(self, backup_id):
+        try:
+            os.remove(self._path(backup_id))
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        """Records of interrupted runs, oldest first. Unreadable records are returned
+        as {'id': ..., 'stage': None}."""
+        records = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))  # leftover of an interrupted write
+                continue
+            backup_id = name[:-len('.json')]
+            try:
+                record = self.get(backup_id)
+            except ValueError:
+                record = None
+            records.append(record if isinstance(record, dict) else {'id': backup_id, 'stage': None})
+        return sorted(records, key=lambda record: record.get('updated', ''))
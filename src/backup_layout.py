@@ -0,0 +1,37 @@
+import re
+
+# Backup ids are "<username>_<YYYYmmdd_HHMMSS>"; usernames may contain underscores.
+BACKUP_ID_RE = re.compile(r'^(?P<user>.+)_(?P<ts>\d{8}_\d{6})$')
+
+
+def shard_name(username):
+    """Directory name of a user's shard. Top-level names starting with '_' are reserved
+    for staging folders, so such usernames get a prefix."""
+    name = re.sub(r'[^\w-]', '_', username)
+    return name if name and not name.startswith('_') else f"user{name}"
+
+
+def shard_key(backup_id):
+    """Storage key of a backup: <user>/<yyyy>/<mm>/<id>.zip. Ids that do not follow
+    the usual pattern keep the flat key."""
+    match = BACKUP_ID_RE.match(backup_id)
+    if not match:
+        return legacy_key(backup_id)
+    ts = match.group('ts')
+    return f"{shard_name(match.group('user'))}/{ts[:4]}/{ts[4:6]}/{backup_id}.zip"
+
+
+def legacy_key(backup_id):
+    """Key of a backup in the old flat layout (all archives directly in BACKUP_DIR)."""
+    return f"{backup_id}.zip"
+
+
+def backup_id_of(key):
+    return key.rsplit('/', 1)[-1][:-len('.zip')]
+
+
+def is_backup_key(key):
+    """True for flat and sharded archive keys; False for staging folders and
+    quarantined archives (those are nested differently)."""
+    parts = key.split('/')
+    return len(parts) == 1 or (len(parts) == 4 and not parts[0].startswith('_'))
@@ -0,0 +1,174 @@
+import html
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+from urllib.parse import quote
+
+from backup_layout import shard_name
+
+UNSAFE_CHARS_RE = re.compile(r'[^\w.-]')
+
+
+class StaticCatalog:
+    """Pre-rendered, read-only copy of the backup listings that a plain web server
+    (e.g. nginx) can serve while the app is down or busy. Layout below `directory`:
+
+        index.json, index.html          all users and the latest backups
+        users/<user>/index.json         months with backups of a user, newest first
+        users/<user>/index.html         all backups of a user
+        users/<user>/<YYYY-MM>.json     one listing page: a user's backups of a month
+        stats/<backup id>.json          what GET /backup/<id>/stats returns
+
+    Links in the JSON files are relative to `directory`; archive links are
+    `archive_url` + storage key. After a backup is added or removed only the files of
+    its user and month and the top-level index are rewritten. Every file is replaced
+    atomically, so the web server never serves a partial one."""
+
+    def __init__(self, directory, backup_index, archive_url='../', latest_count=50):
+        self.directory = directory
+        self.backup_index = backup_index
+        self.archive_url = archive_url
+        self.latest_count = latest_count
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def user_dir(username):
+        return f"users/{shard_name(username)}"
+
+    @staticmethod
+    def stats_file(backup_id):
+        return f"stats/{UNSAFE_CHARS_RE.sub('_', backup_id)}.json"
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _write_json(self, name, data):
+        self._write(name, json.dumps(data, ensure_ascii=False))
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _entry(self, backup):
+        entry = {key: backup[key] for key in ['id', 'date', 'username', 'content', 'size']}
+        entry['download'] = self.archive_url + quote(backup['filename'])
+        entry['stats'] = self.stats_file(backup['id'])
+        return entry
+
+    # --- Updates ---
+
+    def backup_added(self, backup_id):
+        backup = self.backup_index.get(backup_id)
+        if backup is None:
+            return
+        with self._lock:
+            self._write_json(self.stats_file(backup_id), backup['stats'])
+            self._refresh(backup['username'], backup['date'][:7])
+
+    def backup_removed(self, backup):
+        """`backup` is the index record (BackupIndex.get) from before the removal."""
+        with self._lock:
+            self._remove(self.stats_file(backup['id']))
+            self._refresh(backup['username'], backup['date'][:7])
+
+    def _refresh(self, username, month):
+        self._write_month(username, month)
+        self._write_user(username)
+        self._write_root()
+
+    def rebuild(self):
+        """Writes the whole catalog and removes files of backups no longer indexed.
+        Stats files that already exist are kept (a backup's stats never change)."""
+        with self._lock:
+            keep = {'index.json', 'index.html'}
+            for backup in self.backup_index.catalog_backups():
+                name = self.stats_file(backup['id'])
+                keep.add(name)
+                if not os.path.exists(os.path.join(self.directory, name)):
+                    self._write_json(name, self.backup_index.get(backup['id'])['stats'])
+            for user in self.backup_index.user_summaries():
+                user_dir = self.user_dir(user['username'])
+                keep.update([f"{user_dir}/index.json", f"{user_dir}/index.html"])
+                for month in self._write_user(user['username']):
+                    self._write_month(user['username'], month)
+                    keep.add(f"{user_dir}/{month}.json")
+            self._write_root()
+            for root, dirs, files in os.walk(self.directory, topdown=False):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if os.path.relpath(path, self.directory).replace(os.sep, '/') not in keep:
+                        os.remove(path)
+                if root != self.directory and not os.listdir(root):
+                    os.rmdir(root)
+
+    def _write_month(self, username, month):
+        name = f"{self.user_dir(username)}/{month}.json"
+        backups = self.backup_index.catalog_backups(username, month)
+        if not backups:
+            self._remove(name)
+            return
+        self._write_json(name, {'username': username, 'month': month,
+                                'backups': [self._entry(backup) for backup in backups]})
+
+    def _write_user(self, username):
+        """Writes the user's index files; returns the user's months."""
+        user_dir = self.user_dir(username)
+        months = self.backup_index.user_months(username)
+        if not months:
+            shutil.rmtree(os.path.join(self.directory, user_dir), ignore_errors=True)
+            return []
+        self._write_json(f"{user_dir}/index.json", {
+            'username': username,
+            'total': sum(count for _, count in months),
+            'months': [{'month': month, 'backups': count, 'href': f"{user_dir}/{month}.json"}
+                       for month, count in months]
+        })
+        backups = [self._entry(backup) for backup in self.backup_index.catalog_backups(username)]
+        self._write(f"{user_dir}/index.html", self._render_page(f"Backups of {username}", backups, '../../'))
+        return [month for month, _ in months]
+
+    def _write_root(self):
+        users = [dict(user, href=f"{self.user_dir(user['username'])}/index.json")
+                 for user in self.backup_index.user_summaries()]
+        latest = [self._entry(backup) for backup in self.backup_index.catalog_backups(limit=self.latest_count)]
+        self._write_json('index.json', {'generated_at': datetime.now().isoformat(), 'users': users,
+                                        'latest': latest})
+        self._write('index.html', self._render_page('AniVault backups', latest, '', users))
+
+    # --- HTML ---
+
+    def _render_page(self, title, backups, root, users=None):
+        """A minimal page: optional user table, then a table of backups. `root` is the
+        path from the page to the catalog directory."""
+        esc = html.escape
+        parts = [f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n<title>{esc(title)}</title>\n"
+                 "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+                 "td,th{padding:.3em .8em;border-bottom:1px solid #ddd;text-align:left}</style>\n</head>\n<body>\n"
+                 f"<h1>{esc(title)}</h1>\n<p>Read-only copy, generated {esc(datetime.now().strftime('%Y-%m-%d %H:%M'))}.</p>\n"]
+        if users is not None:
+            parts.append("<h2>Users</h2>\n<table>\n<tr><th>User</th><th>Backups</th><th>Latest</th></tr>\n")
+            for user in users:
+                page = f"{self.user_dir(user['username'])}/index.html"
+                parts.append(f"<tr><td><a href=\"{esc(root + page)}\">{esc(user['username'])}</a></td>"
+                             f"<td>{user['backups']}</td><td>{esc(user['latest'][:16].replace('T', ' '))}</td></tr>\n")
+            parts.append("</table>\n<h2>Latest backups</h2>\n")
+        parts.append("<table>\n<tr><th>Date</th><th>User</th><th>Content</th><th>Size</th><th></th></tr>\n")
+        for backup in backups:
+            download = backup['download'] if '://' in backup['download'] or backup['download'].startswith('/') \
+                else root + backup['download']
+            parts.append(f"<tr><td>{esc(backup['date'][:16].replace('T', ' '))}</td><td>{esc(backup['username'])}</td>"
+                         f"<td>{esc(backup['content'])}</td><td>{backup['size'] / (1024 * 1024):.1f} MB</td>"
+                         f"<td><a href=\"{esc(download)}\">Download</a> · "
+                         f"<a href=\"{esc(root + backup['stats'])}\">Stats</a></td></tr>\n")
+        parts.append("</table>\n</body>\n</html>\n")
+        return ''.join(parts)
@@ -0,0 +1,92 @@
+import gzip
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'text/javascript', 'text/css',
+                          'text/html', 'text/plain', 'application/xml', 'text/xml', 'image/svg+xml'}
+MIN_SIZE = 1024
+# Compressed static files, keyed by (path, etag, encoding). Assets are few and small.
+_static_cache = {}
+_static_cache_lock = threading.Lock()
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content coding the client accepts, or None."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in (['br'] if brotli else []) + ['gzip']:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def init_compression(app, min_size=MIN_SIZE):
+    """Compresses text responses of at least `min_size` bytes with brotli (if the
+    `brotli` package is installed) or gzip, depending on the client's Accept-Encoding.
+    Streamed responses such as the SSE feed and backup downloads are left alone."""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+            return response
+        is_static = request.endpoint == 'static'
+        if response.is_streamed and not is_static:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if is_static:
+            # send_file responses pass the file through; read it once and cache the result.
+            etag, _ = response.get_etag()
+            key = (request.path, etag, encoding)
+            with _static_cache_lock:
+                compressed = _static_cache.get(key)
+            if compressed is not None:
+                close = getattr(response.response, 'close', None)
+                if close is not None:
+                    response.call_on_close(close)
+            else:
+                response.direct_passthrough = False
+                data = response.get_data()
+                if len(data) < min_size:
+                    return response
+                compressed = _compress(data, encoding)
+                with _static_cache_lock:
+                    _static_cache[key] = compressed
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressed = _compress(data, encoding)
+
+        response.direct_passthrough = False
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The representation changed; a weak ETag keeps conditional requests working.
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,65 @@
+NO_DATE = (0, 0, 0)
+
+
+def _int(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _date(date_obj):
+    if not date_obj:
+        return NO_DATE
+    return (_int(date_obj.get('year')), _int(date_obj.get('month')), _int(date_obj.get('day')))
+
+
+class Entry:
+    """One list entry, normalized once when it is read from AniList (or an archive) and
+    shared by the stats, the exporters and the backup index. Missing numbers are 0,
+    missing strings '' and missing dates NO_DATE. `raw` keeps the original dict for
+    the canonical JSON members."""
+
+    __slots__ = ('raw', 'media_id', 'id_mal', 'status', 'score', 'progress', 'progress_volumes', 'repeat',
+                 'started_at', 'completed_at', 'title_romaji', 'title_english', 'title_native', 'title',
+                 'format', 'media_status', 'episodes', 'chapters', 'volumes')
+
+    def __init__(self, raw):
+        media = raw.get('media') or {}
+        titles = media.get('title') or {}
+        self.raw = raw
+        self.media_id = _int(raw.get('mediaId'))
+        self.id_mal = _int(media.get('idMal'))
+        self.status = str(raw.get('status') or '').upper()
+        score = raw.get('score')
+        self.score = score if isinstance(score, (int, float)) and score > 0 else 0
+        self.progress = _int(raw.get('progress'))
+        self.progress_volumes = _int(raw.get('progressVolumes'))
+        self.repeat = _int(raw.get('repeat'))
+        self.started_at = _date(raw.get('startedAt'))
+        self.completed_at = _date(raw.get('completedAt'))
+        self.title_romaji = titles.get('romaji') or ''
+        self.title_english = titles.get('english') or ''
+        self.title_native = titles.get('native') or ''
+        self.title = self.title_romaji or self.title_english or self.title_native
+        self.format = str(media.get('format') or '').upper()
+        self.media_status = media.get('status')
+        self.episodes = _int(media.get('episodes'))
+        self.chapters = _int(media.get('chapters'))
+        self.volumes = _int(media.get('volumes'))
+
+    @property
+    def in_progress(self):
+        """Currently watched/read; AniList's REPEATING counts as in progress everywhere."""
+        return self.status in ('CURRENT', 'REPEATING')
+
+
+def parse_entries(raw_entries):
+    return [Entry(raw) for raw in raw_entries]
+
+
+def collection_entries(raw_data, alias):
+    """Entries of all lists of one collection (e.g. 'MediaListCollection') of a raw
+    AniList response, in list order."""
+    collection = (raw_data.get('data') or {}).get(alias) or {}
+    return [Entry(raw) for list_group in collection.get('lists') or [] for raw in list_group.get('entries') or []]
@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import as_completed
+from contextlib import nullcontext
+
+from json_stream import JsonArrayWriter
+
+# Registry of export formats. Each exporter declares the archive members it
+# produces and a function that renders them from a shared ExportContext.
+EXPORTERS = {}
+
+# 'json' holds the canonical entry data and is always written.
+REQUIRED_FORMATS = ['json']
+DEFAULT_FORMATS = ['json', 'stats', 'mal_xml']
+
+
+class Exporter:
+    def __init__(self, name, members, func, label=None, lean=False):
+        self.name = name
+        self.members = list(members)
+        self.func = func
+        self.label = label or name
+        # Whether the fields of the 'lean' AniList query profile (api.py) are enough.
+        self.lean = lean
+        # Optional class that writes the members entry by entry (streaming mode).
+        self.stream_writer = None
+
+    def render(self, context):
+        outputs = self.func(context)
+        missing = [m for m in self.members if m not in outputs]
+        if missing:
+            raise ValueError(f"Exporter '{self.name}' did not produce: {', '.join(missing)}")
+        return outputs
+
+
+class ExportContext:
+    """Parsed entries (entries.Entry) and stats shared read-only by all exporters of one backup."""
+
+    def __init__(self, username, anime_entries, manga_entries, anime_stats, manga_stats, generated_at):
+        self.username = username
+        self.anime_entries = anime_entries
+        self.manga_entries = manga_entries
+        self.anime_stats = anime_stats
+        self.manga_stats = manga_stats
+        self.generated_at = generated_at
+
+
+def register_exporter(name, members, label=None, lean=False):
+    def decorator(func):
+        EXPORTERS[name] = Exporter(name, members, func, label, lean)
+        return func
+    return decorator
+
+
+def register_stream_writer(name):
+    """Attaches a streaming writer class to an already registered exporter. The class is
+    built with (output_dir, username, generated_at), receives add(media_type, entry) per
+    Entry and close(anime_stats, manga_stats) once all entries have been fed."""
+    def decorator(cls):
+        EXPORTERS[name].stream_writer = cls
+        return cls
+    return decorator
+
+
+def supports_streaming(formats):
+    return all(EXPORTERS[name].stream_writer is not None for name in formats)
+
+
+def supports_lean(formats):
+    return all(EXPORTERS[name].lean for name in formats)
+
+
+def open_stream_writers(formats, output_dir, username, generated_at):
+    return [EXPORTERS[name].stream_writer(output_dir, username, generated_at) for name in formats]
+
+
+def resolve_formats(formats=None):
+    """Returns the registered format names to run, in registry order."""
+    if formats is None:
+        formats = DEFAULT_FORMATS
+    if isinstance(formats, str) or not isinstance(formats, (list, tuple)):
+        raise TypeError("Export formats must be a list of format names.")
+    requested = set(formats)
+    unknown = requested - set(EXPORTERS)
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+    requested.update(REQUIRED_FORMATS)
+    return [name for name in EXPORTERS if name in requested]
+
+
+def members_for_formats(formats):
+    members = []
+    for name in formats:
+        members.extend(EXPORTERS[name].members)
+    return members
+
+
+def _render_and_write(exporter, context, output_dir, trace=None):
+    with trace.span(f'export.{exporter.name}') if trace else nullcontext():
+        outputs = exporter.render(context)
+        for member in exporter.members:
+            with open(os.path.join(output_dir, member), 'w', encoding='utf-8') as f:
+                f.write(outputs[member])
+    return exporter.members
+
+
+def run_exporters(context, formats, output_dir, executor, trace=None):
+    """Runs the given formats concurrently on `executor` and writes their members
+    into `output_dir`. Returns the list of written member names. With `executor=None`
+    the formats run one after another in the calling thread (used while profiling,
+    since cProfile only sees its own thread). Each format is recorded as an
+    `export.<name>` span on `trace`."""
+    written = []
+    errors = []
+    if executor is None:
+        for name in formats:
+            try:
+                written.extend(_render_and_write(EXPORTERS[name], context, output_dir, trace))
+            except Exception as e:
+                errors.append(f"{name}: {str(e)}")
+    else:
+        futures = {
+            executor.submit(_render_and_write, EXPORTERS[name], context, output_dir, trace): name
+            for name in formats
+        }
+        for future in as_completed(futures):
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                errors.append(f"{futures[future]}: {str(e)}")
+    if errors:
+        raise RuntimeError(f"Export failed ({'; '.join(errors)})")
+    return written
+
+
+@register_exporter('json', ['anime.json', 'manga.json'], label='Raw JSON', lean=True)
+def export_json(context):
+    return {
+        'anime.json': json.dumps([entry.raw for entry in context.anime_entries], ensure_ascii=False, indent=2),
+        'manga.json': json.dumps([entry.raw for entry in context.manga_entries], ensure_ascii=False, indent=2),
+    }
+
+
+@register_stream_writer('json')
+class JsonStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.writers = {media_type: JsonArrayWriter(os.path.join(output_dir, f'{media_type}.json'))
+                        for media_type in ['anime', 'manga']}
+
+    def add(self, media_type, entry):
+        self.writers[media_type].add(entry.raw)
+
+    def close(self, anime_stats, manga_stats):
+        for writer in self.writers.values():
+            writer.close()
+
+
+def _stats_text(username, generated_at, anime_stats, manga_stats):
+    return f"""Anime & Manga Statistics for {username}
+Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}
+{json.dumps({'anime': anime_stats, 'manga': manga_stats}, indent=2)}
+"""
+
+
+@register_exporter('stats', ['animemanga_stats.txt'], label='Stats summary', lean=True)
+def export_stats(context):
+    return {'animemanga_stats.txt': _stats_text(context.username, context.generated_at,
+                                                context.anime_stats, context.manga_stats)}
+
+
+@register_stream_writer('stats')
+class StatsStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.path = os.path.join(output_dir, 'animemanga_stats.txt')
+        self.username = username
+        self.generated_at = generated_at
+
+    def add(self, media_type, entry):
+        pass
+
+    def close(self, anime_stats, manga_stats):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(_stats_text(self.username, self.generated_at, anime_stats, manga_stats))
+
+
+CSV_COLUMNS = ['mediaId', 'idMal', 'title', 'format', 'status', 'score', 'progress',
+               'progressVolumes', 'repeat', 'startedAt', 'completedAt']
+
+
+def _format_date(date):
+    if not date[0]:
+        return ''
+    return '-'.join(f"{part:02d}" for part in date)
+
+
+def _csv_row(entry):
+    return [
+        entry.media_id or None, entry.id_mal or '', entry.title, entry.format, entry.status, entry.score,
+        entry.progress, entry.progress_volumes, entry.repeat,
+        _format_date(entry.started_at), _format_date(entry.completed_at)
+    ]
+
+
+def _entries_to_csv(entries):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for entry in entries:
+        writer.writerow(_csv_row(entry))
+    return out.getvalue()
+
+
+@register_exporter('csv', ['anime.csv', 'manga.csv'], label='CSV')
+def export_csv(context):
+    return {
+        'anime.csv': _entries_to_csv(context.anime_entries),
+        'manga.csv': _entries_to_csv(context.manga_entries),
+    }
+
+
+@register_stream_writer('csv')
+class CsvStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.files = {}
+        self.writers = {}
+        for media_type in ['anime', 'manga']:
+            # newline='' keeps the csv module's \r\n row endings identical to the buffered export
+            self.files[media_type] = open(os.path.join(output_dir, f'{media_type}.csv'), 'w', encoding='utf-8', newline='')
+            self.writers[media_type] = csv.writer(self.files[media_type])
+            self.writers[media_type].writerow(CSV_COLUMNS)
+
+    def add(self, media_type, entry):
+        self.writers[media_type].writerow(_csv_row(entry))
+
+    def close(self, anime_stats, manga_stats):
+        for f in self.files.values():
+            f.close()
+
+
+@register_exporter('not_in_mal', ['anime_NotInMal.json', 'manga_NotInMal.json'], label='Entries missing on MAL')
+def export_not_in_mal(context):
+    def not_in_mal(entries):
+        return [e.raw for e in entries if not e.id_mal]
+    return {
+        'anime_NotInMal.json': json.dumps(not_in_mal(context.anime_entries), ensure_ascii=False, indent=2),
+        'manga_NotInMal.json': json.dumps(not_in_mal(context.manga_entries), ensure_ascii=False, indent=2),
+    }
+
+
+@register_stream_writer('not_in_mal')
+class NotInMalStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.writers = {media_type: JsonArrayWriter(os.path.join(output_dir, f'{media_type}_NotInMal.json'))
+                        for media_type in ['anime', 'manga']}
+
+    def add(self, media_type, entry):
+        if not entry.id_mal:
+            self.writers[media_type].add(entry.raw)
+
+    def close(self, anime_stats, manga_stats):
+        for writer in self.writers.values():
+            writer.close()
+
+
+TACHI_CATEGORIES = [{"name": "Anilist", "order": 0}]
+
+
+@register_exporter('tachiyomi', ['manga_TachiyomiBackup.json'], label='Tachiyomi')
+def export_tachiyomi(context):
+    tachi_backup = {
+        "version": 2,
+        "mangas": [_tachi_manga(entry) for entry in context.manga_entries],
+        "categories": TACHI_CATEGORIES
+    }
+    return {'manga_TachiyomiBackup.json': json.dumps(tachi_backup, ensure_ascii=False, indent=2)}
+
+
+def _tachi_manga(entry):
+    return {
+        "manga": {
+            "title": entry.title,
+            "author": "",
+            "artist": "",
+            "description": "",
+            "genre": [],
+            "status": entry.media_status,
+            "thumbnail_url": ""
+        },
+        "chapters": [],
+        "track": {
+            # Raw values: Entry normalizes a missing status to "" and a missing score to 0.
+            "status": entry.raw.get('status'),
+            "score": entry.raw.get('score'),
+            "last_chapter_read": entry.progress
+        },
+        "categories": ["Anilist"]
+    }
+
+
+@register_stream_writer('tachiyomi')
+class TachiyomiStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.writer = JsonArrayWriter(
+            os.path.join(output_dir, 'manga_TachiyomiBackup.json'),
+            prefix='{\n  "version": 2,\n  "mangas": ',
+            suffix=',\n  "categories": ' + json.dumps(TACHI_CATEGORIES, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                   + '\n}',
+            level=1)
+
+    def add(self, media_type, entry):
+        if media_type == 'manga':
+            self.writer.add(_tachi_manga(entry))
+
+    def close(self, anime_stats, manga_stats):
+        self.writer.close()
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+
+# Version of the table layout below; older databases are emptied on open.
+SCHEMA_VERSION = 1
+
+
+def encode_key(key):
+    """Canonical text of a fragment key (a flat tuple of numbers, strings, None and
+    date tuples): equal keys always give the same text, so rows can be found by it."""
+    return json.dumps(key, separators=(',', ':'))
+
+
+def decode_key(text):
+    return tuple(tuple(value) if isinstance(value, list) else value for value in json.loads(text))
+
+
+class _ListState:
+    """The fragments of one list as of its last generation."""
+
+    def __init__(self, generation, fragments, copies):
+        self.generation = generation
+        self.fragments = fragments  # key -> (text, status)
+        self.copies = copies        # Counter: key -> occurrences in the list
+        self.counts = Counter()     # status -> occurrences
+        for key, n in copies.items():
+            self.counts[fragments[key][1]] += n
+
+
+class FragmentCache:
+    """Persistent cache of rendered list items (e.g. MAL XML elements), per list.
+
+    A fragment is keyed by the tuple of the entry fields it is rendered from, so an
+    unchanged entry maps to the same key and is not rendered again; the cache never
+    has to be invalidated. Each list keeps only the fragments of its latest
+    generation, and the per-status counts are carried over from that generation and
+    adjusted by the added and removed items.
+
+    Lists are kept in memory (the `max_lists` most recently used) and in SQLite at
+    `db_path`, where only the changes of a generation are written. A generation
+    number in the database tells whether the in-memory copy is current, which
+    matters when several processes (the export pool) share the file."""
+
+    def __init__(self, db_path, max_lists=8):
+        self.db_path = db_path
+        self.max_lists = max_lists
+        self.hits = 0
+        self.misses = 0
+        self._lists = OrderedDict()
+        self._lock = threading.Lock()
+        self._list_locks = {}
+        self._conn = None
+        self._pid = None
+
+    def _db(self):
+        # Connections must not be shared with forked worker processes.
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._pid = os.getpid()
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                    # Version 0 stored marshal-ed keys, which are not canonical (rows of
+                    # removed entries were never deleted); it is only a cache, so start over.
+                    self._conn.executescript(f"""
+                        DROP TABLE IF EXISTS fragments;
+                        DROP TABLE IF EXISTS fragment_lists;
+                        PRAGMA user_version = {SCHEMA_VERSION};
+                    """)
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS fragment_lists (
+                        list_key TEXT PRIMARY KEY,
+                        generation INTEGER NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS fragments (
+                        list_key TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        status TEXT,
+                        copies INTEGER NOT NULL DEFAULT 1,
+                        PRIMARY KEY (list_key, key)
+                    ) WITHOUT ROWID;
+                """)
+        return self._conn
+
+    def _list_lock(self, list_key):
+        with self._lock:
+            return self._list_locks.setdefault(list_key, threading.Lock())
+
+    def _generation(self, conn, list_key):
+        row = conn.execute("SELECT generation FROM fragment_lists WHERE list_key = ?", (list_key,)).fetchone()
+        return row[0] if row else 0
+
+    def _load(self, conn, list_key):
+        generation = self._generation(conn, list_key)
+        with self._lock:
+            state = self._lists.get(list_key)
+            if state is not None and state.generation == generation:
+                self._lists.move_to_end(list_key)
+                return state
+        fragments, copies = {}, Counter()
+        for key, text, status, n in conn.execute(
+                "SELECT key, text, status, copies FROM fragments WHERE list_key = ?", (list_key,)):
+            key = decode_key(key)
+            fragments[key] = (text, status)
+            copies[key] = n
+        return _ListState(generation, fragments, copies)
+
+    def render(self, list_key, keys, entries, render):
+        """Renders a list. `keys` are the fragment keys of `entries` (same order), and
+        `render(entry)` returns (text, status) for entries not cached yet. Returns the
+        texts in list order and a Counter of the statuses."""
+        with self._list_lock(list_key):
+            conn = self._db()
+            state = self._load(conn, list_key)
+            fragments = state.fragments
+            new = {}
+            texts = []
+            for key, entry in zip(keys, entries):
+                fragment = fragments.get(key)
+                if fragment is None:
+                    fragment = new.get(key)
+                    if fragment is None:
+                        fragment = new[key] = render(entry)
+                texts.append(fragment[0])
+
+            copies = Counter(keys)
+            if copies != state.copies:
+                self._store(conn, list_key, state, copies, new)
+            with self._lock:
+                self._lists[list_key] = state
+                self._lists.move_to_end(list_key)
+                while len(self._lists) > self.max_lists:
+                    self._lists.popitem(last=False)
+                self.hits += len(texts) - len(new)
+                self.misses += len(new)
+            return texts, state.counts
+
+    def _store(self, conn, list_key, state, copies, new):
+        """Writes the next generation of a list: only the keys that were added, removed
+        or whose number of copies changed."""
+        fragments, old = state.fragments, state.copies
+        removed = old.keys() - copies.keys()
+        changed = [(key, n - old.get(key, 0)) for key, n in copies.items() if old.get(key) != n]
+        counts = state.counts.copy()
+        for key in removed:
+            counts[fragments[key][1]] -= old[key]
+        for key, delta in changed:
+            counts[(new.get(key) or fragments[key])[1]] += delta
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            generation = self._generation(conn, list_key)
+            if generation == state.generation:
+                conn.executemany("DELETE FROM fragments WHERE list_key = ? AND key = ?",
+                                 [(list_key, encode_key(key)) for key in removed])
+                written = [key for key, _ in changed]
+            else:
+                # Another process stored a generation in the meantime: write the whole list.
+                conn.execute("DELETE FROM fragments WHERE list_key = ?", (list_key,))
+                written = list(copies)
+            rows = []
+            for key in written:
+                text, status = new.get(key) or fragments[key]
+                rows.append((list_key, encode_key(key), text, status, copies[key]))
+            conn.executemany("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?)", rows)
+            generation += 1
+            conn.execute("INSERT OR REPLACE INTO fragment_lists VALUES (?, ?)", (list_key, generation))
+
+        for key in removed:
+            del fragments[key]
+        fragments.update(new)
+        state.copies = copies
+        state.counts = +counts
+        state.generation = generation
+
+    def stats(self):
+        with self._lock:
+            return {'lists_in_memory': len(self._lists), 'hits': self.hits, 'misses': self.misses}
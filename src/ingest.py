@@ -0,0 +1,201 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from archive_builder import finish_archive
+from entries import parse_entries
+from exporters import ExportContext, run_exporters
+from list_stats import calculate_stats
+
+# Archives written by the old BackupHandler: <user>_backup_<ts>.zip with the files in a
+# <user>_backup_<ts>/ folder and the full AniList responses as anime.json/manga.json.
+LEGACY_NAME_RE = re.compile(r'^(?P<user>.+?)_backup_(?P<ts>\d{8}_\d{6})\.zip$')
+# MAL's own export files: animelist_<unix time>_-_<user id>.xml.gz
+MAL_EXPORT_NAME_RE = re.compile(r'^(anime|manga)list_(?P<ts>\d{9,11})_')
+SOURCE_SUFFIXES = ('.zip', '.xml', '.xml.gz')
+
+MAL_STATUS_TO_ANILIST = {
+    'watching': 'CURRENT', 'reading': 'CURRENT', '1': 'CURRENT',
+    'completed': 'COMPLETED', '2': 'COMPLETED',
+    'on-hold': 'PAUSED', '3': 'PAUSED',
+    'dropped': 'DROPPED', '4': 'DROPPED',
+    'plan to watch': 'PLANNING', 'plan to read': 'PLANNING', '6': 'PLANNING',
+}
+MAL_TYPE_TO_ANILIST_FORMAT = {
+    'tv': 'TV', 'movie': 'MOVIE', 'special': 'SPECIAL', 'tv special': 'SPECIAL', 'ova': 'OVA', 'ona': 'ONA',
+    'music': 'MUSIC', 'manga': 'MANGA', 'novel': 'NOVEL', 'light novel': 'NOVEL', 'one-shot': 'ONE_SHOT',
+    'doujin': 'DOUJINSHI', 'doujinshi': 'DOUJINSHI', 'manhwa': 'MANHWA', 'manhua': 'MANHUA', 'oel': 'OEL',
+}
+
+
+class SkipSource(Exception):
+    """The file is not something to ingest (e.g. an archive already in the current format)."""
+
+
+def find_sources(directory):
+    """Paths of all candidate files below `directory`, sorted for a stable order."""
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(SOURCE_SUFFIXES):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def source_key(path):
+    """Identifies one version of a source file for resuming."""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _int(text):
+    try:
+        return int(float(text))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _collection_entries(data):
+    """Entries of a legacy anime.json/manga.json: either a full AniList response or a flat list."""
+    if isinstance(data, list):
+        return data
+    collections = (data or {}).get('data') or {}
+    collection = collections.get('MediaListCollection') or collections.get('MediaListCollection2') or {}
+    return [entry for list_group in collection.get('lists') or [] for entry in list_group.get('entries') or []]
+
+
+def parse_legacy_archive(path):
+    name = os.path.basename(path)
+    with zipfile.ZipFile(path, 'r') as zipf:
+        names = zipf.namelist()
+        if 'meta.json' in names:
+            raise SkipSource("already in the current format")
+        members = {}
+        for media_type in ['anime', 'manga']:
+            matches = [n for n in names if n == f'{media_type}.json' or n.endswith(f'/{media_type}.json')]
+            if not matches:
+                raise ValueError(f"No {media_type}.json in archive")
+            members[media_type] = _collection_entries(json.loads(zipf.read(matches[0]).decode('utf-8')))
+    match = LEGACY_NAME_RE.match(name) or re.match(r'^(?P<user>.+)_(?P<ts>\d{8}_\d{6})\.zip$', name)
+    if not match:
+        raise ValueError("Cannot tell username and date from the file name")
+    return {'kind': 'legacy', 'username': match.group('user'),
+            'date': datetime.strptime(match.group('ts'), '%Y%m%d_%H%M%S'), 'entries': members}
+
+
+def _mal_date(text):
+    parts = [_int(part) for part in (text or '').split('-')]
+    if len(parts) != 3:
+        parts = [0, 0, 0]
+    return {key: value or None for key, value in zip(['year', 'month', 'day'], parts)}
+
+
+def _mal_item(item, media_type):
+    def text(tag):
+        return (item.findtext(tag) or '').strip()
+    is_anime = media_type == 'anime'
+    mal_id = _int(text('series_animedb_id' if is_anime else 'series_mangadb_id'))
+    status = MAL_STATUS_TO_ANILIST.get(text('my_status').lower(), 'PLANNING')
+    entry = {
+        'mediaId': None,
+        'status': status,
+        'score': _int(text('my_score')),
+        'progress': _int(text('my_watched_episodes' if is_anime else 'my_read_chapters')),
+    }
+    if not is_anime:
+        entry['progressVolumes'] = _int(text('my_read_volumes'))
+    entry['repeat'] = _int(text('my_times_watched' if is_anime else 'my_times_read'))
+    entry['startedAt'] = _mal_date(text('my_start_date'))
+    entry['completedAt'] = _mal_date(text('my_finish_date'))
+    media = {
+        'idMal': mal_id or None,
+        'id': None,
+        'title': {'romaji': text('series_title') or None, 'english': None, 'native': None},
+        'type': media_type.upper(),
+        'format': MAL_TYPE_TO_ANILIST_FORMAT.get(text('series_type').lower()),
+    }
+    if is_anime:
+        media['episodes'] = _int(text('series_episodes')) or None
+    else:
+        media['chapters'] = _int(text('series_chapters')) or None
+        media['volumes'] = _int(text('series_volumes')) or None
+    media['status'] = None
+    entry['media'] = media
+    return entry
+
+
+def parse_mal_export(path):
+    """Reads a MyAnimeList XML export (optionally gzipped) into AniList-shaped entries.
+    Entries carry MAL IDs only, since the AniList IDs are unknown."""
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    username = None
+    media_type = None
+    entries = []
+    with opener(path, 'rb') as f:
+        for _, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == 'myinfo':
+                username = (elem.findtext('user_name') or '').strip() or None
+                export_type = (elem.findtext('user_export_type') or '').strip()
+                media_type = {'1': 'anime', '2': 'manga'}.get(export_type, media_type)
+                elem.clear()
+            elif elem.tag in ('anime', 'manga'):
+                media_type = media_type or elem.tag
+                entries.append(_mal_item(elem, elem.tag))
+                elem.clear()
+    if media_type is None:
+        raise ValueError("Not a MAL list export")
+    if not username:
+        raise ValueError("MAL export has no <user_name>")
+    match = MAL_EXPORT_NAME_RE.match(os.path.basename(path))
+    date = datetime.fromtimestamp(int(match.group('ts')) if match else os.path.getmtime(path))
+    return {'kind': 'mal_xml', 'username': username, 'date': date.replace(microsecond=0),
+            'entries': {media_type: entries}}
+
+
+def parse_source(path):
+    if path.lower().endswith('.zip'):
+        return parse_legacy_archive(path)
+    return parse_mal_export(path)
+
+
+def convert_source(path, staging_root, formats):
+    """Worker step: parses one source file and builds a validated current-format archive
+    (export members plus meta.json) in a staging folder below `staging_root`. Returns a dict
+    with the meta data, the staged zip, the staging folder and the raw entries of the
+    media types the source covers, or {'skipped': reason}."""
+    try:
+        source = parse_source(path)
+    except SkipSource as e:
+        return {'skipped': str(e)}
+    username, date = source['username'], source['date']
+    backup_id = f"{username}_{date.strftime('%Y%m%d_%H%M%S')}"
+    raw_entries = source['entries']
+    anime_entries = parse_entries(raw_entries.get('anime', []))
+    manga_entries = parse_entries(raw_entries.get('manga', []))
+    anime_stats, manga_stats = calculate_stats(anime_entries, manga_entries, username)
+
+    staging = os.path.join(staging_root, f"_TEMP_ingest_{backup_id}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        context = ExportContext(username, anime_entries, manga_entries, anime_stats, manga_stats, date)
+        run_exporters(context, formats, staging, None)
+        meta = {
+            'id': backup_id, 'date': date.isoformat(), 'username': username,
+            'stats': {'anime': anime_stats, 'manga': manga_stats}, 'formats': formats,
+            'archived_formats': formats, 'generated_at': date.isoformat(),
+            'source': {'kind': source['kind'], 'file': os.path.basename(path)},
+            # MAL exports have no AniList IDs, so they cannot take part in the entry history.
+            'history_types': list(raw_entries) if source['kind'] == 'legacy' else []
+        }
+        zip_path = finish_archive(staging, meta)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return {'meta': meta, 'zip_path': zip_path, 'staging': staging,
+            'entries': {t: raw_entries[t] for t in meta['history_types']}}
@@ -0,0 +1,146 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789+-.eE'
+CHUNK_SIZE = 64 * 1024
+
+
+class _Reader:
+    """Pull reader over a binary file object that decodes one JSON value at a time.
+    Only the value currently being decoded is held in memory."""
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(b'', final=True)
+        else:
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, got '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                result, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+                # A number cut off at a chunk boundary may continue in the next chunk.
+                is_number = isinstance(result, (int, float)) and not isinstance(result, bool)
+                if self.eof or (end < len(self.buffer) and not (is_number and self.buffer[end] in NUMBER_CHARS)):
+                    self.pos = end
+                    return result
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def _walk(reader, path, is_target):
+    if is_target(path):
+        yield path, reader.value()
+        return
+    char = reader.peek()
+    if char == '{':
+        reader.pos += 1
+        if reader.peek() == '}':
+            reader.pos += 1
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            yield from _walk(reader, path + (key,), is_target)
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect('}')
+            return
+    elif char == '[':
+        reader.pos += 1
+        if reader.peek() == ']':
+            reader.pos += 1
+            return
+        index = 0
+        while True:
+            yield from _walk(reader, path + (index,), is_target)
+            index += 1
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect(']')
+            return
+    else:
+        reader.value()
+
+
+def iter_values(fileobj, is_target, chunk_size=CHUNK_SIZE):
+    """Yields (path, value) for every value whose path satisfies `is_target`,
+    without materializing the rest of the document. `fileobj` must be binary."""
+    reader = _Reader(fileobj, chunk_size)
+    yield from _walk(reader, (), is_target)
+
+
+def _is_anilist_entry(path):
+    # data.<collection alias>.lists[i].entries[j]
+    return len(path) == 6 and path[0] == 'data' and path[2] == 'lists' and path[4] == 'entries'
+
+
+def iter_anilist_entries(fileobj, chunk_size=CHUNK_SIZE):
+    """Yields (collection_alias, entry) from a MediaListCollection GraphQL response."""
+    for path, entry in iter_values(fileobj, _is_anilist_entry, chunk_size):
+        yield path[1], entry
+
+
+def iter_json_array(fileobj, chunk_size=CHUNK_SIZE):
+    """Yields the items of a top-level JSON array one at a time."""
+    for _, item in iter_values(fileobj, lambda path: len(path) == 1, chunk_size):
+        yield item
+
+
+class JsonArrayWriter:
+    """Writes a JSON array item by item, byte-identical to json.dumps(items, indent=2).
+    With `level` > 0 the array is nested that deep in an indent=2 document whose text
+    before and after it is `prefix` and `suffix`."""
+
+    def __init__(self, path, prefix='', suffix='', level=0):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write(prefix)
+        self.suffix = suffix
+        self.indent = '\n' + '  ' * level
+        self.count = 0
+
+    def add(self, item):
+        self.f.write(('[' if self.count == 0 else ',') + self.indent + '  ')
+        self.f.write(json.dumps(item, ensure_ascii=False, indent=2).replace('\n', self.indent + '  '))
+        self.count += 1
+
+    def close(self):
+        self.f.write(self.indent + ']' if self.count else '[]')
+        self.f.write(self.suffix)
+        self.f.close()
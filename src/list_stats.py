@@ -0,0 +1,147 @@
+class StatsAccumulator:
+    """Builds the list statistics of one media type entry by entry."""
+
+    STATUS_KEYS = {'COMPLETED': 'completed', 'PLANNING': 'planning', 'DROPPED': 'dropped', 'PAUSED': 'on_hold'}
+
+    def __init__(self, media_type):
+        self.media_type = media_type
+        self.progress_key = 'watching' if media_type == 'anime' else 'reading'
+        self.status_map = {self.progress_key: 0, 'completed': 0, 'planning': 0, 'dropped': 0, 'on_hold': 0}
+        self.total = 0
+        self.progress = 0
+        self.progress_volumes = 0
+        self.score_sum = 0
+        self.score_count = 0
+
+    def add(self, entry):
+        self.total += 1
+        status_key = self.progress_key if entry.in_progress else self.STATUS_KEYS.get(entry.status)
+        if status_key in self.status_map:
+            self.status_map[status_key] += 1
+        self.progress += entry.progress
+        self.progress_volumes += entry.progress_volumes
+        if entry.score:
+            self.score_sum += entry.score
+            self.score_count += 1
+
+    def result(self, username=''):
+        stats = {'totalEntries': self.total}
+        if self.media_type == 'anime':
+            stats['episodesWatched'] = self.progress
+        else:
+            stats['chaptersRead'] = self.progress
+            stats['volumesRead'] = self.progress_volumes
+        stats['meanScore'] = round(self.score_sum / self.score_count, 1) if self.score_count else 0
+        stats['status'] = self.status_map
+        stats['username'] = username
+        return stats
+
+
+class ActivityAccumulator:
+    """Titles started and completed per year, month and day (from startedAt and
+    completedAt), plus the episodes/chapters of the titles completed in each period.
+
+    Periods are 'YYYY', 'YYYY-MM' and 'YYYY-MM-DD'. A date counts for every level it is
+    precise enough for: one with only a year and month counts for the year and month,
+    but for no day. Entries of both media types go into one accumulator."""
+
+    STARTED, COMPLETED, EPISODES, CHAPTERS = range(4)
+
+    def __init__(self):
+        # Counted per exact date while adding; rows() spreads them over the periods.
+        self.dates = {}  # (media_type, (year, month, day)) -> [started, completed, episodes, chapters]
+
+    def _counts(self, media_type, date):
+        counts = self.dates.get((media_type, date))
+        if counts is None:
+            counts = self.dates[(media_type, date)] = [0, 0, 0, 0]
+        return counts
+
+    def add(self, media_type, entry):
+        if entry.started_at[0]:
+            self._counts(media_type, entry.started_at)[self.STARTED] += 1
+        if entry.completed_at[0]:
+            counts = self._counts(media_type, entry.completed_at)
+            counts[self.COMPLETED] += 1
+            if media_type == 'anime':
+                counts[self.EPISODES] += entry.progress or entry.episodes
+            else:
+                counts[self.CHAPTERS] += entry.progress or entry.chapters
+
+    @staticmethod
+    def _periods(date):
+        year, month, day = date
+        if not month:
+            return (f"{year:04d}",)
+        if not day:
+            return (f"{year:04d}", f"{year:04d}-{month:02d}")
+        return (f"{year:04d}", f"{year:04d}-{month:02d}", f"{year:04d}-{month:02d}-{day:02d}")
+
+    def rows(self):
+        """(media_type, period, started, completed, episodes, chapters) tuples."""
+        periods = {}
+        for (media_type, date), counts in self.dates.items():
+            for period in self._periods(date):
+                total = periods.setdefault((media_type, period), [0, 0, 0, 0])
+                for i, n in enumerate(counts):
+                    total[i] += n
+        return [key + tuple(counts) for key, counts in periods.items()]
+
+
+class ListFingerprint:
+    """Order-independent fingerprint of the user's own entry fields (status, score,
+    progress, repeat, dates). Equal fingerprints mean the lists did not change, as
+    far as these fields go; media data (titles, episode counts) is not included.
+
+    Only numbers are hashed, so the value is stable across processes (str hashes are
+    randomized)."""
+
+    STATUS_CODES = {'CURRENT': 1, 'COMPLETED': 2, 'PAUSED': 3, 'DROPPED': 4, 'PLANNING': 5, 'REPEATING': 6}
+    MEDIA_TYPE_CODES = {'anime': 1, 'manga': 2}
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def add(self, media_type, entry):
+        self.count += 1
+        self.total += hash((self.MEDIA_TYPE_CODES.get(media_type, 0), entry.media_id,
+                            self.STATUS_CODES.get(entry.status, 0), entry.score, entry.progress,
+                            entry.progress_volumes, entry.repeat, entry.started_at, entry.completed_at))
+
+    def hexdigest(self):
+        return f"{self.count:x}-{self.total & (2 ** 64 - 1):016x}"
+
+
+def calculate_stats(anime_entries, manga_entries, username='', observers=()):
+    """Stats of both media types from parsed Entry lists. `observers` (e.g. an
+    ActivityAccumulator or a ListFingerprint) get add(media_type, entry) in the same pass."""
+    anime_acc = StatsAccumulator('anime')
+    manga_acc = StatsAccumulator('manga')
+    for entry in anime_entries:
+        anime_acc.add(entry)
+        for observer in observers:
+            observer.add('anime', entry)
+    for entry in manga_entries:
+        manga_acc.add(entry)
+        for observer in observers:
+            observer.add('manga', entry)
+    return anime_acc.result(username), manga_acc.result(username)
+
+
+def calculate_activity(entries_by_type):
+    """Activity rows (see ActivityAccumulator.rows) of {'anime'/'manga': entries}."""
+    activity = ActivityAccumulator()
+    for media_type, entries in entries_by_type.items():
+        for entry in entries:
+            activity.add(media_type, entry)
+    return activity.rows()
+
+
+def list_fingerprint(entries_by_type):
+    """ListFingerprint.hexdigest() of {'anime'/'manga': entries}."""
+    fingerprint = ListFingerprint()
+    for media_type, entries in entries_by_type.items():
+        for entry in entries:
+            fingerprint.add(media_type, entry)
+    return fingerprint.hexdigest()
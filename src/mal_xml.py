@@ -0,0 +1,260 @@
+import os
+import shutil
+from operator import attrgetter
+
+from exporters import register_exporter, register_stream_writer
+
+# Called with a message for every entry that cannot be written (no usable ID).
+# app.py routes it to the activity log; unset in worker processes.
+on_skip = None
+
+# Optional FragmentCache (fragment_cache.py) for generate_mal_xml; set by app.py.
+fragment_cache = None
+
+# Part of every fragment list key; bump it whenever render_mal_xml_item changes its output.
+RENDER_VERSION = 1
+
+
+def format_date_for_mal(date):
+    year, month, day = date
+    if year == 0 or month == 0 or day == 0:
+        return "0000-00-00"
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+# --- MAL XML Mappings ---
+# For <my_status> tag, use MAL's textual representation.
+def _mal_text_status_map(media_type):
+    return {
+        'CURRENT': 'Watching' if media_type == 'anime' else 'Reading',
+        'COMPLETED': 'Completed',
+        'PAUSED': 'On-Hold',
+        'DROPPED': 'Dropped',
+        'PLANNING': 'Plan to Watch' if media_type == 'anime' else 'Plan to Read',
+        'REPEATING': 'Watching' if media_type == 'anime' else 'Reading' 
+    }
+
+# For <myinfo> block counts, MAL API expects numeric status codes for its own internal summing.
+# This mapping is only for the <myinfo> block counts.
+ANILIST_TO_MAL_NUMERIC_STATUS_FOR_MYINFO = {
+    'CURRENT': '1', 
+    'COMPLETED': '2', 
+    'PAUSED': '3', # MAL On-Hold code
+    'DROPPED': '4', 
+    'PLANNING': '6', 
+    'REPEATING': '1' 
+}
+
+ANILIST_FORMAT_TO_MAL_TYPE = {
+    'TV': 'TV', 'TV_SHORT': 'TV', 'MOVIE': 'Movie', 'SPECIAL': 'Special',
+    'OVA': 'OVA', 'ONA': 'ONA', 'MUSIC': 'Music',
+    'MANGA': 'Manga', 'NOVEL': 'Novel', 'ONE_SHOT': 'One-shot',
+    'DOUJINSHI': 'Doujin', 'MANHWA': 'Manhwa', 'MANHUA': 'Manhua',
+    'OEL': 'OEL'
+}
+
+def render_mal_xml_item(entry, media_type='anime'):
+    """Renders one <anime>/<manga> element of an Entry. Returns (xml, numeric myinfo
+    status), or None if the entry has no usable ID."""
+    series_db_id = entry.id_mal or entry.media_id
+    if not series_db_id:
+        if on_skip is not None:
+            on_skip(f"Skipping entry for MAL XML: Missing valid MAL ID for '{entry.title_romaji or 'N/A'}'. AniList mediaId: {entry.media_id}, AniList media.idMal: {entry.id_mal}")
+        return None
+
+    # Determine status for myinfo block (numeric)
+    numeric_mal_status_for_myinfo = ANILIST_TO_MAL_NUMERIC_STATUS_FOR_MYINFO.get(entry.status, '6')
+    
+    # Determine status for the individual item tag (textual)
+    my_status_text = _mal_text_status_map(media_type).get(
+        entry.status, 
+        'Plan to Watch' if media_type == 'anime' else 'Plan to Read'
+    )
+
+    title = entry.title or 'N/A Title'
+    title_cdata = f"<![CDATA[{title.replace(']]>', ']]]]><![CDATA[>')}]]>"
+
+    series_type_mal = ANILIST_FORMAT_TO_MAL_TYPE.get(entry.format, 'TV' if media_type == 'anime' else 'Manga')
+    
+    series_total_episodes = entry.episodes
+    series_total_chapters = entry.chapters
+    series_total_volumes = entry.volumes
+    
+    my_progress = entry.progress
+    my_progress_volumes = entry.progress_volumes
+    
+    # AniList scores use the user's scale (up to 100); MAL expects 0-10.
+    my_score = 0
+    if entry.score:
+        my_score = round(entry.score / 10.0) if entry.score > 10 else round(entry.score)
+        my_score = max(0, min(10, int(my_score)))
+    
+    my_times_repeated = entry.repeat
+    my_start_date_str = format_date_for_mal(entry.started_at)
+    my_finish_date_str = format_date_for_mal(entry.completed_at)
+    
+    item_tags_list = []
+    item_tag_name = media_type
+    
+    id_tag_name = 'series_animedb_id' if media_type == 'anime' else 'series_mangadb_id'
+    item_tags_list.append(f"    <{id_tag_name}>{series_db_id}</{id_tag_name}>")
+    item_tags_list.append(f"    <series_title>{title_cdata}</series_title>")
+    item_tags_list.append(f"    <series_type>{series_type_mal}</series_type>")
+    
+    if media_type == 'anime':
+        item_tags_list.append(f"    <series_episodes>{series_total_episodes}</series_episodes>")
+        item_tags_list.append(f"    <my_watched_episodes>{my_progress}</my_watched_episodes>")
+        item_tags_list.append(f"    <my_times_watched>{my_times_repeated}</my_times_watched>")
+        item_tags_list.append(f"    <my_rewatching_ep>0</my_rewatching_ep>")
+    else:
+        item_tags_list.append(f"    <series_chapters>{series_total_chapters}</series_chapters>")
+        item_tags_list.append(f"    <series_volumes>{series_total_volumes}</series_volumes>")
+        item_tags_list.append(f"    <my_read_chapters>{my_progress}</my_read_chapters>")
+        item_tags_list.append(f"    <my_read_volumes>{my_progress_volumes}</my_read_volumes>")
+        item_tags_list.append(f"    <my_times_read>{my_times_repeated}</my_times_read>")
+        item_tags_list.append(f"    <my_rereading_chap>0</my_rereading_chap>")
+
+    item_tags_list.append(f"    <my_id>0</my_id>")
+    item_tags_list.append(f"    <my_start_date>{my_start_date_str}</my_start_date>")
+    item_tags_list.append(f"    <my_finish_date>{my_finish_date_str}</my_finish_date>")
+    item_tags_list.append(f"    <my_rated></my_rated>")
+    item_tags_list.append(f"    <my_score>{my_score}</my_score>")
+    item_tags_list.append(f"    <my_storage></my_storage>")
+    item_tags_list.append(f"    <my_storage_value>0.00</my_storage_value>")
+    item_tags_list.append(f"    <my_status>{my_status_text}</my_status>") # Textual status
+    item_tags_list.append(f"    <my_comments><![CDATA[]]></my_comments>")
+    item_tags_list.append(f"    <my_rewatch_value></my_rewatch_value>")
+    item_tags_list.append(f"    <my_priority>LOW</my_priority>") 
+    item_tags_list.append(f"    <my_tags><![CDATA[]]></my_tags>")
+    item_tags_list.append(f"    <my_discuss>1</my_discuss>")
+    item_tags_list.append(f"    <my_sns>default</my_sns>")
+    item_tags_list.append(f"    <update_on_import>1</update_on_import>")
+
+    return f"  <{item_tag_name}>\n" + "\n".join(item_tags_list) + f"\n  </{item_tag_name}>", numeric_mal_status_for_myinfo
+
+def render_mal_xml_header(media_type, anilist_username, actual_entries_written, myinfo_status_counts_numeric):
+    export_type_code = 1 if media_type == 'anime' else 2
+    # Construct myinfo_block with final counts
+    myinfo_lines = [
+        "  <myinfo>",
+        f"    <user_id></user_id>",
+        f"    <user_name><![CDATA[{anilist_username}]]></user_name>",
+        f"    <user_export_type>{export_type_code}</user_export_type>"
+    ]
+    if media_type == 'anime':
+        myinfo_lines.extend([
+            f"    <user_total_anime>{actual_entries_written}</user_total_anime>",
+            f"    <user_total_watching>{myinfo_status_counts_numeric.get('1',0)}</user_total_watching>",
+            f"    <user_total_completed>{myinfo_status_counts_numeric.get('2',0)}</user_total_completed>",
+            f"    <user_total_onhold>{myinfo_status_counts_numeric.get('3',0)}</user_total_onhold>",
+            f"    <user_total_dropped>{myinfo_status_counts_numeric.get('4',0)}</user_total_dropped>",
+            f"    <user_total_plantowatch>{myinfo_status_counts_numeric.get('6',0)}</user_total_plantowatch>"
+        ])
+    else:
+        myinfo_lines.extend([
+            f"    <user_total_manga>{actual_entries_written}</user_total_manga>",
+            f"    <user_total_reading>{myinfo_status_counts_numeric.get('1',0)}</user_total_reading>",
+            f"    <user_total_completed>{myinfo_status_counts_numeric.get('2',0)}</user_total_completed>",
+            f"    <user_total_onhold>{myinfo_status_counts_numeric.get('3',0)}</user_total_onhold>",
+            f"    <user_total_dropped>{myinfo_status_counts_numeric.get('4',0)}</user_total_dropped>",
+            f"    <user_total_plantoread>{myinfo_status_counts_numeric.get('6',0)}</user_total_plantoread>"
+        ])
+    myinfo_lines.append("  </myinfo>")
+
+    xml_header_and_info = ["""<?xml version="1.0" encoding="UTF-8" ?>
+<!--
+ Created by AniVault (AniList Backup Manager)
+ Version 1.1.0
+-->
+<myanimelist>"""]
+    xml_header_and_info.extend(myinfo_lines)
+    return "\n".join(xml_header_and_info)
+
+# The entry fields render_mal_xml_item reads: entries with equal keys render to the same element.
+fragment_key = attrgetter('id_mal', 'media_id', 'title', 'format', 'episodes', 'chapters', 'volumes', 'progress',
+                          'progress_volumes', 'score', 'repeat', 'started_at', 'completed_at', 'status')
+
+def _generate_mal_xml_cached(entries, media_type, anilist_username):
+    usable = []
+    for entry in entries:
+        if entry.id_mal or entry.media_id:
+            usable.append(entry)
+        else:
+            render_mal_xml_item(entry, media_type)  # reports the skip
+    parts, counts = fragment_cache.render(f"{anilist_username}/{media_type}/v{RENDER_VERSION}",
+                                          list(map(fragment_key, usable)), usable,
+                                          lambda entry: render_mal_xml_item(entry, media_type))
+    myinfo_status_counts_numeric = {status: counts.get(status, 0) for status in ['1', '2', '3', '4', '6']}
+    header = render_mal_xml_header(media_type, anilist_username, len(parts), myinfo_status_counts_numeric)
+    return "\n".join([header] + parts + ["</myanimelist>"])
+
+def generate_mal_xml(entries, media_type='anime', anilist_username=""):
+    # Re-exports of the same list only render the entries that changed.
+    if fragment_cache is not None and anilist_username:
+        return _generate_mal_xml_cached(entries, media_type, anilist_username)
+
+    processed_entries_xml_parts = []
+    # For myinfo, count based on the numeric mapping for MAL's internal categories.
+    myinfo_status_counts_numeric = {'1': 0, '2': 0, '3': 0, '4': 0, '6': 0} 
+
+    for entry in entries:
+        rendered = render_mal_xml_item(entry, media_type)
+        if rendered is None:
+            continue
+        item_xml, numeric_status = rendered
+        if numeric_status in myinfo_status_counts_numeric:
+            myinfo_status_counts_numeric[numeric_status] += 1
+        processed_entries_xml_parts.append(item_xml)
+
+    header = render_mal_xml_header(media_type, anilist_username, len(processed_entries_xml_parts), myinfo_status_counts_numeric)
+    return "\n".join([header] + processed_entries_xml_parts + ["</myanimelist>"])
+
+class MalXmlStreamWriter:
+    """Streams MAL XML items to a spool file; the <myinfo> header is only known at the end."""
+
+    def __init__(self, output_dir, media_type, anilist_username):
+        self.path = os.path.join(output_dir, f'{media_type}.xml')
+        self.spool_path = self.path + '.items'
+        self.media_type = media_type
+        self.anilist_username = anilist_username
+        self.counts = {'1': 0, '2': 0, '3': 0, '4': 0, '6': 0}
+        self.written = 0
+        self.spool = open(self.spool_path, 'w', encoding='utf-8')
+
+    def add(self, entry):
+        rendered = render_mal_xml_item(entry, self.media_type)
+        if rendered is None:
+            return
+        item_xml, numeric_status = rendered
+        if numeric_status in self.counts:
+            self.counts[numeric_status] += 1
+        self.spool.write("\n")
+        self.spool.write(item_xml)
+        self.written += 1
+
+    def close(self):
+        self.spool.close()
+        with open(self.path, 'w', encoding='utf-8') as f_out, open(self.spool_path, 'r', encoding='utf-8') as f_items:
+            f_out.write(render_mal_xml_header(self.media_type, self.anilist_username, self.written, self.counts))
+            shutil.copyfileobj(f_items, f_out)
+            f_out.write("\n</myanimelist>")
+        os.remove(self.spool_path)
+
+@register_exporter('mal_xml', ['anime.xml', 'manga.xml'], label='MAL XML', lean=True)
+def export_mal_xml(context):
+    return {
+        'anime.xml': generate_mal_xml(context.anime_entries, 'anime', context.username),
+        'manga.xml': generate_mal_xml(context.manga_entries, 'manga', context.username),
+    }
+
+@register_stream_writer('mal_xml')
+class MalXmlExportStreamWriter:
+    def __init__(self, output_dir, username, generated_at):
+        self.writers = {media_type: MalXmlStreamWriter(output_dir, media_type, username)
+                        for media_type in ['anime', 'manga']}
+
+    def add(self, media_type, entry):
+        self.writers[media_type].add(entry)
+
+    def close(self, anime_stats, manga_stats):
+        for writer in self.writers.values():
+            writer.close()
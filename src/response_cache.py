@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ResponseCache:
+    """On-disk cache of decoded AniList responses (gzip-compressed JSON), keyed by
+    e.g. "<username>/<query profile>". An entry is served for `ttl` seconds after it
+    was fetched; the least recently used entries are dropped once the files exceed
+    `max_bytes`.
+
+    Concurrent lookups of the same key are coalesced: the first one fetches, the others
+    wait for it and read its result, so only one upstream request is in flight per
+    key. Fetch times survive restarts through the files' mtime."""
+
+    def __init__(self, directory, ttl, max_bytes):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # file name -> size in bytes, least recent first
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> (lock, number of threads holding or waiting for it)
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def _filename(key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json.gz'
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if name.endswith('.tmp') or (name.endswith('.json.gz') and self._expired(path)):
+                os.remove(path)  # leftover of an interrupted write, or expired
+                continue
+            if not name.endswith('.json.gz') or not os.path.isfile(path):
+                continue  # not ours
+            found.append((os.path.getmtime(path), name, os.path.getsize(path)))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+
+    def _expired(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) >= self.ttl
+        except FileNotFoundError:
+            return True
+
+    @contextmanager
+    def _key_lock(self, key):
+        """Holds the lock of `key`, yielding whether another thread had it first. The
+        lock is dropped once no thread holds or waits for it."""
+        with self._lock:
+            lock, users = self._key_locks.get(key) or (threading.Lock(), 0)
+            self._key_locks[key] = (lock, users + 1)
+        waited = not lock.acquire(blocking=False)
+        if waited:
+            lock.acquire()
+        try:
+            yield waited
+        finally:
+            lock.release()
+            with self._lock:
+                users = self._key_locks[key][1] - 1
+                if users:
+                    self._key_locks[key] = (lock, users)
+                else:
+                    del self._key_locks[key]
+
+    def get(self, key, fetch):
+        """Returns (data, source) for `key`, calling fetch() on a miss. `source` is
+        'hit', 'coalesced' (waited for a concurrent fetch of the same key) or 'miss'."""
+        name = self._filename(key)
+        path = self._path(name)
+        with self._key_lock(key) as waited:
+            data = self._read(name, path)
+            if data is not None:
+                with self._lock:
+                    self.hits += 1
+                    if waited:
+                        self.coalesced += 1
+                return data, 'coalesced' if waited else 'hit'
+            with self._lock:
+                self.misses += 1
+            data = fetch()
+            self._write(name, path, data)
+            return data, 'miss'
+
+    def _read(self, name, path):
+        with self._lock:
+            cached = name in self._entries
+            if cached:
+                self._entries.move_to_end(name)
+        if not cached:
+            return None
+        if not self._expired(path):
+            try:
+                with open(path, 'rb') as f:
+                    return json.loads(gzip.decompress(f.read()))
+            except (OSError, ValueError):
+                pass  # removed by an eviction in the meantime, or unreadable
+        self._drop(name)
+        return None
+
+    def _write(self, name, path, data):
+        body = gzip.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), compresslevel=1)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[name] = len(body)
+            self._entries.move_to_end(name)
+        self._evict(keep=name)
+
+    def _drop(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep):
+        while True:
+            with self._lock:
+                if sum(self._entries.values()) <= self.max_bytes:
+                    return
+                victim = next((name for name in self._entries if name != keep), None)
+                if victim is None:
+                    return
+                self.evictions += 1
+            self._drop(victim)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': sum(self._entries.values()),
+                    'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced, 'evictions': self.evictions}
@@ -1,35 +1,232 @@
+import heapq
+import itertools
+import json
+import os
+import random
 import threading
 import time
+from datetime import datetime
+
+from apscheduler.triggers.cron import CronTrigger
+
+from state_files import write_json_atomic
+
+
+def parse_cron(expression):
+    """Validates a standard 5-field crontab expression and returns its trigger."""
+    try:
+        return CronTrigger.from_crontab(expression)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cron expression '{expression}': {str(e)}")
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat() if ts is not None else None
+
+
+class Job:
+    def __init__(self, job_id, callback, interval_seconds=None, cron=None, jitter_seconds=0):
+        if not interval_seconds and not cron:
+            raise ValueError("A job needs an interval or a cron expression.")
+        self.id = job_id
+        self.callback = callback
+        self.interval_seconds = interval_seconds
+        self.cron = cron
+        self.trigger = parse_cron(cron) if cron else None
+        self.jitter_seconds = jitter_seconds or 0
+        self.next_run = None
+        self.base_run = None  # the regular slot of next_run, before jitter
+        self.last_run = None
+        self.last_lag = None
+        self.running = False
+        self.version = 0
+
+    def following_run(self, after_ts):
+        """First regular run time strictly after `after_ts` (epoch seconds), without jitter."""
+        if self.trigger:
+            # Passing `after` as the previous fire time makes the trigger skip `after` itself.
+            after = datetime.fromtimestamp(after_ts).astimezone()
+            fire_time = self.trigger.get_next_fire_time(after, after)
+            return fire_time.timestamp() if fire_time else None
+        return after_ts + self.interval_seconds
+
+    def with_jitter(self, ts):
+        if ts is None or not self.jitter_seconds:
+            return ts
+        return ts + random.uniform(0, self.jitter_seconds)
+
 
 class Scheduler:
-    def __init__(self):
+    """Timer thread over a priority queue of jobs.
+
+    Next-run times are persisted to `state_file`, so a restart neither re-runs a job
+    early nor forgets it. A run missed while the process was down is caught up once,
+    then the regular cadence resumes. Waiting happens on an Event, so stop() and
+    schedule changes take effect immediately.
+    """
+
+    def __init__(self, state_file=None, on_error=None):
+        self.state_file = state_file
+        self.on_error = on_error
+        self.jobs = {}
+        self._heap = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._versions = itertools.count(1)
         self.thread = None
-        self.running = False
-        self.callback = None
-        self.interval = None
 
-    def start(self, callback, interval_hours):
-        """Startet den Scheduler"""
-        self.callback = callback
-        self.interval = interval_hours * 3600  # Konvertiere zu Sekunden
-        if not self.running:
-            self.running = True
-            self.thread = threading.Thread(target=self._run)
-            self.thread.daemon = True
+    # --- Persistence ---
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, removed=None):
+        """Updates the persisted times of the registered jobs. Entries of jobs that are
+        not (yet) registered in this process are kept; only `removed` is dropped."""
+        if not self.state_file:
+            return
+        state = self._load_state()
+        state.pop(removed, None)
+        state.update({job.id: {'next_run': job.next_run, 'base_run': job.base_run, 'last_run': job.last_run}
+                      for job in self.jobs.values()})
+        write_json_atomic(self.state_file, state, indent=2)
+
+    # --- Job management ---
+    def add_job(self, job_id, callback, interval_hours=None, cron=None, jitter_seconds=0,
+                run_immediately=False, last_run=None):
+        """Schedules (or reschedules) a job.
+
+        The first run is, in order of preference: now if `run_immediately`; the persisted
+        next-run time; one interval/cron step after `last_run` (epoch seconds); now for
+        interval jobs, the next cron slot for cron jobs. Persisted or derived times in the
+        past are caught up once, right away."""
+        job = Job(job_id, callback, interval_hours * 3600 if interval_hours else None, cron, jitter_seconds)
+        now = time.time()
+        persisted = self._load_state().get(job_id, {})
+        job.last_run = persisted.get('last_run') or last_run
+        if run_immediately:
+            base_run = next_run = now
+        elif persisted.get('next_run'):
+            next_run = persisted['next_run']
+            base_run = persisted.get('base_run') or next_run
+        elif job.last_run:
+            base_run = job.following_run(job.last_run)
+            next_run = job.with_jitter(base_run)
+        elif job.trigger:
+            base_run = job.following_run(now)
+            next_run = job.with_jitter(base_run)
+        else:
+            base_run = next_run = now
+        with self._lock:
+            job.version = next(self._versions)
+            job.base_run = base_run
+            job.next_run = max(next_run, now) if next_run is not None else None
+            self.jobs[job_id] = job
+            if job.next_run is not None:
+                heapq.heappush(self._heap, (job.next_run, job_id, job.version))
+            self._save_state()
+        self.start()
+        self._wakeup.set()
+        return job
+
+    def remove_job(self, job_id):
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+            self._save_state(removed=job_id)
+        self._wakeup.set()
+        return job is not None
+
+    def has_job(self, job_id):
+        with self._lock:
+            return job_id in self.jobs
+
+    def status(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            lag = None
+            if job.next_run is not None and not job.running and time.time() > job.next_run:
+                lag = time.time() - job.next_run
+            return {
+                'next_run': _iso(job.next_run),
+                'last_run': _iso(job.last_run),
+                'running': job.running,
+                'last_lag_seconds': round(job.last_lag, 3) if job.last_lag is not None else None,
+                'current_lag_seconds': round(lag, 3) if lag is not None else 0
+            }
+
+    # --- Timer loop ---
+    def start(self):
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
             self.thread.start()
 
-    def stop(self):
-        """Stoppt den Scheduler"""
-        self.running = False
-        if self.thread:
-            self.thread.join()
-            self.thread = None
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def _pop_due(self):
+        """Returns the next due job, or the seconds to wait until one is due (None = idle)."""
+        with self._lock:
+            while self._heap:
+                run_at, job_id, version = self._heap[0]
+                job = self.jobs.get(job_id)
+                if job is None or job.version != version:
+                    heapq.heappop(self._heap)  # stale entry of a removed or rescheduled job
+                    continue
+                delay = run_at - time.time()
+                if delay > 0:
+                    return None, delay
+                heapq.heappop(self._heap)
+                job.running = True
+                return job, 0
+            return None, None
 
     def _run(self):
-        """Scheduler Hauptschleife"""
-        while self.running:
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            job, delay = self._pop_due()
+            if job is None:
+                self._wakeup.wait(delay)
+                continue
+
+            scheduled = job.next_run
+            started = time.time()
+            job.last_lag = started - scheduled
             try:
-                self.callback()
-            except Exception:
-                pass  # Fehler werden geloggt aber nicht propagiert
-            time.sleep(self.interval)
\ No newline at end of file
+                job.callback()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(job.id, e)
+            finished = time.time()
+
+            with self._lock:
+                job.running = False
+                job.last_run = started
+                if self.jobs.get(job.id) is not job:
+                    continue  # removed or replaced while running
+                # Advance from the regular (unjittered) slot rather than from "now" or the
+                # jittered run time to avoid drift; slots missed during a long run are
+                # skipped, not replayed.
+                following = job.following_run(job.base_run)
+                while following is not None and following <= finished:
+                    following = job.following_run(following)
+                job.base_run = following
+                job.next_run = job.with_jitter(following)
+                if job.next_run is not None:
+                    heapq.heappush(self._heap, (job.next_run, job.id, job.version))
+                self._save_state()
@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backup_layout import is_backup_key
+
+QUARANTINE_PREFIX = 'quarantine/'
+PROGRESS_EVENT_INTERVAL = 1.0
+
+
+class RateLimiter:
+    """Token bucket shared by all scrub workers: consume(n) blocks until n more bytes
+    fit into `bytes_per_second`. A rate of 0 disables throttling."""
+
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, n):
+        if not self.bytes_per_second or n <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + n / self.bytes_per_second
+            delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _ThrottledFile:
+    """Read-only file wrapper that charges every read to a RateLimiter and counts bytes."""
+
+    def __init__(self, f, limiter, counter):
+        self._f = f
+        self._limiter = limiter
+        self._counter = counter
+
+    def read(self, n=-1):
+        data = self._f.read(n)
+        self._limiter.consume(len(data))
+        self._counter(len(data))
+        return data
+
+    def seek(self, offset, whence=0):
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._f.close()
+
+
+class ArchiveScrubber:
+    """Verifies stored archives in the background: every member's CRC (ZipFile.testzip)
+    and a readable meta.json. Damaged archives are moved below QUARANTINE_PREFIX and
+    dropped from the backup index; the finding is kept in the index. Archives missing
+    from the index (e.g. unreadable ones sync_backup_index skipped) are checked too;
+    intact zips without meta.json (legacy archives) are only reported as 'unrecognized'.
+
+    Archives are checked least recently verified first on `workers` threads, with all
+    reads sharing one `max_bytes_per_second` budget so running backups keep their I/O.
+    `on_event(type, data)` receives 'scrub_progress', 'scrub_finding' and
+    'scrub_finished' events."""
+
+    def __init__(self, storage, backup_index, workers=2, max_bytes_per_second=0, on_event=None,
+                 on_quarantine=None):
+        self.storage = storage
+        self.backup_index = backup_index
+        self.workers = workers
+        self.limiter = RateLimiter(max_bytes_per_second)
+        self.on_event = on_event
+        self.on_quarantine = on_quarantine
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._last_event = 0.0
+        self.totals = {'checked': 0, 'ok': 0, 'corrupt': 0, 'missing': 0, 'unrecognized': 0, 'bytes_read': 0,
+                       'runs': 0}
+        self.current = None
+        self.last_run = None
+
+    def _emit(self, event_type, data):
+        if self.on_event:
+            self.on_event(event_type, data)
+
+    def _count_bytes(self, n):
+        with self._lock:
+            self.totals['bytes_read'] += n
+            if self.current:
+                self.current['bytes_read'] += n
+
+    def verify(self, key):
+        """Returns (status, problem): ('ok', None) for a sound archive, ('corrupt', ...)
+        for a damaged one, and ('unrecognized', ...) for an intact zip without meta.json,
+        e.g. a legacy BackupHandler archive waiting to be imported. Raises
+        FileNotFoundError if the archive is gone."""
+        with self.storage.open(key) as raw:
+            f = _ThrottledFile(raw, self.limiter, self._count_bytes)
+            try:
+                with zipfile.ZipFile(f, 'r') as zipf:
+                    bad_member = zipf.testzip()
+                    if bad_member is not None:
+                        return 'corrupt', f"CRC mismatch in {bad_member}"
+                    if 'meta.json' not in zipf.namelist():
+                        return 'unrecognized', "no meta.json, not an AniVault backup"
+                    json.loads(zipf.read('meta.json').decode('utf-8'))
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, zlib.error, EOFError, ValueError, OSError) as e:
+                return 'corrupt', f"{type(e).__name__}: {str(e)}"
+        return 'ok', None
+
+    def _check(self, backup_id, key):
+        checked_at = datetime.now().isoformat()
+        try:
+            status, problem = self.verify(key)
+        except FileNotFoundError:
+            status, problem = 'missing', "archive not found in storage"
+
+        quarantine_key = None
+        if status == 'ok':
+            self.backup_index.mark_verified(backup_id, checked_at)
+        else:
+            if status == 'corrupt':
+                # Only damaged archives are moved; unrecognized ones are left in place.
+                quarantine_key = QUARANTINE_PREFIX + key
+                self.storage.move(key, quarantine_key)
+                self.backup_index.remove(backup_id)
+                if self.on_quarantine:
+                    self.on_quarantine(backup_id)
+            self.backup_index.add_scrub_finding(backup_id, key, status, problem, checked_at, quarantine_key)
+            self._emit('scrub_finding', {'id': backup_id, 'filename': key, 'status': status, 'error': problem,
+                                         'quarantine_key': quarantine_key})
+
+        with self._lock:
+            self.totals['checked'] += 1
+            self.totals[status] += 1
+            self.current['checked'] += 1
+            self.current[status] += 1
+            progress = dict(self.current)
+            publish = time.monotonic() - self._last_event >= PROGRESS_EVENT_INTERVAL
+            if publish:
+                self._last_event = time.monotonic()
+        if publish:
+            self._emit('scrub_progress', progress)
+
+    def run(self):
+        """One pass over all stored archives, indexed or not. Returns the pass summary,
+        or None if a pass is already running."""
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        try:
+            stored_keys = [key for key, _ in self.storage.list('.zip') if is_backup_key(key)]
+            candidates = self.backup_index.scrub_candidates(stored_keys)
+            with self._lock:
+                self.current = {'started': datetime.now().isoformat(), 'total': len(candidates), 'checked': 0,
+                                'ok': 0, 'corrupt': 0, 'missing': 0, 'unrecognized': 0, 'errors': 0,
+                                'bytes_read': 0}
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scrubber') as pool:
+                futures = {pool.submit(self._check, backup_id, key): backup_id for backup_id, key in candidates}
+                for future, backup_id in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # e.g. the quarantine move failed; the archive is retried next pass.
+                        with self._lock:
+                            self.current['errors'] += 1
+                        self._emit('scrub_finding', {'id': backup_id, 'status': 'error', 'error': str(e)})
+            with self._lock:
+                summary = dict(self.current, finished=datetime.now().isoformat(),
+                               duration_seconds=round(time.monotonic() - started, 3))
+                self.totals['runs'] += 1
+                self.last_run = summary
+                self.current = None
+            self._emit('scrub_finished', summary)
+            return summary
+        finally:
+            with self._lock:
+                self.current = None
+            self._run_lock.release()
+
+    def status(self):
+        with self._lock:
+            return {'running': self.current is not None, 'current': dict(self.current) if self.current else None,
+                    'last_run': self.last_run, 'totals': dict(self.totals)}
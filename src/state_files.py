@@ -0,0 +1,41 @@
+import json
+import os
+import threading
+
+
+def write_json_atomic(path, data, indent=None, durable=False):
+    """Writes `data` as JSON to `path` through a temporary file that replaces it, so
+    readers (and the next start after a crash) see either the old or the new content,
+    never a truncated file. `durable` also flushes the file to disk before the rename,
+    for state that must survive a power loss."""
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"  # concurrent writers must not share it
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def sync_directory(directory):
+    """Flushes every file in `directory` (not recursive) and then the directory itself
+    to disk, so files written there and their names survive a power loss."""
+    for entry in os.scandir(directory):
+        if entry.is_file(follow_symlinks=False):
+            fd = os.open(entry.path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,17 +1,23 @@
 const MAX_LOG_ENTRIES_DISPLAY = 100;
 let sseEventSource = null; 
 
-document.addEventListener('DOMContentLoaded', () => {
-    loadBackups();
-    loadLogs(); 
-    checkAutoBackupStatus();
-    setupSSE();
-    
-    if (window.initialLatestStats) {
-        displayLatestStats(window.initialLatestStats);
-    } else {
+document.addEventListener('DOMContentLoaded', async () => {
+    try {
+        const state = await loadInitialState();
+        renderLogs(state.logs);
+        renderExportFormats(state.exporters); // the backup rows list the export files
+        renderBackupsPage(state.backups, true);
+        applyAutoBackupStatus(state.auto_backup);
+        displayLatestStats(state.latest_stats);
+    } catch (error) {
+        console.error('Failed to load initial state, loading parts separately:', error);
+        loadLogs(); 
+        await loadExportFormats();
+        loadBackups();
+        checkAutoBackupStatus();
         fetchLatestStats(); 
     }
+    setupSSE();
 
     const modal = document.getElementById('statsModal');
     const span = document.getElementsByClassName('close')[0];
@@ -25,6 +31,22 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 });
 
+async function loadInitialState() {
+    // index.html embeds the dashboard state; /bootstrap returns the same in one request.
+    const embedded = document.getElementById('initialState');
+    if (embedded) {
+        try {
+            const state = JSON.parse(embedded.textContent);
+            if (state && Object.keys(state).length) return state; // empty when the server could not build it
+        } catch (e) {
+            console.error('Invalid embedded initial state:', e);
+        }
+    }
+    const response = await fetch('/bootstrap');
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return response.json();
+}
+
 function setupSSE() {
     if (sseEventSource) {
         sseEventSource.close(); 
@@ -214,12 +236,55 @@ async function manualBackup() {
     }
 }
 
+let exportFormatsList = [];
+
+async function loadExportFormats() {
+    if (!document.getElementById('exportFormats')) return;
+    try {
+        const response = await fetch('/exporters');
+        renderExportFormats(await response.json());
+    } catch (error) {
+        console.error('Failed to load export formats:', error);
+    }
+}
+
+function renderExportFormats(exporters) {
+    const container = document.getElementById('exportFormats');
+    if (!container) return;
+    exportFormatsList = exporters;
+    exporters.forEach(exporter => {
+        const label = document.createElement('label');
+        const checkbox = document.createElement('input');
+        checkbox.type = 'checkbox';
+        checkbox.value = exporter.name;
+        checkbox.checked = exporter.default;
+        if (exporter.name === 'json') checkbox.disabled = true; // Rohdaten werden immer gesichert
+        label.appendChild(checkbox);
+        label.appendChild(document.createTextNode(exporter.label));
+        container.appendChild(label);
+    });
+}
+
+function getSelectedFormats() {
+    return Array.from(document.querySelectorAll('#exportFormats input[type="checkbox"]'))
+        .filter(checkbox => checkbox.checked)
+        .map(checkbox => checkbox.value);
+}
+
+function setFormatInputs(formats, disabled) {
+    document.querySelectorAll('#exportFormats input[type="checkbox"]').forEach(checkbox => {
+        if (Array.isArray(formats)) checkbox.checked = formats.includes(checkbox.value);
+        checkbox.disabled = disabled || checkbox.value === 'json';
+    });
+}
+
 async function toggleAutoBackup() {
     const button = document.getElementById('autoBackupButton');
     const usernameInput = document.getElementById('autoUsername');
     const username = usernameInput.value.trim();
     const keepLast = document.getElementById('keepLastBackups').value;
     const interval = document.getElementById('backupInterval').value; 
+    const cron = document.getElementById('backupCron').value.trim();
 
     const action = button.textContent === 'Start' ? 'start' : 'stop';
     showNotification(`Auto Backup: Attempting to ${action} for ${username || 'N/A'}...`, 'info');
@@ -230,13 +295,13 @@ async function toggleAutoBackup() {
         let payload = {};
 
         if (action === 'start') {
-            if (!username || !keepLast || !interval) {
-                throw new Error('Please fill in all auto backup fields (username, keep last, interval).');
+            if (!username || !keepLast || !(interval || cron)) {
+                throw new Error('Please fill in all auto backup fields (username, keep last, interval or cron).');
             }
-            if (parseInt(keepLast) <=0 || parseFloat(interval) <=0) {
+            if (parseInt(keepLast) <=0 || (!cron && parseFloat(interval) <=0)) {
                 throw new Error('Keep last and interval must be positive numbers.');
             }
-            payload = { username, keepLast, interval };
+            payload = { username, keepLast, interval: cron ? null : interval, cron: cron || null, formats: getSelectedFormats() };
             response = await fetch('/auto-backup', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -263,39 +328,11 @@ async function toggleAutoBackup() {
 
 async function checkAutoBackupStatus() {
     const button = document.getElementById('autoBackupButton');
-    const usernameInput = document.getElementById('autoUsername');
-    const keepLastInput = document.getElementById('keepLastBackups');
-    const intervalInput = document.getElementById('backupInterval');
-    
     button.disabled = true; 
 
     try {
         const response = await fetch('/auto-backup-status');
-        const result = await response.json();
-
-        if (result.running && result.config) {
-            button.textContent = 'Stop';
-            button.classList.remove('btn-green');
-            button.classList.add('btn-red');
-            usernameInput.value = result.config.username || '';
-            keepLastInput.value = result.config.keepLast || '5';
-            intervalInput.value = result.config.interval || '24';
-            usernameInput.disabled = true;
-            keepLastInput.disabled = true;
-            intervalInput.disabled = true;
-        } else {
-            button.textContent = 'Start';
-            button.classList.remove('btn-red');
-            button.classList.add('btn-green');
-            if (result.config) { 
-                 usernameInput.value = result.config.username || '';
-                 keepLastInput.value = result.config.keepLast || '5';
-                 intervalInput.value = result.config.interval || '24';
-            }
-            usernameInput.disabled = false;
-            keepLastInput.disabled = false;
-            intervalInput.disabled = false;
-        }
+        applyAutoBackupStatus(await response.json());
     } catch (error) {
         console.error('Failed to get auto backup status:', error);
         addLogEntryToUI('[SYSTEM] Failed to get auto backup status.', false);
@@ -304,46 +341,188 @@ async function checkAutoBackupStatus() {
     }
 }
 
-async function loadBackups() {
-    try {
-        const response = await fetch('/backups');
-        const backups = await response.json();
-        const backupsTableBody = document.getElementById('backupsTableBody');
-        backupsTableBody.innerHTML = ''; 
-
-        if (backups.error) {
-            showNotification(`Error loading backups: ${backups.error}`, 'error', true);
-            addLogEntryToUI(`[ERROR] Loading backups: ${backups.error}`, false);
-            return;
+function applyAutoBackupStatus(result) {
+    const button = document.getElementById('autoBackupButton');
+    const usernameInput = document.getElementById('autoUsername');
+    const keepLastInput = document.getElementById('keepLastBackups');
+    const intervalInput = document.getElementById('backupInterval');
+    const cronInput = document.getElementById('backupCron');
+    const nextRunLabel = document.getElementById('autoBackupNextRun');
+
+    if (result.running && result.config) {
+        button.textContent = 'Stop';
+        button.classList.remove('btn-green');
+        button.classList.add('btn-red');
+        usernameInput.value = result.config.username || '';
+        keepLastInput.value = result.config.keepLast || '5';
+        intervalInput.value = result.config.interval || '24';
+        cronInput.value = result.config.cron || '';
+        usernameInput.disabled = true;
+        keepLastInput.disabled = true;
+        intervalInput.disabled = true;
+        cronInput.disabled = true;
+        nextRunLabel.textContent = result.schedule && result.schedule.next_run
+            ? `Next run: ${new Date(result.schedule.next_run).toLocaleString()}` : '';
+        setFormatInputs(result.config.formats, true);
+    } else {
+        button.textContent = 'Start';
+        button.classList.remove('btn-red');
+        button.classList.add('btn-green');
+        if (result.config) { 
+             usernameInput.value = result.config.username || '';
+             keepLastInput.value = result.config.keepLast || '5';
+             intervalInput.value = result.config.interval || '24';
+             cronInput.value = result.config.cron || '';
         }
-        if (!Array.isArray(backups) || backups.length === 0) {
-            backupsTableBody.innerHTML = '<tr><td colspan="4" style="text-align:center;">No backups found.</td></tr>';
-            return;
+        usernameInput.disabled = false;
+        keepLastInput.disabled = false;
+        intervalInput.disabled = false;
+        cronInput.disabled = false;
+        nextRunLabel.textContent = '';
+        setFormatInputs(result.config ? result.config.formats : null, false);
+    }
+}
+
+const BACKUPS_PAGE_SIZE = 50;
+let backupsNextCursor = null;
+let backupsLoading = false;
+let backupsObserver = null;
+
+function setupBackupsObserver() {
+    const sentinel = document.getElementById('backupsSentinel');
+    if (!sentinel || backupsObserver || !('IntersectionObserver' in window)) return;
+    backupsObserver = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting) && backupsNextCursor) {
+            loadBackups(false);
         }
+    }, { rootMargin: '200px' });
+    backupsObserver.observe(sentinel);
+}
 
-        backups.forEach(backup => {
-            const row = backupsTableBody.insertRow();
-            const date = backup.date ? new Date(backup.date).toLocaleString() : 'N/A';
-            row.insertCell().textContent = date;
-            row.insertCell().textContent = backup.username || 'N/A';
-            row.insertCell().textContent = backup.content || 'N/A';
-            
-            const actionsCell = row.insertCell();
-            actionsCell.classList.add('actions'); 
-            actionsCell.innerHTML = `
-                <button class="btn-blue" onclick="openStatsModal('${backup.id}', '${backup.username || ''}')">Stats</button>
-                <button class="btn-green" onclick="window.location.href='/backup/${backup.id}/download'">Download</button>
-                <button class="btn-red" onclick="deleteBackup('${backup.id}')">Delete</button>
-            `;
-            row.cells[0].setAttribute('data-label', 'Date');
-            row.cells[1].setAttribute('data-label', 'Username');
-            row.cells[2].setAttribute('data-label', 'Content');
-            row.cells[3].setAttribute('data-label', 'Actions');
-        });
+function appendBackupRow(backupsTableBody, backup) {
+    const row = backupsTableBody.insertRow();
+    const date = backup.date ? new Date(backup.date).toLocaleString() : 'N/A';
+    row.insertCell().textContent = date;
+    row.insertCell().textContent = backup.username || 'N/A';
+    row.insertCell().textContent = backup.content || 'N/A';
+    
+    const actionsCell = row.insertCell();
+    actionsCell.classList.add('actions'); 
+    actionsCell.innerHTML = `
+        <button class="btn-blue" onclick="openStatsModal('${backup.id}', '${backup.username || ''}')">Stats</button>
+        <button class="btn-green" onclick="window.location.href='/backup/${backup.id}/download'">Download</button>
+        <select class="file-select" onchange="downloadBackupFile('${backup.id}', this)">
+            <option value="">Single file…</option>
+            ${exportFormatsList.flatMap(exporter => exporter.members)
+                .map(member => `<option value="${member}">${member}</option>`).join('')}
+        </select>
+        <button class="btn-red" onclick="deleteBackup('${backup.id}')">Delete</button>
+    `;
+    row.cells[0].setAttribute('data-label', 'Date');
+    row.cells[1].setAttribute('data-label', 'Username');
+    row.cells[2].setAttribute('data-label', 'Content');
+    row.cells[3].setAttribute('data-label', 'Actions');
+}
+
+function downloadBackupFile(backupId, select) {
+    // Formats not stored in the archive are generated on the server on first request.
+    if (!select.value) return;
+    window.location.href = `/backup/${backupId}/files/${encodeURIComponent(select.value)}`;
+    select.value = '';
+}
+
+async function loadBackups(reset = true) {
+    if (backupsLoading && !reset) return;
+    backupsLoading = true;
+    const cursor = reset ? null : backupsNextCursor;
+    try {
+        const params = new URLSearchParams({ limit: BACKUPS_PAGE_SIZE });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`/backups?${params.toString()}`);
+        renderBackupsPage(await response.json(), reset);
     } catch (error) {
         console.error('Load backups error:', error);
         showNotification('Failed to load backups.', 'error', true);
         addLogEntryToUI('[ERROR] Failed to load backups.', false);
+    } finally {
+        backupsLoading = false;
+    }
+}
+
+function renderBackupsPage(result, reset) {
+    const backupsTableBody = document.getElementById('backupsTableBody');
+    if (reset) backupsTableBody.innerHTML = ''; 
+
+    if (result.error) {
+        showNotification(`Error loading backups: ${result.error}`, 'error', true);
+        addLogEntryToUI(`[ERROR] Loading backups: ${result.error}`, false);
+        return;
+    }
+    const backups = result.backups;
+    backupsNextCursor = result.next_cursor || null;
+    const totalSpan = document.getElementById('backupsTotal');
+    if (totalSpan) totalSpan.textContent = result.total ? `(${result.total})` : '';
+
+    if (reset && (!Array.isArray(backups) || backups.length === 0)) {
+        backupsTableBody.innerHTML = '<tr><td colspan="4" style="text-align:center;">No backups found.</td></tr>';
+        return;
+    }
+
+    backups.forEach(backup => appendBackupRow(backupsTableBody, backup));
+    setupBackupsObserver();
+}
+
+let titleSearchTimer = null;
+let titleSearchSeq = 0;
+
+function onTitleSearchInput() {
+    clearTimeout(titleSearchTimer);
+    titleSearchTimer = setTimeout(runTitleSearch, 250);
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+async function runTitleSearch() {
+    const query = document.getElementById('titleSearch').value.trim();
+    const resultsDiv = document.getElementById('titleSearchResults');
+    const seq = ++titleSearchSeq;
+    if (!query) {
+        resultsDiv.innerHTML = '';
+        return;
+    }
+    try {
+        const response = await fetch(`/search?q=${encodeURIComponent(query)}`);
+        const results = await response.json();
+        if (seq !== titleSearchSeq) return; // eine neuere Suche läuft bereits
+        if (results.error) {
+            resultsDiv.innerHTML = `<p style="color: var(--status-dropped);">${escapeHtml(results.error)}</p>`;
+            return;
+        }
+        if (results.length === 0) {
+            resultsDiv.innerHTML = '<p>No matching titles found.</p>';
+            return;
+        }
+        resultsDiv.innerHTML = results.map(media => {
+            const title = media.title.romaji || media.title.english || media.title.native || 'N/A';
+            const backups = media.backups || [];
+            const latest = backups[0];
+            const oldest = backups[backups.length - 1];
+            const seen = latest
+                ? `In ${backups.length} backup(s), last seen ${new Date(latest.date).toLocaleString()} as ${escapeHtml(latest.status)}, first seen ${new Date(oldest.date).toLocaleString()}`
+                : 'Not in any backup';
+            return `
+                <div class="search-result">
+                    <div class="search-result-title">${escapeHtml(title)} <span class="search-result-meta">(${escapeHtml(media.type)})</span></div>
+                    <div class="search-result-meta">${seen}</div>
+                </div>`;
+        }).join('');
+    } catch (error) {
+        console.error('Title search error:', error);
+        if (seq === titleSearchSeq) resultsDiv.innerHTML = '<p>Search failed.</p>';
     }
 }
 
@@ -448,35 +627,39 @@ async function loadLogs() {
 
     try {
         const response = await fetch('/logs');
-        const logsFromServer = await response.json(); 
-        logContainer.innerHTML = ''; 
-
-        if (logsFromServer.error) {
-            logContainer.innerHTML = `<div class="log-entry log-error">Error loading logs: ${logsFromServer.error}</div>`;
-            return;
-        }
-        if (!Array.isArray(logsFromServer)) {
-             logContainer.innerHTML = `<div class="log-entry log-error">Received invalid log data from server.</div>`;
-             return;
-        }
-        
-        const logsToDisplay = logsFromServer.slice(-MAX_LOG_ENTRIES_DISPLAY);
-
-        logsToDisplay.forEach(logEntryData => {
-            appendLogEntryToDisplay(logEntryData); 
-        });
-        if (logsToDisplay.length > 0) {
-            logContainer.scrollTop = logContainer.scrollHeight;
-        } else {
-            logContainer.innerHTML = '<div class="log-entry">No log entries found.</div>';
-        }
-
+        renderLogs(await response.json());
     } catch (error) {
         console.error('Failed to load logs:', error);
         if(logContainer) logContainer.innerHTML = '<div class="log-entry log-error">Failed to load logs. Check console for details.</div>';
     }
 }
 
+function renderLogs(logsFromServer) {
+    const logContainer = document.getElementById('logContainer');
+    if (!logContainer) return;
+    logContainer.innerHTML = ''; 
+
+    if (logsFromServer.error) {
+        logContainer.innerHTML = `<div class="log-entry log-error">Error loading logs: ${logsFromServer.error}</div>`;
+        return;
+    }
+    if (!Array.isArray(logsFromServer)) {
+         logContainer.innerHTML = `<div class="log-entry log-error">Received invalid log data from server.</div>`;
+         return;
+    }
+    
+    const logsToDisplay = logsFromServer.slice(-MAX_LOG_ENTRIES_DISPLAY);
+
+    logsToDisplay.forEach(logEntryData => {
+        appendLogEntryToDisplay(logEntryData); 
+    });
+    if (logsToDisplay.length > 0) {
+        logContainer.scrollTop = logContainer.scrollHeight;
+    } else {
+        logContainer.innerHTML = '<div class="log-entry">No log entries found.</div>';
+    }
+}
+
 function addLogEntryToUI(message, isSuccess) {
     const logContainer = document.getElementById('logContainer');
     if (!logContainer) return;
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import threading
+
+from flask import request
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASH_LENGTH = 12
+
+
+class StaticAssetHasher:
+    """Adds a content hash (`?v=<hash>`) to every url_for('static', ...) URL and marks
+    responses for the current hash as immutable, so browsers cache assets for a year
+    and pick up changes through the new URL. Hashes are recomputed when a file's
+    mtime or size changes."""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def hash_for(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._hashes.get(filename)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._hashes[filename] = (signature, value)
+        return value
+
+    def init_app(self, app):
+        @app.url_defaults
+        def add_static_hash(endpoint, values):
+            if endpoint == 'static' and 'filename' in values and 'v' not in values:
+                value = self.hash_for(values['filename'])
+                if value:
+                    values['v'] = value
+
+        @app.after_request
+        def cache_hashed_static(response):
+            if request.endpoint == 'static' and response.status_code in (200, 304):
+                version = request.args.get('v')
+                filename = (request.view_args or {}).get('filename')
+                if version and filename and version == self.hash_for(filename):
+                    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+                else:
+                    # Unversioned (or outdated) URLs must be revalidated.
+                    response.headers['Cache-Control'] = 'no-cache'
+            return response
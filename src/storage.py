@@ -0,0 +1,232 @@
+import io
+import os
+import shutil
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# S3 requires every part except the last to be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class LocalStorage:
+    """Backup archives as files in a local directory. Keys are paths relative to it,
+    with '/' separating subfolders."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def local_path(self, key):
+        """Absolute filesystem path of an object, for backends that have one (else None)."""
+        return os.path.abspath(self._path(key))
+
+    def put_file(self, key, source_path):
+        """Stores a finished local file under `key`. The source file is consumed."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(source_path, path)
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key):
+        if not self.exists(key):
+            return False
+        os.remove(self._path(key))
+        self._remove_empty_parents(key)
+        return True
+
+    def _remove_empty_parents(self, key):
+        folder = os.path.dirname(key)
+        while folder:
+            try:
+                os.rmdir(self._path(folder))
+            except OSError:
+                break  # not empty (or already gone)
+            folder = os.path.dirname(folder)
+
+    def move(self, key, new_key):
+        """Renames an object; `new_key` may contain '/' (e.g. a quarantine prefix)."""
+        new_path = self._path(new_key)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(self._path(key), new_path)
+        self._remove_empty_parents(key)
+
+    def list(self, suffix='.zip', prefix='', recursive=True):
+        """Yields (key, size) for the stored objects below `prefix` (a folder key ending
+        in '/') that end in `suffix`. With `recursive=False` only the objects directly
+        in that folder."""
+        top = self._path(prefix)
+        if not os.path.isdir(top):
+            return
+        for dirpath, dirnames, filenames in os.walk(top):
+            if not recursive:
+                dirnames.clear()
+            folder = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            folder = '' if folder == '.' else folder + '/'
+            for name in filenames:
+                if name.endswith(suffix):
+                    yield folder + name, os.path.getsize(os.path.join(dirpath, name))
+
+    def open(self, key):
+        """Seekable binary file object (suitable for zipfile)."""
+        return open(self._path(key), 'rb')
+
+    def iter_chunks(self, key, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        with self.open(key) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class _S3RangeReader(io.RawIOBase):
+    """Seekable read-only view of an S3 object backed by ranged GETs, so zipfile can
+    read the central directory and single members without downloading the archive."""
+
+    def __init__(self, client, bucket, key):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.length = client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.length + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.length or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.length) - 1
+        body = self.client.get_object(Bucket=self.bucket, Key=self.key,
+                                      Range=f"bytes={self.position}-{end}")['Body']
+        data = body.read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class S3Storage:
+    """Backup archives in an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    Uploads are streamed from the staged archive in multipart chunks of `part_size`
+    bytes; downloads are streamed back in chunks. Only one part or chunk is held in
+    memory at a time. Requires boto3; credentials come from the usual AWS sources
+    (environment, config files, instance roles)."""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, part_size=8 * 1024 * 1024,
+                 client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("S3 storage requires boto3 (pip install boto3).")
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.part_size = max(part_size, MIN_PART_SIZE)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def local_path(self, key):
+        return None
+
+    def put_file(self, key, source_path):
+        object_key = self._key(key)
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=object_key,
+                                                        ContentType='application/zip')['UploadId']
+        try:
+            parts = []
+            with open(source_path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.part_size)
+                    if not chunk and parts:
+                        break
+                    part_number = len(parts) + 1
+                    response = self.client.upload_part(Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                                                       PartNumber=part_number, Body=chunk)
+                    parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                    if len(chunk) < self.part_size:
+                        break
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                                                  MultipartUpload={'Parts': parts})
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+        os.remove(source_path)
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head['ContentLength']
+
+    def delete(self, key):
+        if not self.exists(key):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def move(self, key, new_key):
+        self.client.copy_object(Bucket=self.bucket, Key=self._key(new_key),
+                                CopySource={'Bucket': self.bucket, 'Key': self._key(key)})
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, suffix='.zip', prefix='', recursive=True):
+        paginator = self.client.get_paginator('list_objects_v2')
+        options = {} if recursive else {'Delimiter': '/'}
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix), **options):
+            for obj in page.get('Contents', []):
+                key = obj['Key'][len(self.prefix):]
+                if key.endswith(suffix):
+                    yield key, obj['Size']
+
+    def open(self, key):
+        if not self.exists(key):
+            raise FileNotFoundError(key)
+        return io.BufferedReader(_S3RangeReader(self.client, self.bucket, self._key(key)),
+                                 buffer_size=DOWNLOAD_CHUNK_SIZE)
+
+    def iter_chunks(self, key, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
@@ -0,0 +1,125 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.(prof|txt)$')
+
+
+class Trace:
+    """Timing spans of one backup run. Spans may be recorded from several threads
+    (e.g. the export pool), so they can overlap."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {'name': name, 'start_ms': round((start - self.started) * 1000, 2),
+                      'duration_ms': round((time.perf_counter() - start) * 1000, 2)}
+            record.update(attrs)
+            if error:
+                record['error'] = error
+            with self._lock:
+                self.spans.append(record)
+
+    def add_spans(self, spans):
+        """Adds spans recorded elsewhere (e.g. in a worker process), already relative
+        to this trace's start."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['start_ms'])
+        return {'total_ms': self.total_ms(), 'spans': spans}
+
+
+class BackupProfiler:
+    """Runs cProfile around the next N backups once armed. Each profiled run leaves a
+    `.prof` file (for pstats/snakeviz) and a `.txt` summary in `output_dir`.
+
+    Only one run is profiled at a time; a backup that starts while another one is
+    being profiled runs unprofiled and does not use up a slot."""
+
+    def __init__(self, output_dir, top=40):
+        self.output_dir = output_dir
+        self.top = top
+        self.remaining = 0
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    def arm(self, count):
+        with self._lock:
+            self.remaining = count
+
+    def disarm(self):
+        self.arm(0)
+
+    def _claim(self):
+        with self._lock:
+            if self.remaining <= 0 or not self._active.acquire(blocking=False):
+                return False
+            self.remaining -= 1
+            return True
+
+    @contextmanager
+    def profile(self, label):
+        """Yields True while the block is profiled, False if the profiler is not armed."""
+        if not self._claim():
+            yield False
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield True
+            finally:
+                profiler.disable()
+                self._save(profiler, label)
+        finally:
+            self._active.release()
+
+    def _save(self, profiler, label):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, re.sub(r'[^\w.-]', '_', label))
+        profiler.dump_stats(f"{base}.prof")
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top)
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+
+    def list_profiles(self):
+        if not os.path.isdir(self.output_dir):
+            return []
+        names = [name for name in os.listdir(self.output_dir) if PROFILE_NAME_RE.match(name)]
+        return sorted(names, key=lambda name: os.path.getmtime(os.path.join(self.output_dir, name)), reverse=True)
+
+    def path_for(self, name):
+        """Path of a saved profile, or None for unknown or unsafe names."""
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = os.path.join(self.output_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def status(self):
+        with self._lock:
+            remaining = self.remaining
+        return {'remaining': remaining, 'active': self._active.locked(), 'profiles': self.list_profiles()}
@@ -0,0 +1,147 @@
+import struct
+import zipfile
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+ZIP64_END_LOCATOR = struct.Struct('<IIQI')
+
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    year = max(year, 1980)
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+class _Entry:
+    def __init__(self, name, method, flags, crc, compress_size, file_size, date_time, offset, external_attr):
+        self.name = name.encode('utf-8')
+        self.method = method
+        self.flags = (flags & ~FLAG_DATA_DESCRIPTOR) | (FLAG_UTF8 if not name.isascii() else 0)
+        self.crc = crc
+        self.compress_size = compress_size
+        self.file_size = file_size
+        self.date_time = date_time
+        self.offset = offset
+        self.external_attr = external_attr
+
+    @property
+    def needs_zip64(self):
+        return self.compress_size >= ZIP64_LIMIT or self.file_size >= ZIP64_LIMIT
+
+    def local_header(self):
+        dos_time, dos_date = _dos_datetime(self.date_time)
+        extra = b''
+        compress_size, file_size = self.compress_size, self.file_size
+        if self.needs_zip64:
+            extra = struct.pack('<HHQQ', 0x0001, 16, self.file_size, self.compress_size)
+            compress_size = file_size = ZIP64_LIMIT
+        version = 45 if extra else 20
+        return LOCAL_HEADER.pack(0x04034b50, version, self.flags, self.method, dos_time, dos_date, self.crc,
+                                 compress_size, file_size, len(self.name), len(extra)) + self.name + extra
+
+    def central_header(self):
+        dos_time, dos_date = _dos_datetime(self.date_time)
+        zip64_fields = []
+        compress_size, file_size, offset = self.compress_size, self.file_size, self.offset
+        if file_size >= ZIP64_LIMIT or compress_size >= ZIP64_LIMIT:
+            zip64_fields += [self.file_size, self.compress_size]
+            compress_size = file_size = ZIP64_LIMIT
+        if offset >= ZIP64_LIMIT:
+            zip64_fields.append(self.offset)
+            offset = ZIP64_LIMIT
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+        version = 45 if extra else 20
+        return CENTRAL_HEADER.pack(0x02014b50, version, version, self.flags, self.method, dos_time, dos_date,
+                                   self.crc, compress_size, file_size, len(self.name), len(extra), 0, 0, 0,
+                                   self.external_attr, offset) + self.name + extra
+
+
+class ZipStreamWriter:
+    """Builds a zip archive as a sequence of byte chunks, for streaming responses.
+
+    Members of existing archives are copied with their compressed bytes as-is (no
+    decompression or recompression); small generated members can be added from memory.
+    No temporary file is used and memory stays at one chunk. ZIP64 records are written
+    when sizes, offsets or the entry count exceed the classic zip limits.
+
+    Usage: `for chunk in writer.copy_members(...)` / `writer.add_bytes(...)` and
+    finally `writer.close()`; each yields/returns the bytes to send."""
+
+    def __init__(self):
+        self.entries = []
+        self.offset = 0
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def copy_members(self, source, prefix='', names=None):
+        """Yields the chunks for the members of the zip file object `source` (seekable),
+        stored under `prefix` + their original name. All local headers and member extents
+        are checked before the first chunk, so a damaged archive raises BadZipFile without
+        anything having been yielded; only read errors can still interrupt the copy."""
+        with zipfile.ZipFile(source, 'r') as zipf:
+            infos = [info for info in zipf.infolist() if not info.is_dir() and (names is None or info.filename in names)]
+        source.seek(0, 2)
+        source_size = source.tell()
+        members = []
+        for info in infos:
+            source.seek(info.header_offset)
+            header = source.read(LOCAL_HEADER.size)
+            fields = LOCAL_HEADER.unpack(header) if len(header) == LOCAL_HEADER.size else None
+            if fields is None or fields[0] != 0x04034b50:
+                raise zipfile.BadZipFile(f"Bad local header for member {info.filename}")
+            data_offset = info.header_offset + LOCAL_HEADER.size + fields[9] + fields[10]  # after name and extra field
+            if data_offset + info.compress_size > source_size:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            members.append((info, data_offset))
+
+        for info, data_offset in members:
+            source.seek(data_offset)
+            entry = _Entry(prefix + info.filename, info.compress_type, info.flag_bits, info.CRC, info.compress_size,
+                           info.file_size, info.date_time, self.offset, info.external_attr)
+            yield self._emit(entry.local_header())
+            remaining = info.compress_size
+            while remaining:
+                chunk = source.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+                remaining -= len(chunk)
+                yield self._emit(chunk)
+            self.entries.append(entry)
+
+    def add_bytes(self, name, data, date_time):
+        """Returns the chunk for a deflated member built from `data`."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        entry = _Entry(name, zipfile.ZIP_DEFLATED, 0, zlib.crc32(data) & 0xFFFFFFFF, len(compressed), len(data),
+                       date_time, self.offset, 0o644 << 16)
+        self.entries.append(entry)
+        return self._emit(entry.local_header() + compressed)
+
+    def close(self):
+        """Returns the central directory and end records."""
+        central_offset = self.offset
+        central = b''.join(entry.central_header() for entry in self.entries)
+        central_size = len(central)
+        count = len(self.entries)
+        tail = b''
+        if count >= ZIP64_COUNT_LIMIT or central_offset >= ZIP64_LIMIT or central_size >= ZIP64_LIMIT:
+            zip64_end_offset = central_offset + central_size
+            tail += ZIP64_END_RECORD.pack(0x06064b50, ZIP64_END_RECORD.size - 12, 45, 45, 0, 0,
+                                          count, count, central_size, central_offset)
+            tail += ZIP64_END_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1)
+        tail += END_RECORD.pack(0x06054b50, 0, 0, min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+                                min(central_size, ZIP64_LIMIT), min(central_offset, ZIP64_LIMIT), 0)
+        return self._emit(central + tail)
@@ -0,0 +1,134 @@
+"""Compares ANIVAULT_EXPORT_MODE=threads and =processes under concurrent backups.
+
+For each mode a fresh AniVault instance is started in a subprocess (self-hosted, with
+the mock AniList from mock_anilist.py). Several users then run POST /backup in parallel
+for a few rounds while a probe client keeps requesting a light endpoint. Reported per
+mode: the probe latency while backups are running (the cost of CPU-bound export work
+holding the GIL) and the total backup throughput.
+
+    python tools/bench_backup_modes.py [--users 4] [--rounds 3] [--anime 8000 --manga 3000]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from loadtest import percentile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import logging, os, sys, tempfile, threading
+sys.path.insert(0, {tools!r})
+from mock_anilist import MockAniList, start_server
+_, mock_url = start_server(MockAniList({anime}, {manga}, 0.0, 0.0))
+os.environ['ANIVAULT_ANILIST_API_URL'] = mock_url
+os.chdir(tempfile.mkdtemp(prefix='anivault-bench-modes-'))
+sys.path.insert(0, os.path.join({tools!r}, '..', 'src'))
+import app as anivault
+from werkzeug.serving import make_server
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+server = make_server('127.0.0.1', 0, anivault.app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def start_instance(mode, args):
+    env = dict(os.environ, ANIVAULT_EXPORT_MODE=mode)
+    if args.processes:
+        env['ANIVAULT_EXPORT_PROCESSES'] = str(args.processes)
+    script = SERVER_SCRIPT.format(tools=TOOLS_DIR, anime=args.anime, manga=args.manga)
+    proc = subprocess.Popen([sys.executable, '-c', script], env=env, stdout=subprocess.PIPE, text=True,
+                            start_new_session=True)
+    port = int(proc.stdout.readline())
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def probe(target, path, stop, latencies):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.get(f"{target}{path}", timeout=60)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.02)
+
+
+def run_mode(mode, args):
+    proc, target = start_instance(mode, args)
+    try:
+        # One warm-up backup, so pool start-up and first imports are not measured.
+        requests.post(f"{target}/backup", json={'username': 'warmup'}, timeout=600).raise_for_status()
+
+        idle = []
+        stop = threading.Event()
+        thread = threading.Thread(target=probe, args=(target, args.probe, stop, idle))
+        thread.start()
+        time.sleep(2)
+        stop.set()
+        thread.join()
+
+        busy = []
+        stop = threading.Event()
+        prober = threading.Thread(target=probe, args=(target, args.probe, stop, busy))
+        errors = []
+
+        def user_loop(user):
+            session = requests.Session()
+            for i in range(args.rounds):
+                response = session.post(f"{target}/backup", json={'username': f"bench{user}"}, timeout=600)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+                time.sleep(1.01)  # backup ids have second resolution
+
+        users = [threading.Thread(target=user_loop, args=(u,)) for u in range(args.users)]
+        prober.start()
+        started = time.perf_counter()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+        # Each user sleeps 1.01s between rounds; that idle time is not backup work.
+        work_seconds = elapsed - (args.rounds - 1) * 1.01
+        return {'mode': mode, 'idle': sorted(idle), 'busy': sorted(busy), 'elapsed': elapsed,
+                'backups': args.users * args.rounds - len(errors), 'errors': len(errors),
+                'throughput': (args.users * args.rounds - len(errors)) / work_seconds}
+    finally:
+        # The whole process group, so the export pool's workers go too.
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=4, help='Concurrent users running backups')
+    parser.add_argument('--rounds', type=int, default=3, help='Backups per user')
+    parser.add_argument('--anime', type=int, default=8000, help='Anime entries per user')
+    parser.add_argument('--manga', type=int, default=3000, help='Manga entries per user')
+    parser.add_argument('--processes', type=int, default=0, help='ANIVAULT_EXPORT_PROCESSES (default: CPU count)')
+    parser.add_argument('--probe', default='/backups?limit=1', help='Endpoint polled during the backups')
+    parser.add_argument('--modes', nargs='+', default=['threads', 'processes'])
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in args.modes]
+    print(f"{args.users} users x {args.rounds} backups, {args.anime} anime + {args.manga} manga entries each, "
+          f"probe {args.probe}\n")
+    print(f"{'mode':<11}{'idle p50':>10}{'busy p50':>10}{'busy p99':>10}{'busy max':>10}{'probes':>8}"
+          f"{'wall s':>9}{'backups/s':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['mode']:<11}{percentile(r['idle'], 50) * 1000:>10.1f}{percentile(r['busy'], 50) * 1000:>10.1f}"
+              f"{percentile(r['busy'], 99) * 1000:>10.1f}{r['busy'][-1] * 1000 if r['busy'] else 0:>10.1f}"
+              f"{len(r['busy']):>8}{r['elapsed']:>9.1f}{r['throughput']:>11.2f}{r['errors']:>8}")
+    print("\nLatencies in ms. 'busy' probes ran while the backups were in progress.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""End-to-end fetch latency: combined query vs. sequential vs. concurrent engine.
+
+Runs against the local AniList stand-in (tools/mock_anilist.py), so no real
+API traffic is generated.
+
+    python tools/bench_fetch.py [--anime 3000 --manga 1500 --runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+from mock_anilist import MockAniList, start_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from api import AniListAPI, ANIME_ENTRY_FIELDS, MANGA_ENTRY_FIELDS  # noqa: E402
+
+COMBINED_QUERY = """
+query ($username: String) {
+    MediaListCollection(userName: $username, type: ANIME) { lists { name entries {%s} } }
+    MediaListCollection2: MediaListCollection(userName: $username, type: MANGA) { lists { name entries {%s} } }
+}
+""" % (ANIME_ENTRY_FIELDS, MANGA_ENTRY_FIELDS)
+
+
+def count_entries(data):
+    return sum(len(l['entries']) for c in data['data'].values() for l in c['lists'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--anime', type=int, default=3000)
+    parser.add_argument('--manga', type=int, default=1500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--per-entry-latency', type=float, default=0.0002)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    mock = MockAniList(args.anime, args.manga, args.latency, args.per_entry_latency)
+    server, url = start_server(mock)
+    api = AniListAPI(api_url=url, max_concurrency=args.concurrency)
+
+    def combined():
+        return requests.post(url, json={'query': COMBINED_QUERY, 'variables': {'username': 'bench'}}).json()
+
+    def sequential():
+        anime = api.get_anime_list('bench')['data']['MediaListCollection']
+        manga = api.get_manga_list('bench')['data']['MediaListCollection']
+        return {'data': {'MediaListCollection': anime, 'MediaListCollection2': manga}}
+
+    def concurrent():
+        return api.fetch_lists('bench')
+
+    expected = args.anime + args.manga
+    print(f"{args.anime} anime + {args.manga} manga, base latency {args.latency * 1000:.0f} ms, "
+          f"{args.per_entry_latency * 1e6:.0f} us/entry, concurrency {args.concurrency}")
+    for name, func in [('combined query', combined), ('sequential anime, manga', sequential),
+                       ('concurrent engine', concurrent)]:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            data = func()
+            timings.append(time.perf_counter() - start)
+            assert count_entries(data) == expected, f"{name} returned {count_entries(data)} entries"
+        print(f"{name:<26} median {statistics.median(timings) * 1000:8.1f} ms  (min {min(timings) * 1000:.1f} ms)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Times MAL XML generation with and without the fragment cache (ANIVAULT_MAL_FRAGMENT_CACHE).
+
+Builds a synthetic list, generates anime.xml once without the cache, once with a cold
+cache, then again after changing, adding and removing a few entries. The cached output is
+checked against the uncached one each time, and the cache database against the list (one
+row per distinct entry), also after reopening it.
+
+    python tools/bench_mal_fragments.py [--entries 20000] [--changes 1 10 100 1000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import mal_xml  # noqa: E402
+from entries import Entry  # noqa: E402
+from fragment_cache import FragmentCache  # noqa: E402
+
+STATUSES = ['CURRENT', 'COMPLETED', 'PAUSED', 'DROPPED', 'PLANNING', 'REPEATING']
+
+
+def raw_entry(rng, media_id):
+    return {
+        'mediaId': media_id, 'status': rng.choice(STATUSES), 'score': rng.randint(0, 100),
+        'progress': rng.randint(0, 24), 'repeat': rng.randint(0, 2),
+        'startedAt': {'year': 2020, 'month': rng.randint(1, 12), 'day': rng.randint(1, 28)},
+        'completedAt': {'year': None, 'month': None, 'day': None},
+        'media': {'idMal': media_id + 100000, 'format': 'TV', 'episodes': 24,
+                  'title': {'romaji': f"Series {media_id}", 'english': None, 'native': None}},
+    }
+
+
+def timed(entries):
+    started = time.perf_counter()
+    xml = mal_xml.generate_mal_xml(entries, 'anime', 'bench')
+    return xml, (time.perf_counter() - started) * 1000
+
+
+def uncached(entries):
+    cache, mal_xml.fragment_cache = mal_xml.fragment_cache, None
+    try:
+        return timed(entries)
+    finally:
+        mal_xml.fragment_cache = cache
+
+
+def check_rows(cache, entries):
+    """The stored list must hold exactly the current entries: no rows of removed or
+    changed entries may be left behind."""
+    keys = [mal_xml.fragment_key(entry) for entry in entries]
+    with sqlite3.connect(cache.db_path) as conn:
+        rows, copies = conn.execute("SELECT COUNT(*), SUM(copies) FROM fragments WHERE list_key = ?",
+                                    (f"bench/anime/v{mal_xml.RENDER_VERSION}",)).fetchone()
+    assert (rows, copies) == (len(set(keys)), len(keys)), \
+        f"cache holds {rows} rows / {copies} copies for {len(set(keys))} distinct of {len(keys)} entries"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--changes', type=int, nargs='+', default=[0, 1, 10, 100, 1000])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raws = [raw_entry(rng, i) for i in range(1, args.entries + 1)]
+    next_id = args.entries + 1
+    db_path = os.path.join(tempfile.mkdtemp(prefix='anivault-fragments-'), 'f.db')
+    mal_xml.fragment_cache = FragmentCache(db_path)
+
+    entries = [Entry(raw) for raw in raws]
+    expected, full_ms = uncached(entries)
+    xml, cold_ms = timed(entries)
+    assert xml == expected, "cached output differs"
+    check_rows(mal_xml.fragment_cache, entries)
+    print(f"{args.entries} entries: uncached {full_ms:.1f} ms, cold cache {cold_ms:.1f} ms\n")
+    print(f"{'changes':>8}{'uncached ms':>13}{'cached ms':>11}{'rendered':>10}")
+    for changes in args.changes:
+        # A third of the changes edit entries, a third add entries and a third remove entries.
+        for raw in rng.sample(raws, changes - 2 * (changes // 3)):
+            raw['progress'] += 1
+        for _ in range(changes // 3):
+            raws.append(raw_entry(rng, next_id))
+            next_id += 1
+        for _ in range(changes // 3):
+            raws.pop(rng.randrange(len(raws)))
+        entries = [Entry(raw) for raw in raws]
+        expected, full_ms = uncached(entries)
+        misses = mal_xml.fragment_cache.misses
+        xml, cached_ms = timed(entries)
+        assert xml == expected, f"cached output differs after {changes} changes"
+        check_rows(mal_xml.fragment_cache, entries)
+        print(f"{changes:>8}{full_ms:>13.1f}{cached_ms:>11.1f}{mal_xml.fragment_cache.misses - misses:>10}")
+
+    # A new instance (e.g. after a restart) reads the list back from the database.
+    mal_xml.fragment_cache = FragmentCache(db_path)
+    misses = mal_xml.fragment_cache.misses
+    xml, _ = timed(entries)
+    assert xml == expected and mal_xml.fragment_cache.misses == misses, "reopened cache differs"
+    check_rows(mal_xml.fragment_cache, entries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Compares peak Python memory of the buffered and the streaming export path.
+
+Generates AniList-shaped responses of growing size on disk, then runs the same
+export formats once from json.load() + ExportContext and once through the
+incremental parser. The streaming peak should stay roughly flat while the
+buffered peak grows with the list size; the script exits non-zero otherwise. It also
+exits non-zero if any format with a streaming writer produces different bytes than its
+buffered exporter.
+
+    python tools/bench_stream_memory.py [--sizes 1000 5000 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mock_anilist import make_entry
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def write_response(path, size):
+    def collection(media_type, count):
+        entries = [make_entry(i, media_type) for i in range(1, count + 1)]
+        return {'lists': [{'name': 'Main', 'entries': entries}]}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'data': {'MediaListCollection': collection('anime', size),
+                            'MediaListCollection2': collection('manga', size // 2)}}, f)
+
+
+def measure(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def compare_outputs(app, response_path, workdir, executor):
+    """Runs every streamable format both ways on the same input; returns the names of
+    the files whose bytes differ."""
+    from json_stream import iter_anilist_entries
+    formats = [name for name in app.EXPORTERS if app.supports_streaming([name])]
+    generated_at = datetime.now()
+    buffered_dir, streaming_dir = tempfile.mkdtemp(dir=workdir), tempfile.mkdtemp(dir=workdir)
+    with open(response_path, 'rb') as f:
+        raw_data = json.load(f)
+    anime = app.collection_entries(raw_data, 'MediaListCollection')
+    manga = app.collection_entries(raw_data, 'MediaListCollection2')
+    anime_stats, manga_stats = app.calculate_stats(anime, manga, 'bench')
+    context = app.ExportContext('bench', anime, manga, anime_stats, manga_stats, generated_at)
+    app.run_exporters(context, formats, buffered_dir, executor)
+    with open(response_path, 'rb') as f:
+        app.export_entry_stream(iter_anilist_entries(f), 'bench', formats, streaming_dir, generated_at)
+    differing = []
+    for name in sorted(os.listdir(buffered_dir)):
+        with open(os.path.join(buffered_dir, name), 'rb') as f_buffered:
+            try:
+                with open(os.path.join(streaming_dir, name), 'rb') as f_streaming:
+                    same = f_buffered.read() == f_streaming.read()
+            except FileNotFoundError:
+                same = False
+        if not same:
+            differing.append(name)
+    return formats, differing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='anivault_bench_')
+    os.chdir(workdir)  # app.py creates app_data/ and backups/ relative to the cwd
+    sys.path.insert(0, SRC_DIR)
+    import app
+    from json_stream import iter_anilist_entries
+
+    formats = app.resolve_formats(None)
+    executor = ThreadPoolExecutor(max_workers=app.EXPORT_WORKERS)
+    results = []
+    for size in args.sizes:
+        response_path = os.path.join(workdir, f'response_{size}.json')
+        write_response(response_path, size)
+        out_dir = tempfile.mkdtemp(dir=workdir)
+
+        def buffered():
+            with open(response_path, 'rb') as f:
+                raw_data = json.load(f)
+            anime = app.collection_entries(raw_data, 'MediaListCollection')
+            manga = app.collection_entries(raw_data, 'MediaListCollection2')
+            anime_stats, manga_stats = app.calculate_stats(anime, manga, 'bench')
+            context = app.ExportContext('bench', anime, manga, anime_stats, manga_stats, datetime.now())
+            app.run_exporters(context, formats, out_dir, executor)
+
+        def streaming():
+            with open(response_path, 'rb') as f:
+                app.export_entry_stream(iter_anilist_entries(f), 'bench', formats, out_dir, datetime.now())
+
+        buffered_peak = measure(buffered)
+        streaming_peak = measure(streaming)
+        results.append((size, os.path.getsize(response_path), buffered_peak, streaming_peak))
+        print(f"{size:>7} anime entries | payload {os.path.getsize(response_path) / 2**20:7.1f} MiB | "
+              f"buffered peak {buffered_peak / 2**20:7.1f} MiB | streaming peak {streaming_peak / 2**20:6.2f} MiB")
+
+    formats, differing = compare_outputs(app, response_path, workdir, executor)
+    executor.shutdown()
+    if differing:
+        print(f"FAIL: streamed output differs from the buffered export: {', '.join(differing)}")
+        sys.exit(1)
+    print(f"streamed and buffered output identical for: {', '.join(formats)}")
+    smallest, largest = results[0], results[-1]
+    growth = largest[3] / smallest[3]
+    payload_growth = largest[1] / smallest[1]
+    print(f"payload grew {payload_growth:.1f}x, streaming peak grew {growth:.2f}x")
+    if len(results) > 1 and growth > 2:
+        print("FAIL: streaming peak memory grows with list size")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
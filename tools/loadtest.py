@@ -0,0 +1,191 @@
+"""HTTP load test for a running AniVault instance.
+
+Concurrent clients repeatedly pick an endpoint from a weighted mix and call it
+until the duration is up; per endpoint the harness reports request count,
+error rate and p50/p90/p99 latency.
+
+    backups    GET  /backups?limit=50
+    logs       GET  /logs
+    index      GET  /                 (the dashboard page, with its initial state embedded)
+    bootstrap  GET  /bootstrap
+    backup     POST /backup             (each client backs up its own username)
+    events     GET  /events             (latency = time to the first SSE chunk)
+
+Against a running instance (ideally with ANIVAULT_ANILIST_API_URL pointing at
+tools/mock_anilist.py, so no real AniList traffic is generated):
+
+    python tools/loadtest.py --target http://127.0.0.1:5000 --clients 20 --duration 30
+
+Or let the harness host the mock and an AniVault instance in a temp directory:
+
+    python tools/loadtest.py --self-host --clients 20 --duration 30 --rate-limit 90
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from mock_anilist import MockAniList, start_server
+
+DEFAULT_MIX = 'backups=10,logs=5,backup=1,events=2'
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name.strip()}'. Use: {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def op_backups(session, target, args, client_id):
+    return session.get(f"{target}/backups", params={'limit': 50}, timeout=args.timeout).status_code
+
+
+def op_logs(session, target, args, client_id):
+    return session.get(f"{target}/logs", timeout=args.timeout).status_code
+
+
+def op_index(session, target, args, client_id):
+    return session.get(f"{target}/", timeout=args.timeout).status_code
+
+
+def op_bootstrap(session, target, args, client_id):
+    return session.get(f"{target}/bootstrap", timeout=args.timeout).status_code
+
+
+def op_backup(session, target, args, client_id):
+    response = session.post(f"{target}/backup", json={'username': f"{args.username}{client_id}"},
+                            timeout=args.timeout)
+    return response.status_code
+
+
+def op_events(session, target, args, client_id):
+    # The stream only starts once an event (or the 25s keep-alive) is sent, so this
+    # measures how long a client waits for its first message.
+    with session.get(f"{target}/events", stream=True, timeout=args.sse_timeout) as response:
+        next(response.iter_content(chunk_size=None), None)
+        return response.status_code
+
+
+OPERATIONS = {'backups': op_backups, 'logs': op_logs, 'index': op_index, 'bootstrap': op_bootstrap,
+              'backup': op_backup, 'events': op_events}
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, error=None):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if error:
+                self.errors[name][error] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    return sorted_values[max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)]
+
+
+def client_loop(client_id, target, weights, args, deadline, results):
+    session = requests.Session()
+    names = list(weights)
+    rng = random.Random(client_id)
+    while time.time() < deadline:
+        name = rng.choices(names, weights=[weights[n] for n in names])[0]
+        started = time.perf_counter()
+        error = None
+        try:
+            status = OPERATIONS[name](session, target, args, client_id)
+            if status >= 400:
+                error = f"HTTP {status}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        results.record(name, time.perf_counter() - started, error)
+
+
+def report(results, elapsed):
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'err %':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    total = 0
+    for name in sorted(results.latencies):
+        values = sorted(results.latencies[name])
+        errors = sum(results.errors[name].values())
+        total += len(values)
+        print(f"{name:<10}{len(values):>10}{errors:>8}{100.0 * errors / len(values):>8.1f}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 90) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}")
+        for error, count in results.errors[name].most_common():
+            print(f"{'':<10}  {count} x {error}")
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+
+def self_host(args):
+    """Starts the AniList stand-in and an AniVault instance in a temp dir. Returns (target, mock)."""
+    mock = MockAniList(args.anime, args.manga, args.latency, args.per_entry_latency,
+                       rate_limit=args.rate_limit, rate_window=args.rate_window)
+    _, mock_url = start_server(mock)
+    os.environ['ANIVAULT_ANILIST_API_URL'] = mock_url
+    os.chdir(tempfile.mkdtemp(prefix='anivault-loadtest-'))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import app as anivault  # noqa: E402  (reads the environment at import time)
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, anivault.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Self-hosted AniVault on port {server.server_port} (data in {os.getcwd()}), mock AniList at {mock_url}")
+    return f"http://127.0.0.1:{server.server_port}", mock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help='Base URL of the AniVault instance')
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted operation mix (default: {DEFAULT_MIX})")
+    parser.add_argument('--username', default='loadtest', help='Username prefix for POST /backup')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Request timeout in seconds')
+    parser.add_argument('--sse-timeout', type=float, default=30.0, help='Max wait for the first SSE chunk')
+    parser.add_argument('--self-host', action='store_true', help='Run the mock and AniVault in-process')
+    parser.add_argument('--anime', type=int, default=1000, help='[self-host] anime entries per user')
+    parser.add_argument('--manga', type=int, default=500, help='[self-host] manga entries per user')
+    parser.add_argument('--latency', type=float, default=0.05, help='[self-host] mock base latency')
+    parser.add_argument('--per-entry-latency', type=float, default=0.0001, help='[self-host] mock per-entry latency')
+    parser.add_argument('--rate-limit', type=int, default=None, help='[self-host] mock requests per window')
+    parser.add_argument('--rate-window', type=float, default=60.0, help='[self-host] mock rate limit window')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    target, mock = self_host(args) if args.self_host else (args.target.rstrip('/'), None)
+
+    results = Results()
+    started = time.time()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=client_loop, args=(i, target, weights, args, deadline, results), daemon=True)
+               for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(results, time.time() - started)
+    if mock:
+        print(f"Mock AniList: {mock.requests_served} requests served, {mock.requests_limited} rate-limited (429)")
+
+
+if __name__ == '__main__':
+    main()
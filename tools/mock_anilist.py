@@ -0,0 +1,227 @@
+"""Local stand-in for the AniList GraphQL API.
+
+Answers MediaListCollection queries (combined anime+manga, single type, and
+chunk/perChunk paging) with generated lists. Response time is a base latency
+plus a per-entry cost, roughly modelling how AniList's response time grows
+with collection size. Entries only hold the fields the query selects, and
+responses are gzip-compressed when the client accepts it.
+
+With --rate-limit, requests beyond that many per --rate-window seconds get a
+429 with Retry-After and X-RateLimit-* headers, like AniList's own limiter
+(90 requests per minute at the time of writing).
+
+    python tools/mock_anilist.py --port 8765 --anime 3000 --manga 1500
+    python tools/mock_anilist.py --rate-limit 90 --rate-window 60
+
+Point AniVault at it with ANIVAULT_ANILIST_API_URL=http://127.0.0.1:8765.
+"""
+import argparse
+import gzip
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ['CURRENT', 'COMPLETED', 'PLANNING', 'DROPPED', 'PAUSED', 'REPEATING']
+LIST_NAMES = {'CURRENT': 'Watching', 'COMPLETED': 'Completed', 'PLANNING': 'Planning',
+              'DROPPED': 'Dropped', 'PAUSED': 'Paused', 'REPEATING': 'Rewatching'}
+TYPE_RE = re.compile(r'type:\s*(ANIME|MANGA)')
+TOKEN_RE = re.compile(r'[{}]|\w+')
+
+
+def entry_selection(query):
+    """The fields selected inside `entries { ... }` as a nested dict (None for leaves),
+    so responses only hold the requested fields, like the real API."""
+    start = query.find('entries')
+    if start < 0:
+        return None
+    tokens = TOKEN_RE.findall(query[start + len('entries'):])
+
+    def parse(pos):
+        selection = {}
+        while pos < len(tokens) and tokens[pos] != '}':
+            name = tokens[pos]
+            pos += 1
+            if pos < len(tokens) and tokens[pos] == '{':
+                selection[name], pos = parse(pos + 1)
+            else:
+                selection[name] = None
+        return selection, pos + 1
+
+    return parse(1)[0] if tokens and tokens[0] == '{' else None
+
+
+def project(value, selection):
+    return {key: project(value[key], sub) if sub and isinstance(value[key], dict) else value[key]
+            for key, sub in selection.items() if key in value}
+
+
+def make_entry(i, media_type):
+    media_type = media_type.lower()
+    entry = {
+        'mediaId': i, 'status': STATUSES[i % len(STATUSES)],
+        'score': (i * 7) % 100, 'progress': i % 40, 'repeat': i % 3,
+        'startedAt': {'year': 2015 + i % 8, 'month': 1 + i % 12, 'day': 1 + i % 28},
+        'completedAt': ({'year': 2015 + i % 8, 'month': 1 + (i + 1) % 12, 'day': None if i % 5 == 0 else 1 + i % 28}
+                        if STATUSES[i % len(STATUSES)] == 'COMPLETED' else {'year': None, 'month': None, 'day': None}),
+        'media': {'idMal': i if i % 9 else None, 'id': i,
+                  'title': {'romaji': f'Romaji Title {i}', 'english': f'English Title {i}', 'native': f'タイトル{i}'},
+                  'type': media_type.upper(), 'format': 'TV' if media_type == 'anime' else 'MANGA', 'status': 'FINISHED'}
+    }
+    if media_type == 'anime':
+        entry['media']['episodes'] = 12
+    else:
+        entry['progressVolumes'] = i % 10
+        entry['media'].update({'chapters': 100, 'volumes': 10})
+    return entry
+
+
+class MockAniList:
+    def __init__(self, anime_count=1000, manga_count=500, base_latency=0.05, per_entry_latency=0.0001,
+                 missing_users=('missing',), rate_limit=None, rate_window=60.0):
+        self.counts = {'ANIME': anime_count, 'MANGA': manga_count}
+        self.base_latency = base_latency
+        self.per_entry_latency = per_entry_latency
+        self.missing_users = set(missing_users)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.requests_served = 0
+        self.requests_limited = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def entries(self, media_type):
+        if media_type not in self._entries:
+            offset = 0 if media_type == 'ANIME' else 1000000
+            self._entries[media_type] = [make_entry(offset + i, media_type) for i in range(1, self.counts[media_type] + 1)]
+        return self._entries[media_type]
+
+    def collection(self, media_type, chunk=None, per_chunk=None, selection=None):
+        entries = self.entries(media_type)
+        has_next = False
+        if chunk:
+            per_chunk = per_chunk or 500
+            start = (chunk - 1) * per_chunk
+            has_next = start + per_chunk < len(entries)
+            entries = entries[start:start + per_chunk]
+        lists = {}
+        for entry in entries:
+            name = LIST_NAMES[entry['status']]
+            lists.setdefault(name, {'name': name, 'entries': []})['entries'].append(
+                project(entry, selection) if selection else entry)
+        collection = {'lists': list(lists.values())}
+        if chunk:
+            collection['hasNextChunk'] = has_next
+        return collection, len(entries)
+
+    def _check_rate_limit(self):
+        """Fixed-window limiter. Returns None if the request may proceed, else 429 headers."""
+        if not self.rate_limit:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_count = 0
+            reset_in = self.rate_window - (now - self._window_start)
+            if self._window_count >= self.rate_limit:
+                self.requests_limited += 1
+                return {'Retry-After': str(max(1, math.ceil(reset_in))), 'X-RateLimit-Limit': str(self.rate_limit),
+                        'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time() + reset_in))}
+            self._window_count += 1
+            return None
+
+    def handle(self, body):
+        """Returns (status, headers, payload) for one GraphQL request body."""
+        limited = self._check_rate_limit()
+        if limited:
+            return 429, limited, {'errors': [{'message': 'Too Many Requests.', 'status': 429}], 'data': None}
+        with self._lock:
+            self.requests_served += 1
+        query = body.get('query', '')
+        variables = body.get('variables') or {}
+        if variables.get('username') in self.missing_users:
+            return 404, {}, {'errors': [{'message': 'User not found', 'status': 404}], 'data': None}
+
+        data = {}
+        entry_count = 0
+        if 'MediaListCollection2' in query:
+            split = query.index('MediaListCollection2')
+            for alias, media_type, part in [('MediaListCollection', 'ANIME', query[:split]),
+                                            ('MediaListCollection2', 'MANGA', query[split:])]:
+                data[alias], count = self.collection(media_type, selection=entry_selection(part))
+                entry_count += count
+        else:
+            match = TYPE_RE.search(query)
+            media_type = variables.get('type') or (match.group(1) if match else 'ANIME')
+            data['MediaListCollection'], entry_count = self.collection(
+                media_type, variables.get('chunk'), variables.get('perChunk'), entry_selection(query))
+        time.sleep(self.base_latency + self.per_entry_latency * entry_count)
+        return 200, {}, {'data': data}
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                body = {}
+            status, headers, payload = mock.handle(body)
+            raw = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                raw = gzip.compress(raw, compresslevel=6)
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(raw)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(mock, host='127.0.0.1', port=0):
+    """Starts the stand-in on a background thread. Returns (server, url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--anime', type=int, default=1000, help='Anime entries per user')
+    parser.add_argument('--manga', type=int, default=500, help='Manga entries per user')
+    parser.add_argument('--latency', type=float, default=0.05, help='Base latency per request in seconds')
+    parser.add_argument('--per-entry-latency', type=float, default=0.0001, help='Extra seconds per returned entry')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Requests allowed per window (default: unlimited)')
+    parser.add_argument('--rate-window', type=float, default=60.0, help='Rate limit window in seconds')
+    args = parser.parse_args()
+
+    mock = MockAniList(args.anime, args.manga, args.latency, args.per_entry_latency,
+                       rate_limit=args.rate_limit, rate_window=args.rate_window)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    print(f"Mock AniList listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()